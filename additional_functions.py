@@ -20,11 +20,13 @@
 # any of the other files or the Node / Jumper-classes.
 
 import class_definitions as cd
+import spatial_index as sp
+import adjacency_tiles as at
+import instruments as ins
 from math import sqrt
 from time import time
 import argparse
 import os
-import requests
 
 
 # This finds the closest system to a given point. Used e.g. to find the 
@@ -44,91 +46,255 @@ def distance_to_point(point_1_coords, point_2_coords):
 
 
 
+# To find the stars closest to a point without looking at all of them, they 
+# are put into a grid once (see spatial_index.py). The grid can then be used 
+# for as many lookups as needed.
+def star_grid(stars):
+	names = list(stars.keys())
+	coords = [(stars[name]['x'], stars[name]['y'], stars[name]['z']) \
+															for name in names]
+
+	return sp.Grid(coords, sp.cell_size_for(coords), names)
+
+
+
+# The names of the < k > stars closest to < point_coords > (a dict with 'x', 
+# 'y' and 'z'), the closest first. < grid > is what star_grid() returns.
+def closest_stars(grid, point_coords, k = 1):
+	point = (point_coords['x'], point_coords['y'], point_coords['z'])
+
+	return [grid.names[i] for distance, i in grid.nearest(point, k)]
+
+
+
 # The start- and endpoint are likely unknown stars or just approximate 
 # coordinates from the ingame starmap. This function finds the actual 
 # (known) stars which are closest to the given positions.
-def find_closest(stars, start_coords, end_coords):
-	start_distance = 9999999999999.0
-	end_distance = 9999999999999.0
+# < grid > is what star_grid() returns. It is created if not given, but if 
+# this is called more than once with the same stars, it is much faster to 
+# create it just once.
+def find_closest(stars, start_coords, end_coords, grid = None):
+	if grid is None:
+		grid = star_grid(stars)
 
 	start_star = None
 	end_star = None
 
-	for star_name, star_coords in stars.items():
-		distance_to_start = distance_to_point(start_coords, star_coords)
-		distance_to_end = distance_to_point(end_coords, star_coords)
+	for name in closest_stars(grid, start_coords):
+		start_star = {name:stars[name]}
 
-		if distance_to_start < start_distance:
-			start_distance = distance_to_start
-			start_star = {star_name:star_coords}
-
-		if distance_to_end < end_distance:
-			end_distance = distance_to_end
-			end_star = {star_name:star_coords}
+	for name in closest_stars(grid, end_coords):
+		end_star = {name:stars[name]}
 
 	return start_star, end_star
 
 
 
+# The closest star to a point may be "isolated", that is no other star can 
+# be reached from it, not even with a neutron boost. Searching a path from 
+# there would be pointless. Hence, this looks at the < k > closest stars and 
+# returns the closest one from which another star can be reached, as
+# {name:coords}. None if all of them are isolated.
+# < pristine_nodes > are the nodes as created by create_nodes().
+def closest_connected(stars, grid, point_coords, pristine_nodes, k = 10):
+	for name in closest_stars(grid, point_coords, k):
+		node = pristine_nodes.get(name)
+		if node and any(node.reachable):
+			return {name:stars[name]}
+
+
+
 # This takes in all the star-data and creates node-objects.
-# < screen > is the instance of class ScreenWork() that calls this function.
-def create_nodes(screen):
-	stars = screen.stars
+# < engine > is the instance of class Engine() that calls this function.
+# Each node just needs to look at the stars around it. These are taken from 
+# the tiles in the cache (see adjacency_tiles.py) if they are there, 
+# otherwise from the neighbouring cells of a grid (see spatial_index.py) 
+# with cells as large as the longest jump.
+def create_nodes(engine):
+	stars = engine.stars
+	jump_distances = engine.settings.jumpable_distances
 
 	total = 0
 	all_nodes = {}
 
-	start = time()
-	for starname, data in stars.items():
-		if screen.mother.exiting.is_set():
-			return
+	grid = node_grid(stars, jump_distances)
+	names = grid.names
+	coords = grid.coords
+	# The stars around a node are given to it in the same order as in 
+	# < stars >. Thus, the nodes are the same no matter where the stars 
+	# around them came from.
+	order = {name:i for i, name in enumerate(names)}
+	tiles = at.Tiles(engine.settings.corridor, jump_distances)
+	from_tiles = 0
 
-		total += 1
-		node = cd.Node(starname, data, screen.mother.jumpable_distances, stars, all_nodes)
-		all_nodes[starname] = node
+	start = time()
+	# The tiles must be closed in any case, see adjacency_tiles.py. What 
+	# was remembered so far is correct, thus it is saved even if this stops 
+	# early.
+	try:
+		for starname, data in stars.items():
+			if engine.exiting.is_set():
+				return
+
+			total += 1
+			around = tiles.around(starname, data, stars)
+			if around is None:
+				around = [names[i] for i in grid.around(coords[order[starname]])]
+				tiles.remember(starname, data, around, stars)
+			else:
+				from_tiles += 1
+
+			around = sorted(around, key = lambda name: order[name])
+			close_stars = {name:stars[name] for name in around}
+			node = cd.Node(starname, data, jump_distances, close_stars, all_nodes)
+			all_nodes[starname] = node
+
+			if (total + 1) % 100 == 0:
+				time_so_far = time() - start
+				time_left = len(stars) / total * time_so_far - time_so_far
+				this = "Processed {} of {} stars. ".format(total + 1, len(stars))
+				that = "Finished in ca. {:.2f} seconds.".format(time_left)
+				print(this + that)
+				engine.say('create_nodes', this + that)
+	finally:
+		tiles.save()
+
+	if from_tiles:
+		print("{} of {} stars were taken from the tiles.".format(from_tiles, len(stars)))
+
+	ins.count('nodes.built', total)
+	ins.count('nodes.from_tiles', from_tiles)
+	count_edges(all_nodes)
+
+	engine.pristine_nodes = all_nodes
+	engine.creating_nodes = False
+
+
+
+# The grid (see spatial_index.py) used by create_nodes() and add_stars(). 
+# The cells are as large as the longest jump, thus all stars a star can 
+# reach are in its own or in the neighbouring cells.
+def node_grid(stars, jump_distances):
+	names = list(stars.keys())
+	coords = [(stars[name]['x'], stars[name]['y'], stars[name]['z']) \
+															for name in names]
+
+	return sp.Grid(coords, jump_distances[-1], names)
+
+
+
+# If a few stars shall be added to already prepared nodes (e.g. because 
+# more stars were found), it is a waste of time to prepare all nodes again.
+# This creates the nodes just for the new stars and adds the new stars to 
+# the nodes that can reach them. The result is the same as if 
+# create_nodes() would have been run with all stars.
+# < pristine_nodes > and < stars > are the prepared nodes and the stars they
+# were created from. < new_stars > is a dict like < stars >. Stars that are 
+# known already are ignored. All of them are changed.
+# < grid > is what node_grid() returns for < stars > and it is changed, too. 
+# If it is given, this takes time just for the new stars. If it isn't, it is
+# created, which is still much faster than preparing all nodes again.
+# Returns how many stars were added.
+# ATTENTION: Which stars are connected with each other is figured out when 
+# a class Graph instance is created from the nodes (see 
+# class_definitions.py), thus there is nothing to update for that.
+def add_stars(pristine_nodes, stars, new_stars, jump_distances, grid = None):
+	if grid is None:
+		grid = node_grid(stars, jump_distances)
+
+	added = []
+	for name, data in new_stars.items():
+		if name in stars:
+			continue
+
+		stars[name] = data
+		grid.add((data['x'], data['y'], data['z']), name)
+		added.append(name)
+
+	names = grid.names
+	for name in added:
+		data = stars[name]
+		around = sorted(grid.around((data['x'], data['y'], data['z'])))
+		close_stars = {names[i]:stars[names[i]] for i in around}
+		pristine_nodes[name] = cd.Node(name, data, jump_distances, \
+												close_stars, pristine_nodes)
+
+	# The old nodes get the new stars in the order in which these were 
+	# added, as if they had been in < stars > from the beginning.
+	new = set(added)
+	for name in added:
+		data = stars[name]
+		for i in grid.around((data['x'], data['y'], data['z'])):
+			if names[i] not in new:
+				pristine_nodes[names[i]].add_reachable(name, data)
+
+	ins.count('nodes.built', len(added))
+
+	return len(added)
+
+
+
+# Counts how many stars can be reached from all < nodes > together with each
+# jump distance (see instruments.py). This is how much the pathfinding 
+# algorithms have to look at.
+def count_edges(nodes):
+	edges = {}
+	for node in nodes.values():
+		for this_distance, band in enumerate(node.reachable):
+			edges[this_distance] = edges.get(this_distance, 0) + len(band)
+
+	for this_distance, number in edges.items():
+		ins.count('nodes.edges.band_{}'.format(this_distance), number)
+
+
+# The route of a class Jumper instance as a dict with just the things one 
+# needs to fly it. This is what engine.py => Engine.results() gives out, so 
+# that no one outside has to know about class Jumper.
+def route_of(jumper):
+	if not jumper:
+		return None
+
+	jump_types = jumper.jump_types
+	jumps = []
+	for i in range(len(jumper.visited_systems)):
+		jumps.append({'system':jumper.visited_systems[i], \
+					'distance':jumper.distances[i], 'jump_type':jump_types[i]})
 
-		if (total + 1) % 100 == 0:
-			time_so_far = time() - start
-			time_left = len(stars) / total * time_so_far - time_so_far
-			this = "Processed {} of {} stars. ".format(total + 1, len(stars))
-			that = "Finished in ca. {:.2f} seconds.".format(time_left)
-			print(this + that)
-			screen.create_nodes_text.setText(this + that)
+	route = {'jumps':jumps, 'number_jumps':len(jumps)}
+	route['neutron_boosts'] = len([x for x in jump_types if 'neutron' in x])
+	route['level_3_boosts'] = len([x for x in jump_types if '3' in x])
+	route['level_2_boosts'] = len([x for x in jump_types if '2' in x])
+	route['level_1_boosts'] = len([x for x in jump_types if '1' in x])
 
-	screen.pristine_nodes = all_nodes
-	screen.creating_nodes = False
+	return route
 
 
 # Just to print the complete path information in a pretty way.
-def pretty_print(jumper):
+# < route > is what route_of() returns.
+def pretty_print(route):
 	text = ''
-	for i in range(len(jumper.visited_systems)):
-		starname = jumper.visited_systems[i]
-		jump_type = jumper.jump_types[i]
-		distance = round(jumper.distances[i], 2)
+	for jump in route['jumps']:
+		distance = round(jump['distance'], 2)
 
-		this = '{}   =>   {}   =>   {}\n'.format(starname, distance, jump_type)
+		this = '{}   =>   {}   =>   {}\n'.format(jump['system'], distance, \
+															jump['jump_type'])
 		text = text + this
 
 	return text
 
 
 # To print the information about the path in a good way.
-# < screen > is the instance of class ScreenWork() that calls this function.
-def print_jumper_information(fewest_jumps_jumper, screen):
-	if fewest_jumps_jumper:
-		jump_types = fewest_jumps_jumper.jump_types
-		number_jumps = len(fewest_jumps_jumper.visited_systems)
-		neutron_boosts = len([x for x in jump_types if 'neutron' in x])
-		level_3_boosts = len([x for x in jump_types if '3' in x])
-		level_2_boosts = len([x for x in jump_types if '2' in x])
-		level_1_boosts = len([x for x in jump_types if '1' in x])
-
-		this = "Fewest jumps: "
-		that = '{} with {} neutron boosts, '.format(number_jumps, neutron_boosts)
-		siht = '{} grade 3 boosts, {} '.format(level_3_boosts, level_2_boosts)
-		tath = 'grade 2 boosts, {} grade 1 boosts.\n\n'.format(level_1_boosts)
-		info = pretty_print(fewest_jumps_jumper)
+# < route > is what route_of() returns. < heading > is what the text 
+# starts with.
+def print_jumper_information(route, heading = "Fewest jumps: "):
+	if route:
+		this = heading
+		that = '{} with {} neutron boosts, '.format(route['number_jumps'], \
+													route['neutron_boosts'])
+		siht = '{} grade 3 boosts, {} '.format(route['level_3_boosts'], \
+													route['level_2_boosts'])
+		tath = 'grade 2 boosts, {} grade 1 boosts.\n\n'.format(route['level_1_boosts'])
+		info = pretty_print(route)
 
 		print(this + that + siht + tath + info)
 
@@ -136,6 +302,34 @@ def print_jumper_information(fewest_jumps_jumper, screen):
 
 
 
+# Dito for the other routes the 'pareto' algorithm finds (see router.py => 
+# pareto_search()), with what they are about above them.
+def print_alternatives(alternatives):
+	this = "\n\nThe route above needs the fewest boosts. Below are {} other "
+	that = "routes. Each one needs fewer jumps or less of one kind of boost "
+	siht = "than each other one. Choose what suits you best.\n"
+	text = this.format(len(alternatives)) + that + siht
+	print(text)
+
+	for i, alternative in enumerate(alternatives):
+		heading = "Alternative {} of {}, jumps: ".format(i + 1, len(alternatives))
+		text = text + '\n' + print_jumper_information(alternative, heading)
+
+	return text
+
+
+
+# argparse's type = bool makes True out of any text, also out of "False".
+def true_or_false(text):
+	if text.strip().lower() in ['true', 'yes', '1']:
+		return True
+	elif text.strip().lower() in ['false', 'no', '0']:
+		return False
+
+	raise argparse.ArgumentTypeError("must be True or False, not {}".format(text))
+
+
+
 # In this function the command line arguments are "processed". It exists mainly
 # to keep the main program more tidy.
 def get_arguments():
@@ -149,7 +343,9 @@ def get_arguments():
 		nigthly dump from EDSM.""",
 		epilog="See README.md for further information.")
 
-	subparsers = parser.add_subparsers(description = 'foo')
+	# < args.mode > is None if neither is given, which starts the gui.
+	subparsers = parser.add_subparsers(dest = 'mode', \
+			description = 'Start the gui (default) or run without it.')
 
 	# I want both options, starting the program with command line options
 	# or running the gui which shall require no arguments at al. Thus, I need 
@@ -178,18 +374,30 @@ def get_arguments():
 	parser_no_gui.add_argument('--range-on-fumes','-rf', metavar = 'LY', \
 													type = float, help = text)
 
+	# Start and destination can be given as coordinates or by name (see 
+	# name_index.py), but not both.
+	start = parser_no_gui.add_mutually_exclusive_group(required = True)
+	destination = parser_no_gui.add_mutually_exclusive_group(required = True)
+
 	text = "Galactic coordinates to start routing from."
-	parser_no_gui.add_argument('--startcoords','-s', nargs = 3, metavar = ('X','Y','Z'), \
-									type = float, required = True, help = text)
+	start.add_argument('--startcoords','-s', nargs = 3, metavar = ('X','Y','Z'), \
+													type = float, help = text)
+
+	this = "Name of the system to start routing from. Needs the system_names "
+	that = "file, which is created by the first search with --starsfile."
+	start.add_argument('--start-system', metavar = 'NAME', help = this + that)
 
 	text = "Galactic coordinates of target destination."
-	parser_no_gui.add_argument('--destcoords','-d', nargs = 3, metavar = ('X','Y','Z'), \
-									required = True, type = float, help = text)
+	destination.add_argument('--destcoords','-d', nargs = 3, metavar = ('X','Y','Z'), \
+													type = float, help = text)
+
+	text = "Name of the target destination system. See --start-system."
+	destination.add_argument('--dest-system', metavar = 'NAME', help = text)
 
 	this = "Utilize Neutron boosting. The necessary file will be downloaded "
 	that = "automatically."
 	parser_no_gui.add_argument('--neutron-boosting','-nb', metavar = ('True/False'), \
-							type = bool, default = False, help = this + that)
+							type = true_or_false, default = False, help = this + that)
 
 	text = "Reuse nodes data from previous run"
 	parser_no_gui.add_argument('--cached', action = 'store_true', help = text)
@@ -197,13 +405,130 @@ def get_arguments():
 	text = "Path to EDSM system coordinates JSON file."
 	parser_no_gui.add_argument('--starsfile', metavar = 'FILE', help = text)
 
+	this = "Prepare the information for the pathfinding algorithm while the "
+	that = "stars are searched."
+	parser_no_gui.add_argument('--streaming', action = 'store_true', \
+													help = this + that)
+
 	text = "How many times to shuffle and reroute before returning best result (default 23)."
 	parser_no_gui.add_argument('--max-tries','-N', metavar = 'N', type = int, \
 													default = 23, help = text)
 
+	this = "Stop the randomized algorithms after N tries in a row without a "
+	that = "better route (default: do all tries)."
+	parser_no_gui.add_argument('--patience', metavar = 'N', type = int, \
+													help = this + that)
+
+	this = "Stop the randomized, the anytime and the pareto algorithms after "
+	that = "this many seconds (default: no limit)."
+	parser_no_gui.add_argument('--time-budget', metavar = 'SECONDS', \
+									type = float, help = this + that)
+
+	this = "Seed for the randomized algorithms. The same seed gives the same "
+	that = "route for the same input (default: a different one each time)."
+	parser_no_gui.add_argument('--seed', metavar = 'SEED', type = int, \
+													help = this + that)
+
+	this = "Pathfinding algorithm: 'astar', 'dijkstra' and 'bidirectional' find "
+	that = "the route with the fewest boosts in one go, 'anytime' gives better "
+	siht = "and better routes until the best one is found or the time budget "
+	taht = "is over, 'pareto' gives also all routes that need more boosts but "
+	text = this + that + siht + taht + "fewer jumps, 'random' is the old "
+	text = text + "algorithm and 'parallel' the same with the tries in several "
+	text = text + "processes (default astar)."
+	parser_no_gui.add_argument('--algorithm','-a', default = 'astar', \
+					choices = ['astar', 'dijkstra', 'bidirectional', 'anytime', \
+							'pareto', 'random', 'parallel'], help = text)
+
+	this = "Ask the server (see route_server.py) on this port on localhost "
+	that = "instead of doing it all here (just with astar or dijkstra)."
+	parser_no_gui.add_argument('--server', metavar = 'PORT', type = int, \
+													help = this + that)
+
+	this = "Append how long each stage took and how much it did as json lines "
+	that = "to FILE (see instruments.py)."
+	parser_no_gui.add_argument('--instruments', metavar = 'FILE', help = this + that)
+
+	text = "Print how long each stage took and how much it did as a table."
+	parser_no_gui.add_argument('--summary', action = 'store_true', help = text)
+
 	text = "Enable verbose logging"
 	parser_no_gui.add_argument('--verbose','-v', action = 'store_true', help = text)
 
+	# The third one finds many routes in one go, see batch.py.
+	parser_batch = subparsers.add_parser("batch")
+
+	this = "A .json or .csv file with the start, end and ship of each route. "
+	that = "See batch.py for how it looks like."
+	parser_batch.add_argument('queries', metavar = 'QUERIES', help = this + that)
+
+	text = "Ship range with a full fuel tank for the routes that don't give one."
+	parser_batch.add_argument('--jumprange','-r', metavar = 'LY', type = float, \
+																	help = text)
+
+	text = "Dito for the range with fuel for one jump (defaults equal to range)."
+	parser_batch.add_argument('--range-on-fumes','-rf', metavar = 'LY', \
+													type = float, help = text)
+
+	text = "Dito for neutron boosting."
+	parser_batch.add_argument('--neutron-boosting','-nb', metavar = ('True/False'), \
+							type = true_or_false, default = False, help = text)
+
+	text = "Path to EDSM system coordinates JSON file."
+	parser_batch.add_argument('--starsfile', metavar = 'FILE', help = text)
+
+	text = "Where to save all routes (default routes.json)."
+	parser_batch.add_argument('--output','-o', metavar = 'FILE', \
+										default = 'routes.json', help = text)
+
+	text = "How many routes are searched at the same time (default: one per CPU)."
+	parser_batch.add_argument('--workers','-w', metavar = 'N', type = int, \
+																	help = text)
+
+	text = "Pathfinding algorithm (default astar)."
+	parser_batch.add_argument('--algorithm','-a', default = 'astar', \
+								choices = ['astar', 'dijkstra'], help = text)
+
+	this = "Append how long each stage took and how much it did as json lines "
+	that = "to FILE (see instruments.py)."
+	parser_batch.add_argument('--instruments', metavar = 'FILE', help = this + that)
+
+	text = "Print how long each stage took and how much it did as a table."
+	parser_batch.add_argument('--summary', action = 'store_true', help = text)
+
+	text = "Enable verbose logging"
+	parser_batch.add_argument('--verbose','-v', action = 'store_true', help = text)
+
+	# And the fourth one keeps running and answers queries, see
+	# route_server.py.
+	parser_server = subparsers.add_parser("server")
+
+	text = "Port on localhost to wait for queries on (default 8023)."
+	parser_server.add_argument('--port','-p', metavar = 'PORT', type = int, \
+												default = 8023, help = text)
+
+	text = "Ship range with a full fuel tank for the queries that don't give one."
+	parser_server.add_argument('--jumprange','-r', metavar = 'LY', type = float, \
+																	help = text)
+
+	text = "Dito for the range with fuel for one jump (defaults equal to range)."
+	parser_server.add_argument('--range-on-fumes','-rf', metavar = 'LY', \
+													type = float, help = text)
+
+	text = "Dito for neutron boosting."
+	parser_server.add_argument('--neutron-boosting','-nb', metavar = ('True/False'), \
+							type = true_or_false, default = False, help = text)
+
+	text = "Path to EDSM system coordinates JSON file."
+	parser_server.add_argument('--starsfile', metavar = 'FILE', help = text)
+
+	text = "How many prepared corridors are kept in memory (default 8)."
+	parser_server.add_argument('--max-graphs', metavar = 'N', type = int, \
+													default = 8, help = text)
+
+	text = "Enable verbose logging"
+	parser_server.add_argument('--verbose','-v', action = 'store_true', help = text)
+
 	args = parser.parse_args()
 
 	return args
@@ -0,0 +1,223 @@
+#    "adjacency_tiles" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Preparing the nodes means to find for each star all the stars it can 
+# reach (see class Node in class_definitions.py). Routes through the same 
+# gap have most of their stars in common, thus this was done again and again
+# for the same stars.
+# Hence, which stars are around a star is kept in the cache directory (see 
+# corridor_cache.py). The space is divided into cubes ("tiles") and each 
+# tile has the list of stars around each of its stars, together with up to
+# which distance ("radius") the list goes. 
+# ATTENTION: Just the stars of a corridor are known when the nodes are 
+# prepared. The list for a star near the wall of the corridor would thus 
+# miss the stars outside of it, which may be in another corridor. Hence, a 
+# star is just put into a tile if all stars within its radius are inside 
+# the corridor, see _complete().
+# If a star is in a tile for a larger or the same radius as needed, its 
+# list is used (just with the stars that are in the new corridor, too). If 
+# not, the stars around it are looked for as usual.
+# The tiles count for the size of the cache, see corridor_cache.py => 
+# evict().
+
+import os
+import shelve
+import threading
+from math import sqrt
+import corridor_cache as cc
+import find_systems_offline as off
+
+# In ly.
+tile_size = 500
+# A shelf can't be written by two at the same time (with some backends the 
+# second one even doesn't notice and the index of the first one is lost). 
+# Thus just one Tiles() at a time has its shelf open, the others wait.
+_writing = threading.Lock()
+
+class Tiles(object):
+	# < corridor > is what corridor_cache.py => corridor_of() returns, or a 
+	# list of these if the stars of several corridors are used together 
+	# (see batch.py). 
+	# < jump_distances > are the ones used to prepare the nodes.
+	def __init__(self, corridor, jump_distances):
+		self.jump_distances = jump_distances
+		self.loaded = {}
+		self.changed = set()
+		self.shelf = None
+
+		if not corridor:
+			return
+
+		corridors = [corridor] if isinstance(corridor[0], dict) else corridor
+		# The stars of the online search are not in a tube (see 
+		# corridor_cache.py => find_stars()) and without a version it is 
+		# not clear if the stars are the same the next time.
+		sources = set((source, version) for start, end, source, version in corridors)
+		if len(sources) != 1:
+			return
+
+		source, version = sources.pop()
+		if source != 'offline' or version is None:
+			return
+
+		# Start, end and the limits of the box (see find_systems_offline.py)
+		# of each corridor.
+		self.lines = []
+		for start, end, source, version in corridors:
+			if cc._as_tuple(start) == cc._as_tuple(end):
+				continue
+
+			maximum, minimum = off.x_y_z_limits(start, end)
+			self.lines.append((cc._as_tuple(start), cc._as_tuple(end), \
+														maximum, minimum))
+
+		if not self.lines:
+			return
+
+		# ATTENTION: From here on save() must be called, otherwise the 
+		# others wait forever.
+		_writing.acquire()
+		try:
+			# Tiles of older versions of the data are of no use anymore. 
+			# Nobody else has them open right now.
+			name = 'tiles-' + cc._key(source, version)
+			if os.path.isdir(cc.tiles_directory):
+				for other in os.listdir(cc.tiles_directory):
+					if not other.startswith(name):
+						os.remove(os.path.join(cc.tiles_directory, other))
+			os.makedirs(cc.tiles_directory, exist_ok = True)
+
+			self.shelf = shelve.open(os.path.join(cc.tiles_directory, name))
+		finally:
+			if self.shelf is None:
+				_writing.release()
+
+
+	# Up to which distance the stars around a star are needed.
+	def radius(self, data):
+		if data['neutron']:
+			return self.jump_distances[-1]
+		else:
+			return self.jump_distances[-2]
+
+
+	def _tile_of(self, data):
+		return '{},{},{}'.format(int(data['x'] // tile_size), \
+						int(data['y'] // tile_size), int(data['z'] // tile_size))
+
+
+	def _tile(self, key):
+		if key not in self.loaded:
+			self.loaded[key] = self.shelf.get(key, {})
+
+		return self.loaded[key]
+
+
+	# True if all stars within < radius > around the star are inside the 
+	# corridor (see find_systems_offline.py), or one of them.
+	def _complete(self, data, radius):
+		return any(self._inside(data, radius, line) for line in self.lines)
+
+
+	def _inside(self, data, radius, line):
+		start_point, end_point, maximum, minimum = line
+		for axis, this in enumerate(['x', 'y', 'z']):
+			if data[this] - radius < minimum[axis] or \
+								data[this] + radius > maximum[axis]:
+				return False
+
+		distance = cc._distance_from_line(cc._as_tuple(data), start_point, \
+																	end_point)
+
+		return distance + radius <= cc.corridor_radius
+
+
+	# The names of the stars around the star < name > from the tiles, just
+	# the ones that are in < stars >, too. None if the star is not in a tile 
+	# (or just for a smaller radius).
+	def around(self, name, data, stars):
+		if self.shelf is None:
+			return
+
+		known = self._tile(self._tile_of(data)).get(name)
+		if not known or known[0] < self.radius(data):
+			return
+
+		return [other for other in known[1] if other in stars]
+
+
+	# Puts the stars around the star < name > into its tile, if the list is
+	# complete. < around > contains the names of (at least) all stars within
+	# the radius.
+	def remember(self, name, data, around, stars):
+		if self.shelf is None:
+			return
+
+		radius = self.radius(data)
+		if not self._complete(data, radius):
+			return
+
+		x_0, y_0, z_0 = data['x'], data['y'], data['z']
+		within = []
+		for other in around:
+			x_1, y_1, z_1 = stars[other]['x'], stars[other]['y'], stars[other]['z']
+			if sqrt((x_1 - x_0)**2 + (y_1 - y_0)**2 + (z_1 - z_0)**2) <= radius:
+				within.append(other)
+
+		key = self._tile_of(data)
+		self._tile(key)[name] = (radius, within)
+		self.changed.add(key)
+
+
+	# Writes the changed tiles to disk and closes the shelf. 
+	def save(self):
+		if self.shelf is None:
+			return
+
+		try:
+			for key in self.changed:
+				self.shelf[key] = self.loaded[key]
+		finally:
+			self.shelf.close()
+			self.shelf = None
+			_writing.release()
+
+		# The tiles count for the size of the cache.
+		cc.evict()
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
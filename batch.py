@@ -0,0 +1,485 @@
+#    "batch" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# An expedition has many legs and each leg did everything again: searching
+# the stars, preparing the nodes and finding the path. 
+# < gap_jumper.py batch QUERIES > finds the routes for all legs ("queries") 
+# in the file QUERIES in one go. The stars of all corridors are searched 
+# together (the dump is read just once) or taken from the cache (see 
+# corridor_cache.py). The nodes are prepared once for all stars of all 
+# corridors ("the union") for each ship, and the routes are found in 
+# several processes at the same time, which all look at the same graph in 
+# shared memory (see parallel_tries.py).
+# All routes end up in one .json file, together with how long it took to 
+# find each of them.
+# 
+# QUERIES is a .json file with a list like this:
+# [{"start": "Sol", "end": [100.5, -20, 3000], "jumprange": 50}, ...]
+# or a .csv file with the same as columns, with the coordinates in the 
+# columns start_x, start_y, start_z, end_x, end_y and end_z. 
+# Optional are "range_on_fumes" and "neutron_boosting". What is missing is 
+# taken from the command line.
+
+from multiprocessing.util import Finalize
+from time import time
+import csv
+import json
+import logging
+import multiprocessing as mp
+import os
+import additional_functions as af
+import class_definitions as cd
+import command_line as cl
+import corridor_cache as cc
+import engine as en
+import find_systems_offline as off
+import find_systems_online as on
+import instruments as ins
+import parallel_tries as pt
+import router as ro
+
+
+# csv gives just strings, json real values.
+def _yes(value):
+	if isinstance(value, str):
+		return value.strip().lower() in ['true', 'yes', '1']
+
+	return bool(value)
+
+
+
+def _number(value):
+	if value is None or value == '':
+		return None
+
+	return float(value)
+
+
+
+# The coordinates of < which > ('start' or 'end') of a < query > as a dict, 
+# or None if the system is unknown. 
+def _point(query, which):
+	coords = [query.get(which + '_' + this) for this in 'xyz']
+	if all(this not in [None, ''] for this in coords):
+		return dict(zip('xyz', [float(this) for this in coords]))
+
+	value = query.get(which)
+	if isinstance(value, (list, tuple)):
+		return dict(zip('xyz', [float(this) for this in value]))
+	elif isinstance(value, dict):
+		return {this:float(value[this]) for this in 'xyz'}
+	elif value:
+		return cl.coords_of(value)
+
+
+
+# Reads the queries from < infile > (see the comment at the beginning).
+def read_queries(infile):
+	if infile.lower().endswith('.json'):
+		with open(infile, 'r') as f:
+			return json.load(f)
+
+	with open(infile, 'r', newline = '') as f:
+		return list(csv.DictReader(f))
+
+
+
+# Everything that is needed to find the route of each query. What is not
+# given in the query is taken from the command line arguments < args >.
+# Returns None (and tells why) if something is missing.
+def prepare_queries(queries, args):
+	prepared = []
+	for number, query in enumerate(queries):
+		jumprange = _number(query.get('jumprange')) or args.jumprange
+		if not jumprange:
+			this = "ATTENTION: Query #{} has no jumprange and ".format(number + 1)
+			that = "--jumprange is not given."
+			print(this + that)
+			return
+
+		on_fumes = _number(query.get('range_on_fumes')) or \
+											args.range_on_fumes or jumprange
+		if query.get('neutron_boosting') in [None, '']:
+			neutron_boosting = args.neutron_boosting
+		else:
+			neutron_boosting = _yes(query['neutron_boosting'])
+
+		start_coords = _point(query, 'start')
+		end_coords = _point(query, 'end')
+		if not start_coords or not end_coords:
+			print("ATTENTION: Start or end of query #{} are unknown.".format(number + 1))
+			return
+
+		this = {'number':number + 1, 'start_coords':start_coords, \
+									'end_coords':end_coords}
+		this['start'] = query.get('start') or start_coords
+		this['end'] = query.get('end') or end_coords
+		this['jumprange'] = jumprange
+		this['range_on_fumes'] = on_fumes
+		this['neutron_boosting'] = neutron_boosting
+		# See screen_input.py => _continue_action().
+		this['jumpable_distances'] = [0] + [x*y for x in [1, 1.25, 1.5, 2.0] \
+							for y in [jumprange, on_fumes]] + [jumprange * 4]
+		this['corridor'] = cc.corridor_of(start_coords, end_coords, \
+										bool(args.starsfile), args.starsfile)
+		prepared.append(this)
+
+	return prepared
+
+
+
+# The stars of all < corridors > (see corridor_cache.py => corridor_of()), 
+# as a list with one dict of stars per corridor. The ones that are not in 
+# the cache are searched (and then put there).
+# < engine > is the instance of class Engine() that does the work.
+def find_stars(corridors, engine):
+	found = [cc.find_stars(corridor)[0] for corridor in corridors]
+	missing = [i for i, stars in enumerate(found) if stars is None]
+
+	this = "{} of {} corridors were found ".format(len(corridors) - len(missing), \
+																len(corridors))
+	print(this + "in the cache.")
+	if not missing:
+		return found
+
+	lines = [(corridors[i][0], corridors[i][1]) for i in missing]
+	if engine.settings.offline_mode:
+		all_stars = off.find_systems_for_lines(lines, engine.settings.starsfile, \
+																		engine)
+		if all_stars is None:
+			return
+	else:
+		all_stars = []
+		for start_coords, end_coords in lines:
+			on.find_systems_online(start_coords, end_coords, engine)
+			if engine.exiting.is_set():
+				return
+			all_stars.append(engine.stars)
+
+	for i, stars in zip(missing, all_stars):
+		cc.store_stars(corridors[i], stars)
+		found[i] = stars
+
+	return found
+
+
+
+# The nodes for all < stars > for one ship. < union > is the "corridor" of 
+# all the corridors together, which is used to find them in the cache. 
+# < engine > is the instance of class Engine() that does the work, its 
+# settings must be the ones of the ship.
+def nodes_for(stars, union, engine):
+	jump_distances = engine.settings.jumpable_distances
+	neutron_boosting = engine.settings.neutron_boosting
+
+	nodes = cc.find_nodes(union, jump_distances, neutron_boosting, stars)
+	if nodes is not None:
+		print("The prepared information was found in the cache.")
+		return nodes
+
+	# Each ship needs its own copy, since the neutron stars are marked in 
+	# the stars.
+	engine.stars = {name:dict(data) for name, data in stars.items()}
+	if neutron_boosting:
+		off.update_stars_with_neutrons(engine.stars, engine.neutron_stars)
+
+	af.create_nodes(engine)
+	if engine.pristine_nodes is not None:
+		cc.store_nodes(union, jump_distances, neutron_boosting, \
+										engine.pristine_nodes, engine.stars)
+
+	return engine.pristine_nodes
+
+
+
+# Like in parallel_tries.py, each process gets the graph once.
+_worker = {}
+
+def _init_worker(info):
+	_worker['graph'] = pt.SharedGraph(info)
+	Finalize(None, _close_worker, exitpriority = 10)
+
+
+
+def _close_worker():
+	graph = _worker.pop('graph', None)
+	if graph:
+		graph.close()
+
+
+
+# Puts the stars closest to start and end of the < query > into it and
+# returns their indice in < graph > (the class Graph instance for the 
+# < nodes >). < grid > is additional_functions.py => star_grid() for the 
+# < stars >. 
+# Returns None (and puts why into the query) if start and end are not 
+# connected.
+def ends_of(query, stars, nodes, grid, graph):
+	start_star, end_star = af.find_closest(stars, query['start_coords'], \
+											query['end_coords'], grid)
+	# If the closest star is isolated, the next closest one that is not 
+	# is used instead (see engine.py => Engine._send_probes()).
+	start_star = af.closest_connected(stars, grid, query['start_coords'], \
+												nodes) or start_star
+	end_star = af.closest_connected(stars, grid, query['end_coords'], \
+												nodes) or end_star
+
+	query['start_star'] = list(start_star.keys())[0]
+	query['end_star'] = list(end_star.keys())[0]
+	start_index = graph.index[query['start_star']]
+	final_index = graph.index[query['end_star']]
+
+	# See spanning_tree.py => hopeless().
+	if graph.lowest_connecting_band(start_index, final_index) is None:
+		this = 'Start and end are not connected, not even with neutron '
+		query['error'] = this + 'boosts.'
+		return
+
+	return start_index, final_index
+
+
+
+# Finds the route and the way back (if < neutron_boosting > is used) from
+# the star with index < start_index > to the one with index < final_index >
+# in < graph >. Returns both as additional_functions.py => route_of() gives 
+# them out and the number of expanded systems.
+def route_in(graph, start_index, final_index, astar, neutron_boosting):
+	route, expanded = ro.search(graph, start_index, final_index, astar = astar)
+
+	way_back_route = None
+	if route and neutron_boosting:
+		# See router.py => find_path().
+		way_back_route = ro.reverse_route(graph, route)
+		if not way_back_route:
+			way_back_route, more = ro.search(graph, final_index, start_index, \
+															astar = astar)
+			expanded += more
+
+	if route:
+		route = af.route_of(ro.make_jumper(graph, route))
+	if way_back_route:
+		way_back_route = af.route_of(ro.make_jumper(graph, way_back_route))
+
+	return route, way_back_route, expanded
+
+
+
+# Finds the route of one query in one of the processes. < task > is 
+# (number, start_index, final_index, astar, neutron_boosting).
+# Returns the number of the query, what route_in() returns and how many 
+# seconds it took.
+def _solve(task):
+	number, start_index, final_index, astar, neutron_boosting = task
+	started = time()
+	route, way_back, expanded = route_in(_worker['graph'], start_index, \
+								final_index, astar, neutron_boosting)
+
+	return number, route, way_back, expanded, time() - started
+
+
+
+# Finds the routes of all < queries > of one ship in < processes > processes.
+# < nodes > are the nodes of all < stars > for this ship. < grid > is 
+# additional_functions.py => star_grid() for the stars.
+# Puts the results into the queries.
+def solve(queries, stars, nodes, grid, processes, astar):
+	graph = cd.Graph(nodes)
+
+	tasks = []
+	for query in queries:
+		ends = ends_of(query, stars, nodes, grid, graph)
+		if not ends:
+			continue
+
+		start_index, final_index = ends
+		tasks.append((query['number'], start_index, final_index, astar, \
+													query['neutron_boosting']))
+
+	if not tasks:
+		return
+
+	by_number = {query['number']:query for query in queries}
+	processes = max(1, min(processes, len(tasks)))
+	shm, info = pt.share_graph(graph)
+	# See parallel_tries.py => find_path().
+	context = mp.get_context('spawn')
+	pool = context.Pool(processes, initializer = _init_worker, \
+													initargs = (info,))
+	try:
+		for number, route, way_back, expanded, seconds in \
+										pool.imap_unordered(_solve, tasks):
+			ins.count('router.expanded', expanded)
+			query = by_number[number]
+			query['route'] = route
+			query['way_back'] = way_back
+			query['expanded'] = expanded
+			query['seconds'] = seconds
+			if not route:
+				query['error'] = 'The pathfnding algorithm failed to find a path.'
+
+			this = "Query #{}: ".format(number)
+			if route:
+				that = "{} jumps ".format(route['number_jumps'])
+			else:
+				that = "no route "
+			print(this + that + "in {:.3f} seconds.".format(seconds))
+	finally:
+		pool.close()
+		pool.join()
+		shm.close()
+		shm.unlink()
+
+
+
+# What is written into the output file for a query.
+def result_of(query, stars_considered):
+	keys = ['number', 'start', 'end', 'start_star', 'end_star', 'jumprange', \
+		'range_on_fumes', 'neutron_boosting', 'route', 'way_back', 'expanded', \
+																'seconds', 'error']
+	result = {key:query.get(key) for key in keys}
+	result['stars_considered'] = stars_considered
+
+	return result
+
+
+
+# Does it all. < args > are the command line arguments as returned by 
+# additional_functions.py => get_arguments(). < started > is when the 
+# program was started (see gap_jumper.py).
+# Returns the exit code, which is 0 if a route was found for each query.
+def main(args, started = None):
+	started = started or time()
+	if args.verbose:
+		logging.basicConfig(level = logging.INFO)
+
+	if args.starsfile and not os.path.isfile(args.starsfile):
+		print("ATTENTION: {} could not be found.".format(args.starsfile))
+		return 1
+
+	queries = read_queries(args.queries)
+	if not queries:
+		print("ATTENTION: {} contains no queries.".format(args.queries))
+		return 1
+
+	queries = prepare_queries(queries, args)
+	if not queries:
+		return 1
+
+	settings = en.Settings()
+	settings.offline_mode = bool(args.starsfile)
+	settings.starsfile = args.starsfile
+	settings.neutron_file_ok = af.neutron_file_ok()
+	progress = lambda channel, text: logging.info("%s: %s", channel, text)
+	engine = en.Engine(settings, progress)
+
+	if any(query['neutron_boosting'] for query in queries):
+		if not settings.neutron_file_ok:
+			engine.download_neutron_file().wait()
+			if not settings.neutron_file_ok:
+				print("ATTENTION: The neutron-stars file could not be downloaded.")
+				return 1
+
+		off.collect_neutron_information(engine)
+
+	# Several legs may go through the same corridor.
+	corridors = []
+	for query in queries:
+		if query['corridor'] not in corridors:
+			corridors.append(query['corridor'])
+
+	with ins.span('batch.stars'):
+		found = find_stars(corridors, engine)
+	if found is None:
+		return 1
+
+	stars = {}
+	for these in found:
+		stars.update(these)
+	if not stars:
+		print("ATTENTION: No stars were found between start and end.")
+		return 1
+
+	grid = af.star_grid(stars)
+	# Which stars are around each star is taken from the tiles of all 
+	# corridors (see adjacency_tiles.py).
+	settings.corridor = corridors
+	starts, ends, sources, versions = zip(*corridors)
+	version = None if None in versions else list(versions)
+	union = (list(starts), list(ends), sources[0], version)
+	processes = args.workers or mp.cpu_count()
+	astar = args.algorithm == 'astar'
+
+	# Each ship (jump distances and neutron boosting) needs its own nodes.
+	ships = []
+	for query in queries:
+		ship = (query['jumpable_distances'], query['neutron_boosting'])
+		if ship not in ships:
+			ships.append(ship)
+
+	searched = time()
+	for jump_distances, neutron_boosting in ships:
+		settings.jumpable_distances = jump_distances
+		settings.neutron_boosting = neutron_boosting
+		with ins.span('batch.nodes'):
+			nodes = nodes_for(stars, union, engine)
+		if nodes is None:
+			return 1
+
+		these = [query for query in queries if (query['jumpable_distances'], \
+								query['neutron_boosting']) == (jump_distances, \
+															neutron_boosting)]
+		with ins.span('batch.solve'):
+			solve(these, stars, nodes, grid, processes, astar)
+
+	results = {'queries':[result_of(query, len(stars)) for query in queries]}
+	results['corridors'] = len(corridors)
+	results['stars'] = len(stars)
+	results['search_seconds'] = searched - started
+	results['seconds'] = time() - started
+	with open(args.output, 'w') as f:
+		json.dump(results, f, indent = 1)
+
+	solved = len([query for query in queries if query.get('route')])
+	this = "Found {} of {} routes in {:.2f} seconds. ".format(solved, \
+											len(queries), time() - started)
+	that = "The results are saved in {}.".format(args.output)
+	print(this + that)
+
+	return 0 if solved == len(queries) else 1
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
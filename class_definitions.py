@@ -16,8 +16,8 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-# This file contains the class definitions of the Node- and Jumper-classes
-# used in gap_jumper.py 
+# This file contains the class definitions of the Node-, Graph-, UnionFind-, 
+# SearchState- and Jumper-classes used in gap_jumper.py 
 
 from math import sqrt
 from copy import deepcopy
@@ -39,7 +39,7 @@ class Node(object):
 		# stars when already on fumes. However, in EDSM not all stars have this
 		# information and I need to set self.scoopable to True to make the 
 		# algorithm work at all. Thus, this feature is implemented in 
-		# _check_free_stars() but is obviously rather useless.
+		# find_route.py => check_free_stars() but is obviously rather useless.
 		# However, if that ever changes, use < data['scoopable'] > as value 
 		# to set this attribute.
 		self.scoopable = True
@@ -48,18 +48,11 @@ class Node(object):
 		# The algorithm works by sending "jumpers" from one star to the next.
 		# If one star can be reached from another is defined by < jump_distances >
 		self.jump_distances = jump_distances
-		# The jumper mentioned above. It will become later a class Jumper object.
-		self.jumper = None
-		# If a system was visited by a jumper it shall not be visited again.
-		# Actually this attribute is redundant, since if a system contains a 
-		# jumper it is automatically visited. So the latter could be used instead.
-		# However, I figured that out when everything was finished and thus
-		# kept < visited > to not break anything.
-		self.visited = False
-		# This will be filled when _check_free_stars() is called. It will contain
-		# the names of the systems which have not yet been visited and which are
-		# within a give jump range.
-		self.can_jump_to = []
+		# ATTENTION: Earlier versions kept the jumper, the < visited > flag and 
+		# the < can_jump_to > list of a search directly in here. That made it 
+		# necessary to deepcopy ALL nodes before each try, which took longer 
+		# than the search itself. These are now in class SearchState (see below) 
+		# and a node is not changed anymore once it is created.
 		# I want to keep the original dict for this star, just in case.
 		# It also contains the x, y and z coordinates of the system.
 		self.data = data
@@ -132,129 +125,192 @@ class Node(object):
 	# zero as the first element. See also comment to __init__().
 	def _find_reachable_stars(self, all_stars):
 		for name, data in all_stars.items():
-			# Don't do all the calculations if the star couldn't be 
-			# reached anyway.
-			# ATTENTION: Since the sphere around this node is smaller than the 
-			# square box the below calculations still need to take care of 
-			# case that a star is in the box but outside maximum jumping 
-			# distance. This is implemented below.
-			if not self._in_box(data):
-				continue
-
-			distance = self._this_distance(data)
-
-			# The cube contains volumes outside the sphere of the maximum
-			# jump range around a node. Don't do anything if another star falls
-			# into such an area.
-			# Remember that the last element in self.jump_distances is the 
-			# jump distance for neutron boosted jumps.
-			if not self.neutron and distance > self.jump_distances[-2]:
-				continue
-			elif distance > self.jump_distances[-1]:
-				continue
-
-			# ATTENTION: self.jump_distances contains zero as the first 
-			# element to make this if-condition possible. Thus it is ONE 
-			# element longer (!) than self.reachable and ...
-			for i in range(len(self.jump_distances) - 1):
-				# ... the element with index (i + 1) in self.jump_distances 
-				# corresponds to ...
-				if self.jump_distances[i] <= distance and \
-								distance < self.jump_distances[i + 1]:
-					# ... element i in self.reachable.
-					self.reachable[i].append(name)
-
-
-	# This method checks if the nearby stystems are free to jump to.
-	# < this_distance > is the index of the list in self.reachable. Do NOT 
-	# confuse with the method _this_distance()!
-	def _check_free_stars(self, this_distance):
-		self.can_jump_to = []
-		for name in self.reachable[this_distance]:
-			next_star = self.all_nodes[name]
-			if not next_star.visited:
-				# The following will never be triggered as of now, since the 
-				# .scoopable attribute is set be default to True. However, this 
-				# if-condition is meant to NOT allow a jump if the tank is empty 
-				# afterwards and the next star is unscoopable. 
-				# If this information ever will be available for all systems in 
-				# the EDSM database, it is automatically available (see also 
-				# comment above to self.scoopable).
-				if self.jumper.jumps_left == 1 and not next_star.scoopable:
-					# Check if a star is nearby to re-fill the tank.
-					if self._refill_at_nearest_scoopable(name):
-						self.jumper.jumps_left = self.jumper.max_jumps - 1
-						self.can_jump_to.append(name)
-					else:
-						pass
-				# If (this_distance  + 1) is even it is a jump distance for jumping 
-				# on fumes. In this case the next star needs to be scoopable
-				# because otherwise the jumper would strand there!
-				elif (this_distance + 1) % 2 == 0 and next_star.scoopable:
-					self.jumper.jumps_left = 1
-					self.jumper.on_fumes.append((self.name, next_star.name))
-					this = 'On fumes jump from {} to {}'.format(self.name, next_star.name)
-					self.jumper.notes.append(this)
-					self.can_jump_to.append(name)
-				else:
-					self.can_jump_to.append(name)
-
-
-	# Case not covered in _check_free_stars(): Jumper won't jump because the
-	# tank is almost empty and the next star is not scoopable but another 
-	# nearby star could be used to re-fill but was already visited.
-	# Solution: Make a detour to the scoopable star, re-fill, fly back and make 
-	# the jump. However, this shall be done JUST for regular jumps and the 
-	# minimum number of jumps with full tank must be three.
-	# ATTENTION: Just stars in regular jump distance will be considered for 
-	# refill!
-	# For the time being, the if-condition in _check_free_stars() which calls
-	# this function will never be triggered, will this function also never be
-	# used (see also comment in _check_free_stars()).
-	def _refill_at_nearest_scoopable(self, point_of_origin):
-		for name in self.reachable[0]:
-			next_star = self.all_nodes[name]
-			if next_star.scoopable:
-				this = (point_of_origin, name, point_of_origin)
-				self.jumper.scoop_stops.append(this)
-				this = 'Refill needed at {}! '.format(point_of_origin)
-				that = 'Jump to {} and back to {}.'.format(name, point_of_origin)
-				self.jumper.notes.append(this + that)
-
-				return True
-
-		# If no scoopable star is near, the jumper is stuck.
-		return False
-
-
-	# This is basically the method called on each node-instance if the 
-	# node houses a jumper.
-	# this is the heart of the algorithm to explore the network of stars to 
-	# find a route.
-	def _send_jumpers(self, this_distance):
-		# The .can_jump_to attribute is set when ._check_free_stars() is 
-		# called in additional_functions.py => get_nodes_that_can_send_jumpers() 
-		# which is called at the start of the while-loop in explore_path() in
-		# additional_functions.py.
-		for name in self.can_jump_to:
-			new_jumper = deepcopy(self.jumper)
-			new_jumper.visited_systems.append(name)
-			new_jumper._add_jump_types(this_distance)
-
-			next_star = self.all_nodes[name]
-			next_star_data = next_star.data
-			distance = self._this_distance(next_star_data)
-			new_jumper.distances.append(distance)
-
-			# Another condition that is of little use as long the information
-			# about scoopability is not available for all systems in EDSM.
-			if next_star.scoopable:
-				new_jumper.jumps_left = deepcopy(new_jumper.max_jumps)
-			else:
-				new_jumper.jumps_left -= 1
-
-			next_star.jumper = new_jumper
-			next_star.visited = True
+			self.add_reachable(name, data)
+
+
+	# Adds the star < name > to self.reachable if it can be reached. This is 
+	# also used if stars are added later, see additional_functions.py => 
+	# add_stars().
+	def add_reachable(self, name, data):
+		# Don't do all the calculations if the star couldn't be 
+		# reached anyway.
+		# ATTENTION: Since the sphere around this node is smaller than the 
+		# square box the below calculations still need to take care of 
+		# case that a star is in the box but outside maximum jumping 
+		# distance. This is implemented below.
+		if not self._in_box(data):
+			return
+
+		distance = self._this_distance(data)
+
+		# The cube contains volumes outside the sphere of the maximum
+		# jump range around a node. Don't do anything if another star falls
+		# into such an area.
+		# Remember that the last element in self.jump_distances is the 
+		# jump distance for neutron boosted jumps.
+		if not self.neutron and distance > self.jump_distances[-2]:
+			return
+		elif distance > self.jump_distances[-1]:
+			return
+
+		# ATTENTION: self.jump_distances contains zero as the first 
+		# element to make this if-condition possible. Thus it is ONE 
+		# element longer (!) than self.reachable and ...
+		for i in range(len(self.jump_distances) - 1):
+			# ... the element with index (i + 1) in self.jump_distances 
+			# corresponds to ...
+			if self.jump_distances[i] <= distance and \
+							distance < self.jump_distances[i + 1]:
+				# ... element i in self.reachable.
+				self.reachable[i].append(name)
+
+
+
+
+
+# The nodes as created by additional_functions.py => create_nodes() are the
+# "prepared graph". The pathfinding algorithm shall not change them, because
+# otherwise I would need fresh copies of all of them for each try.
+# This class takes the nodes once and keeps just what the algorithm needs in
+# plain lists. Each star gets an index and the names in Node.reachable are
+# translated into these indice.
+# ATTENTION: Nothing in here is changed during a search. Everything that
+# changes during a search is in class SearchState.
+class Graph(object):
+	# < all_nodes > is the dict with all the (pristine) nodes.
+	def __init__(self, all_nodes):
+		self.names = list(all_nodes.keys())
+		self.index = {name:i for i, name in enumerate(self.names)}
+
+		nodes = [all_nodes[name] for name in self.names]
+		self.neutron = [node.neutron for node in nodes]
+		self.scoopable = [node.scoopable for node in nodes]
+		self.coords = [(node.data['x'], node.data['y'], node.data['z']) \
+															for node in nodes]
+
+		# All nodes have the same jump distances. See comment to
+		# class Node => __init__() why this is one longer than the number of
+		# "bands" in Node.reachable.
+		if nodes:
+			self.jump_distances = nodes[0].jump_distances
+		else:
+			self.jump_distances = [0]
+		self.bands = len(self.jump_distances) - 1
+
+		index = self.index
+		self.reachable = [[[index[name] for name in band] for band in \
+											node.reachable] for node in nodes]
+
+		# Element [this_distance][i] is the same for all stars that are 
+		# connected with each other (somehow) if just jumps up to 
+		# < this_distance > are done. See lowest_connecting_band().
+		self.components = self._label_components()
+
+		# See incoming().
+		self.reached_from = None
+		# See spanning_tree.py => bottleneck(). Also created just when needed.
+		self.spanning_tree = None
+
+
+	# Each "band" adds more jumps, hence the groups of connected stars are 
+	# just getting larger. So one UnionFind instance is enough and its 
+	# state is written down after each band.
+	# ATTENTION: This doesn't care about the direction of a jump (neutron 
+	# stars reach further than other stars). Hence, if two stars are in the 
+	# same group it is not sure that a route exists, but if they aren't, 
+	# no route exists for sure.
+	def _label_components(self):
+		size = len(self.names)
+		components = UnionFind(size)
+		labels = []
+		for this_distance in range(self.bands):
+			for i in range(size):
+				for j in self.reachable[i][this_distance]:
+					components.union(i, j)
+			labels.append([components.find(i) for i in range(size)])
+
+		return labels
+
+
+	# The lowest "band" (see class Node) with which the stars with index < i > 
+	# and < j > are connected. None if not even neutron boosts connect them.
+	def lowest_connecting_band(self, i, j):
+		for this_distance, labels in enumerate(self.components):
+			if labels[i] == labels[j]:
+				return this_distance
+
+
+	# For searching "backwards" from the final star it is necessary to know 
+	# from which stars a star can be reached. Mostly that are the same stars 
+	# that can be reached from it, but neutron stars reach further.
+	# This is just created when needed, and just once. It looks like 
+	# self.reachable, just that element [j][this_distance] contains the 
+	# stars that can reach star j with that jump distance.
+	def incoming(self):
+		if self.reached_from is not None:
+			return self.reached_from
+
+		size = len(self.names)
+		self.reached_from = [[[] for j in range(self.bands)] for i in range(size)]
+		for i in range(size):
+			for this_distance in range(self.bands):
+				for j in self.reachable[i][this_distance]:
+					self.reached_from[j][this_distance].append(i)
+
+		return self.reached_from
+
+
+	# The distance between the stars with index < i > and < j >.
+	def distance(self, i, j):
+		x_0, y_0, z_0 = self.coords[i]
+		x_1, y_1, z_1 = self.coords[j]
+
+		return sqrt((x_1 - x_0)**2 + (y_1 - y_0)**2 + (z_1 - z_0)**2)
+
+
+
+
+
+
+# Union-find (a.k.a. disjoint sets) over the indice of the stars. It keeps 
+# track which stars are connected with each other (somehow, maybe via many 
+# other stars). See spanning_tree.py for what it is used for.
+class UnionFind(object):
+	def __init__(self, size):
+		self.parent = list(range(size))
+		self.size = [1] * size
+
+
+	# The "root" of the group star < i > belongs to. Two stars are connected 
+	# if they have the same root.
+	def find(self, i):
+		parent = self.parent
+		root = i
+		while parent[root] != root:
+			root = parent[root]
+
+		# Each star on the way gets the root as parent to make the next 
+		# find() faster.
+		while parent[i] != root:
+			parent[i], i = root, parent[i]
+
+		return root
+
+
+	# Connects the groups of < i > and < j >. Returns False if they were 
+	# connected already.
+	def union(self, i, j):
+		i = self.find(i)
+		j = self.find(j)
+		if i == j:
+			return False
+
+		# The smaller group is attached to the larger one to keep the way to 
+		# the root short.
+		if self.size[i] < self.size[j]:
+			i, j = j, i
+		self.parent[j] = i
+		self.size[i] += self.size[j]
 
 		return True
 
@@ -263,10 +319,173 @@ class Node(object):
 
 
 
-# This is instantiated once and set at the starting node. If a node can send
-# out jumpers, it deepcopies its jumper and sets the new jumper to the nodes to 
-# be visited. This wil be the jump itself. Certain attributes of the new jumper 
-# will be changed to accomodate for the fact that a jump took place.
+# Everything that is changed during one try to find a path. Each list has one
+# element per star, the index being the one from class Graph.
+# Starting a new try means just to reset these lists, which is much faster
+# than deepcopying all nodes.
+# 
+# Earlier versions sent a deepcopy of the whole jumper (with all the systems 
+# visited so far) to each reached star. That meant copying longer and longer 
+# lists with each jump. Now each reached star just remembers from which star 
+# it was reached and what that cost. The actual route is build from these 
+# "pointers" by make_jumper() and just for the final result(s).
+class SearchState(object):
+	def __init__(self, graph, max_jumps = 4):
+		self.size = len(graph.names)
+		self.bands = graph.bands
+		# Number of jumps without re-fueling.
+		self.max_jumps = max_jumps
+		self.reset()
+
+
+	# Called before each try.
+	def reset(self):
+		size = self.size
+		# If a system was visited by a jumper it shall not be visited again.
+		self.visited = [False] * size
+		# The index of the star from which a star was reached and the index
+		# of the list in Node.reachable (the "jump distance") that was used 
+		# for that jump. The start has -1 for both.
+		self.parent = [-1] * size
+		self.band = [-1] * size
+		# What it cost to get to a star. Each element is a tuple with 
+		# (number of systems visited, grade 1 boosts, grade 2 boosts, 
+		# grade 3 boosts, neutron boosts).
+		self.cost = [None] * size
+		# This is the number of jumps "left in the tank" after a jump took place.
+		self.jumps_left = [0] * size
+		# This will be filled when check_free_stars() in find_route.py is
+		# called. It will contain the indice of the systems which have not yet
+		# been visited and which are within a given jump range.
+		self.can_jump_to = [[] for i in range(size)]
+		# Additional information like jumps on fumes or refill stops. Just a 
+		# few stars will ever have some, hence a dict. Each element is a list 
+		# of tuples with the name of the Jumper attribute and the value to 
+		# append to it.
+		self.notes = {}
+		# How many of the notes of the parent star were already there when a 
+		# star was reached. Later notes of the parent belong to other routes.
+		self.inherited_notes = [0] * size
+		# How many times a star sent jumpers. Just to see how much work was 
+		# needed.
+		self.expanded = 0
+		# How many rounds of jumps were done in find_route.py => 
+		# explore_path(). Dito.
+		self.waves = 0
+		# All stars in the order they were reached. A star may be in here 
+		# more than once if several jumpers reached it in the same round.
+		self.reached = []
+		# The stars that may still be able to send jumpers, one set for each 
+		# jump distance. The last one is for neutron stars, which always use 
+		# the neutron boosted jump distance. See find_route.py => 
+		# get_nodes_that_can_send_jumpers() how these are used.
+		self.frontier = [set() for band in range(self.bands + 1)]
+		# How much of < reached > was already put into each of the sets in 
+		# < frontier >.
+		self.frontier_position = [0] * (self.bands + 1)
+
+
+	# The jumper is set at the start node.
+	def start_at(self, i):
+		self.visited[i] = True
+		self.reached.append(i)
+		self.cost[i] = (1, 0, 0, 0, 0)
+		self.jumps_left[i] = self.max_jumps
+
+
+	# The jump itself from star < i > to star < j >. 
+	# < this_distance > is the index of the list in Node.reachable.
+	# < jumps_left > is the fuel in the tank after the jump.
+	def jump(self, i, j, this_distance, jumps_left):
+		jumps, level_1, level_2, level_3, neutrons = self.cost[i]
+		boost_type = jump_type(this_distance)
+
+		if boost_type == 'neutron':
+			neutrons += 1
+		elif '1' in boost_type:
+			level_1 += 1
+		elif '2' in boost_type:
+			level_2 += 1
+		elif '3' in boost_type:
+			level_3 += 1
+
+		self.visited[j] = True
+		self.reached.append(j)
+		self.parent[j] = i
+		self.band[j] = this_distance
+		self.cost[j] = (jumps + 1, level_1, level_2, level_3, neutrons)
+		self.jumps_left[j] = jumps_left
+		self.inherited_notes[j] = len(self.notes.get(i, []))
+
+
+	# Remember additional information for the route(s) going through star < i >.
+	# < attribute > is the name of the list in class Jumper < value > shall 
+	# be appended to.
+	def add_note(self, i, attribute, value):
+		self.notes.setdefault(i, []).append((attribute, value))
+
+
+	# Follows the pointers from star < i > back to the start and creates the 
+	# class Jumper instance with the complete route.
+	def make_jumper(self, graph, i):
+		route = [i]
+		while self.parent[route[-1]] != -1:
+			route.append(self.parent[route[-1]])
+		route.reverse()
+
+		jumper = Jumper(graph.names[route[0]], self.max_jumps)
+		jumper.jumps_left = self.jumps_left[i]
+
+		for k in range(len(route)):
+			this = route[k]
+			if k > 0:
+				previous = route[k - 1]
+				jumper.visited_systems.append(graph.names[this])
+				jumper._add_jump_types(self.band[this])
+				jumper.distances.append(graph.distance(previous, this))
+
+			notes = self.notes.get(this, [])
+			if k < len(route) - 1:
+				notes = notes[:self.inherited_notes[route[k + 1]]]
+
+			for attribute, value in notes:
+				getattr(jumper, attribute).append(value)
+
+		return jumper
+
+
+
+
+
+
+# I want the type of jump to be written in a certain way. Hence, this 
+# function.
+def jump_type(this_distance):
+	boost_type = int(this_distance/2)
+	# The right hand expression evaluates to True or False, and yes, that 
+	# can be done this way.
+	# < + 1 > because this_distance starts counting at zero, and every
+	# second distance type is on fumes (every number in 
+	# class Node => .jump_distances with an even index).
+	on_fumes = (this_distance + 1) % 2 == 0
+	neutron_boosted = (this_distance + 1) % 9 == 0
+
+	jump_types = 'B{}'.format(boost_type)
+
+	if on_fumes:
+		jump_types = jump_types + 'F'
+	elif neutron_boosted:
+		jump_types = 'neutron'
+
+	return jump_types
+
+
+
+
+
+
+# This holds a complete route. It is created by SearchState.make_jumper() for 
+# the final result(s) of a search.
 class Jumper(object):
 	def __init__(self, visited_systems, max_jumps):
 		# The list with all the systems visited by this jumper. This is what
@@ -297,26 +516,9 @@ class Jumper(object):
 		self.distances = [0]
 
 
-	# I want the type of jump to be written in a certain way. Hence, this 
-	# function.
+	# See jump_type() above.
 	def _add_jump_types(self, this_distance):
-		boost_type = int(this_distance/2)
-		# The right hand expression evaluates to True or False, and yes, that 
-		# can be done this way.
-		# < + 1 > because this_distance starts counting at zero, and every
-		# second distance type is on fumes (every number in 
-		# class Node => .jump_distances with an even index).
-		on_fumes = (this_distance + 1) % 2 == 0
-		neutron_boosted = (this_distance + 1) % 9 == 0
-
-		jump_types = 'B{}'.format(boost_type)
-
-		if on_fumes:
-			jump_types = jump_types + 'F'
-		elif neutron_boosted:
-			jump_types = 'neutron'
-
-		self.jump_types.append(jump_types)
+		self.jump_types.append(jump_type(this_distance))
 
 
 
@@ -0,0 +1,285 @@
+#    "command_line" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Running the program without the gui: < gap_jumper.py no_gui ... > does the 
+# same as pressing the buttons of the gui from top to bottom (see 
+# additional_functions.py => get_arguments() for all the options). 
+# The engine (see engine.py) does the work, this file just turns the command
+# line arguments into its settings and prints what it finds.
+
+from time import time
+import json
+import logging
+import os
+import pickle
+import urllib.error
+import urllib.request
+import additional_functions as af
+import corridor_cache as cc
+import engine as en
+import instruments as ins
+import name_index as ni
+import procedural_names as pn
+
+
+# Start and end can be given by name. This returns the coordinates of 
+# the system called < name > as a dict, or None if it is unknown. See 
+# screen_input.py => _system_name_error() for the same in the gui.
+# If the position is estimated from the name and < estimated > is given (see 
+# engine.Settings.estimated_systems), it is put in there with < which > 
+# ('start' or 'end') as key, so that the search looks for the real position.
+def coords_of(name, which = None, estimated = None):
+	system = ni.find_system(name)
+	if system:
+		if pn.plausible_from_index(system[0], system[2]) is False:
+			this = 'ATTENTION: The coordinates of the system "{}" are not '.format(system[0])
+			that = 'where its name says. They may be wrong in EDSM.'
+			print(this + that)
+
+		return system[2]
+
+	# Systems that are not in the index may still have a name that says 
+	# where they are (see procedural_names.py).
+	position = pn.estimate_from_index(name)
+	if position:
+		coords, uncertainty = position
+		this = 'The system "{}" is unknown, its position was estimated '.format(name)
+		that = 'from its name to within {:.0f} ly.'.format(uncertainty)
+		print(this + that)
+
+		if estimated is not None:
+			estimated[which] = (name, coords, uncertainty)
+
+		return coords
+
+	this = 'ATTENTION: The system "{}" is unknown.'.format(name)
+	suggestions = ni.systems_starting_with(name)
+	if suggestions:
+		that = ' Did you mean: {}?'.format(', '.join(system[0] for \
+													system in suggestions))
+	else:
+		that = ' The names of all systems are known after the stars were '
+		that = that + 'searched once with --starsfile.'
+	print(this + that)
+
+
+# The settings for the engine from the command line arguments < args >.
+# Returns None if start or end are unknown.
+def settings_from(args):
+	settings = en.Settings()
+
+	jumprange = args.jumprange
+	on_fumes = args.range_on_fumes or jumprange
+	# See screen_input.py => _continue_action().
+	settings.jumpable_distances = [0] + [x*y for x in [1, 1.25, 1.5, 2.0] \
+							for y in [jumprange, on_fumes]] + [jumprange * 4]
+
+	if args.startcoords:
+		settings.start_coords = dict(zip('xyz', args.startcoords))
+	else:
+		settings.start_coords = coords_of(args.start_system, 'start', \
+													settings.estimated_systems)
+
+	if args.destcoords:
+		settings.end_coords = dict(zip('xyz', args.destcoords))
+	else:
+		settings.end_coords = coords_of(args.dest_system, 'end', \
+													settings.estimated_systems)
+
+	if not settings.start_coords or not settings.end_coords:
+		return None
+
+	settings.neutron_boosting = args.neutron_boosting
+	settings.neutron_file_ok = af.neutron_file_ok()
+	# The stars are searched online if no file is given.
+	settings.offline_mode = bool(args.starsfile)
+	settings.starsfile = args.starsfile
+	settings.cached = args.cached
+	settings.streaming = args.streaming
+	settings.max_tries = args.max_tries
+	settings.patience = args.patience
+	settings.time_budget = args.time_budget
+	settings.seed = args.seed
+	settings.search_mode = args.algorithm
+	settings.corridor = cc.corridor_of(settings.start_coords, \
+				settings.end_coords, settings.offline_mode, settings.starsfile)
+
+	return settings
+
+
+# With --cached the stars are taken from the cache or the stars-file (see 
+# screen_input.py => _cached_file_error() for the same in the gui). 
+# Returns False if there are none.
+def use_cached_stars(settings):
+	stars, how = cc.find_stars(settings.corridor)
+	if stars is not None:
+		with open('./stars', 'wb') as f:
+			pickle.dump(stars, f)
+
+		print("The stars for this route were found in the cache.")
+		return True
+
+	if not os.path.isfile('./stars'):
+		return False
+
+	this = "ATTENTION: The stars for this route are not in the cache. The "
+	that = "stars-file of the last run is used, which may be from another route."
+	print(this + that)
+
+	return True
+
+
+# Prints a found route in the same way as the gui does.
+# < results > is what engine.py => Engine.results() returns.
+def print_results(results):
+	print("\nStart at: {}\n  End at: {}".format(results['start'], results['end']))
+	print("Number of stars considered: {}\n".format(results['stars_considered']))
+
+	af.print_jumper_information(results['route'])
+
+	if results['neutron_boosting'] and results['way_back']:
+		print("You will be able to get back. Below is ONE possible way back.")
+		af.print_jumper_information(results['way_back'])
+	elif results['neutron_boosting']:
+		print("ATTENTION: No way back could be found.")
+
+	if results['alternatives']:
+		af.print_alternatives(results['alternatives'])
+
+
+# Asks the server (see route_server.py) on < port > for the route instead
+# of doing it all here. Returns the exit code like main().
+def ask_server(port, settings):
+	query = {'start':settings.start_coords, 'end':settings.end_coords}
+	# The server takes the jump ranges, see batch.py => prepare_queries().
+	query['jumprange'] = settings.jumpable_distances[1]
+	query['range_on_fumes'] = settings.jumpable_distances[2]
+	query['neutron_boosting'] = settings.neutron_boosting
+	query['algorithm'] = settings.search_mode
+
+	url = 'http://127.0.0.1:{}/route'.format(port)
+	request = urllib.request.Request(url, data = json.dumps(query).encode('utf-8'), \
+								headers = {'Content-Type':'application/json'})
+	try:
+		with urllib.request.urlopen(request) as f:
+			results = json.load(f)
+	except urllib.error.HTTPError as error:
+		print("ATTENTION: {}".format(json.load(error)['error']))
+		return 1
+	except urllib.error.URLError as error:
+		print("ATTENTION: No server on port {} ({}).".format(port, error.reason))
+		return 1
+
+	if results['error']:
+		print("ATTENTION: {}".format(results['error']))
+		return 1
+
+	logging.info("The server answered after %.3f seconds.", results['seconds'])
+	print_results(results)
+
+	return 0
+
+
+# Where the time went (see instruments.py), if asked for with 
+# --instruments and --summary.
+def report(args):
+	if args.instruments:
+		ins.export(args.instruments)
+	if args.summary:
+		print('\n' + ins.summary())
+
+
+# Does it all. < args > are the command line arguments as returned by 
+# additional_functions.py => get_arguments(). < started > is when the 
+# program was started (see gap_jumper.py).
+# Returns the exit code, which is 0 if a route was found.
+def main(args, started = None):
+	if args.verbose:
+		logging.basicConfig(level = logging.INFO)
+		if started:
+			logging.info("Ready after %.2f seconds.", time() - started)
+
+	settings = settings_from(args)
+	if not settings:
+		return 1
+
+	if args.server:
+		return ask_server(args.server, settings)
+
+	# The pathfinding algorithms tell each route they find, the last one
+	# is the final one.
+	found = []
+	progress = lambda channel, text: logging.info("%s: %s", channel, text)
+	engine = en.Engine(settings, progress, found.append)
+
+	if settings.neutron_boosting and not settings.neutron_file_ok:
+		engine.download_neutron_file().wait()
+		if not settings.neutron_file_ok:
+			print("ATTENTION: The neutron-stars file could not be downloaded.")
+			return 1
+
+	if settings.cached and use_cached_stars(settings):
+		engine.create_nodes().wait()
+	else:
+		if settings.cached:
+			print("No cached stars found, searching them.")
+
+		if settings.offline_mode and not os.path.isfile(settings.starsfile):
+			print("ATTENTION: {} could not be found.".format(settings.starsfile))
+			return 1
+
+		engine.search_stars().wait()
+		if not settings.streaming:
+			engine.create_nodes().wait()
+
+	if not engine.pristine_nodes:
+		print("ATTENTION: No stars were found between start and end.")
+		return 1
+
+	# The stars and the nodes are there already, if they were made just now.
+	load = engine.stars is None
+	engine.find_path(load).wait()
+
+	if not found:
+		return 1
+
+	print_results(found[-1])
+
+	return 0
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,381 @@
+#    "corridor_cache" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Finding the relevant stars and preparing the nodes takes a lot of time. 
+# The files < ./stars > and < ./all_nodes > are just for the last route, 
+# thus switching between two routes meant to do all of it again.
+# Hence, the results are also kept in a directory ("the cache"). Each 
+# corridor (the "tube" around the line between start and end, see 
+# find_systems_offline.py) gets its own files, named after a hash of 
+# everything that decides which stars are in it: start, end, where the stars
+# came from (offline or online) and which version of the data was used.
+# The nodes also depend on the jump distances and if neutron boosting is 
+# used, thus they get their own files per corridor.
+# If a corridor lies completely inside of a corridor in the cache, the 
+# stars are taken from the latter instead of searching them again.
+# If the cache gets too large, the entries that were not used for the 
+# longest time are deleted.
+
+from datetime import date
+from hashlib import sha1
+from math import sqrt
+from time import time
+import json
+import os
+import pickle
+import find_systems_offline as off
+
+cache_directory = './cache'
+# See adjacency_tiles.py.
+tiles_directory = os.path.join(cache_directory, 'tiles')
+# In bytes.
+size_budget = 2 * 1024**3
+# See find_systems_offline.py => distance_within_500_Ly_from_line().
+corridor_radius = 500
+# Coordinates are typed in by hand, thus a bit of rounding (in ly) is ok 
+# when checking if two lines are the same.
+tolerance = 1e-3
+
+# Where the stars come from and which version of the data it is. For the 
+# dump it is its name, size and when it was changed. The online data changes
+# all the time, thus each day is a new version.
+def corridor_of(start_coords, end_coords, offline_mode, starsfile):
+	if offline_mode and starsfile and os.path.isfile(starsfile):
+		source = 'offline'
+		version = '{}:{}:{}'.format(os.path.basename(starsfile), \
+			os.path.getsize(starsfile), int(os.path.getmtime(starsfile)))
+	elif offline_mode:
+		source = 'offline'
+		version = None
+	else:
+		source = 'online'
+		version = date.today().isoformat()
+
+	return start_coords, end_coords, source, version
+
+
+
+def _key(*things):
+	text = json.dumps(things, sort_keys = True)
+
+	return sha1(text.encode('utf-8')).hexdigest()[:20]
+
+
+
+def _path(name):
+	return os.path.join(cache_directory, name)
+
+
+
+# All entries (as the dicts in the .json files) in the cache.
+def _entries():
+	if not os.path.isdir(cache_directory):
+		return []
+
+	entries = []
+	for name in os.listdir(cache_directory):
+		if not name.endswith('.json'):
+			continue
+
+		try:
+			with open(_path(name), 'r') as f:
+				entries.append(json.load(f))
+		except (OSError, ValueError):
+			continue
+
+	return entries
+
+
+
+def _save_entry(entry):
+	with open(_path(entry['key'] + '.json'), 'w') as f:
+		json.dump(entry, f)
+
+
+
+# Marks an entry as used just now, see evict().
+def _touch(entry):
+	entry['used'] = time()
+	_save_entry(entry)
+
+
+
+# The distance of < point > from the line through < start > and < end >. All
+# of them as (x, y, z).
+def _distance_from_line(point, start, end):
+	d_x, d_y, d_z = [b - a for a, b in zip(start, end)]
+	t_x, t_y, t_z = [p - a for a, p in zip(start, point)]
+	# The length of the cross product of the two vectors is the area of the 
+	# parallelogram they span, divide it by the length of the line and one 
+	# gets the height.
+	cross = (d_y * t_z - d_z * t_y, d_z * t_x - d_x * t_z, d_x * t_y - d_y * t_x)
+
+	return sqrt(sum(c**2 for c in cross)) / sqrt(d_x**2 + d_y**2 + d_z**2)
+
+
+
+def _as_tuple(coords):
+	return (coords['x'], coords['y'], coords['z'])
+
+
+
+# True if each star that would be searched for the corridor from < start > to
+# < end > is also in the corridor of the cache < entry >. 
+# The corridor is the box with the limits from off.x_y_z_limits() cut with 
+# the tube around the line. If the box is inside the other box, the new 
+# tube just needs to be inside the other tube within the new box. The 
+# distance from the other line along the new line is largest at one of 
+# the ends, thus just these need to be checked.
+def _contains(entry, start, end):
+	start = _as_tuple(start)
+	end = _as_tuple(end)
+	other_start = _as_tuple(entry['start'])
+	other_end = _as_tuple(entry['end'])
+	if start == end or other_start == other_end:
+		return False
+
+	maximum, minimum = off.x_y_z_limits(entry['start'], entry['end'])
+	this_maximum, this_minimum = off.x_y_z_limits(dict(zip('xyz', start)), \
+													dict(zip('xyz', end)))
+	for axis in range(3):
+		if this_minimum[axis] < minimum[axis] or \
+									this_maximum[axis] > maximum[axis]:
+			return False
+
+	# How far along the new line the new box goes, ...
+	direction = [b - a for a, b in zip(start, end)]
+	length = sqrt(sum(d**2 for d in direction))
+	unit = [d / length for d in direction]
+	corners = [(x, y, z) for x in (this_minimum[0], this_maximum[0]) for y in \
+			(this_minimum[1], this_maximum[1]) for z in (this_minimum[2], \
+														this_maximum[2])]
+	along = [sum(u * (c - s) for u, c, s in zip(unit, corner, start)) for \
+														corner in corners]
+
+	# ... and how far from the other line the new line is at these ends.
+	radius = entry.get('radius', corridor_radius)
+	for this in (min(along), max(along)):
+		point = [s + this * u for s, u in zip(start, unit)]
+		if _distance_from_line(point, other_start, other_end) + \
+									corridor_radius > radius + tolerance:
+			return False
+
+	return True
+
+
+
+# The stars of the cached corridor that are also in the new corridor.
+def _filter_stars(stars, start, end):
+	maximum, minimum = off.x_y_z_limits(start, end)
+	relevant = {}
+	for name, data in stars.items():
+		inside = all(minimum[axis] <= data[this] <= maximum[axis] for axis, \
+										this in enumerate(['x', 'y', 'z']))
+		if inside and off.distance_within_500_Ly_from_line(start, end, data):
+			relevant[name] = data
+
+	return relevant
+
+
+
+# Puts the stars found for a corridor into the cache.
+# < corridor > is what corridor_of() returns.
+def store_stars(corridor, stars):
+	start_coords, end_coords, source, version = corridor
+	if version is None:
+		return
+
+	os.makedirs(cache_directory, exist_ok = True)
+	key = _key(start_coords, end_coords, source, version)
+	with open(_path(key + '.stars'), 'wb') as f:
+		pickle.dump(stars, f)
+
+	entry = {'key':key, 'start':start_coords, 'end':end_coords, \
+			'radius':corridor_radius, 'source':source, 'version':version, \
+								'stars':len(stars), 'created':time()}
+	_touch(entry)
+	evict()
+
+
+
+# The stars for a corridor from the cache. Returns (stars, how), with < how >
+# being 'exact' if exactly this corridor was cached or 'contained' if the
+# stars were taken from a larger corridor. (None, None) if nothing fits.
+def find_stars(corridor):
+	start_coords, end_coords, source, version = corridor
+	if version is None:
+		return None, None
+
+	key = _key(start_coords, end_coords, source, version)
+	entries = [entry for entry in _entries() if entry['source'] == source \
+										and entry['version'] == version]
+	for entry in entries:
+		if entry['key'] == key and os.path.isfile(_path(key + '.stars')):
+			with open(_path(key + '.stars'), 'rb') as f:
+				stars = pickle.load(f)
+			_touch(entry)
+			return stars, 'exact'
+
+	# The stars found online are not in a tube but in cubes along the line 
+	# (see find_systems_online.py), thus just the dump can be used this way.
+	if source != 'offline':
+		return None, None
+
+	containing = [entry for entry in entries if _contains(entry, start_coords, \
+				end_coords) and os.path.isfile(_path(entry['key'] + '.stars'))]
+	if not containing:
+		return None, None
+
+	# The smallest one has the fewest stars to look at.
+	entry = min(containing, key = lambda entry: entry['stars'])
+	with open(_path(entry['key'] + '.stars'), 'rb') as f:
+		stars = _filter_stars(pickle.load(f), start_coords, end_coords)
+	_touch(entry)
+	store_stars(corridor, stars)
+
+	return stars, 'contained'
+
+
+
+# The nodes file also depends on which stars the nodes were made from. 
+# Otherwise nodes made from other stars (e.g. an old stars-file) would be 
+# taken for the corridor later on.
+def _nodes_file(corridor, jump_distances, neutron_boosting, stars):
+	start_coords, end_coords, source, version = corridor
+	key = _key(start_coords, end_coords, source, version)
+	names = _key(sorted(stars))
+
+	return _path('{}-{}.nodes'.format(key, _key(jump_distances, \
+													neutron_boosting, names)))
+
+
+
+# Dito for the prepared nodes (see additional_functions.py => create_nodes()).
+# < stars > are the ones the < nodes > were made from.
+def store_nodes(corridor, jump_distances, neutron_boosting, nodes, stars):
+	if corridor[3] is None or not os.path.isdir(cache_directory):
+		return
+
+	# Just in case, each star must have its node and the other way round.
+	if len(nodes) != len(stars) or any(name not in stars for name in nodes):
+		return
+
+	# The nodes for the same stars are the same, thus they are not written
+	# again if they were taken from the cache.
+	path = _nodes_file(corridor, jump_distances, neutron_boosting, stars)
+	if os.path.isfile(path):
+		return
+
+	with open(path, 'wb') as f:
+		pickle.dump(nodes, f)
+
+	evict()
+
+
+
+# The prepared nodes for the < stars > of a corridor, or None.
+def find_nodes(corridor, jump_distances, neutron_boosting, stars):
+	if corridor[3] is None:
+		return
+
+	path = _nodes_file(corridor, jump_distances, neutron_boosting, stars)
+	if not os.path.isfile(path):
+		return
+
+	with open(path, 'rb') as f:
+		nodes = pickle.load(f)
+
+	key = os.path.basename(path).split('-')[0]
+	for entry in _entries():
+		if entry['key'] == key:
+			_touch(entry)
+
+	return nodes
+
+
+
+# Deletes the entries that were not used for the longest time (with all 
+# their files) until the cache is smaller than < budget > bytes.
+# The tiles (see adjacency_tiles.py) count, too. All corridors share them, 
+# thus they are one "entry" that was last used when they were changed.
+def evict(budget = size_budget):
+	if not os.path.isdir(cache_directory):
+		return
+
+	sizes = {}
+	for name in os.listdir(cache_directory):
+		# The tiles have their own directory, see below.
+		if not os.path.isfile(_path(name)):
+			continue
+
+		key = name.split('.')[0].split('-')[0]
+		sizes[key] = sizes.get(key, 0) + os.path.getsize(_path(name))
+
+	# Files without a .json file are leftovers and go first.
+	used = {entry['key']:entry['used'] for entry in _entries()}
+
+	tiles = []
+	if os.path.isdir(tiles_directory):
+		tiles = [os.path.join(tiles_directory, name) for name in \
+											os.listdir(tiles_directory)]
+	# No entry has this key, they are all hex numbers.
+	if tiles:
+		sizes['tiles'] = sum(os.path.getsize(path) for path in tiles)
+		used['tiles'] = max(os.path.getmtime(path) for path in tiles)
+
+	total = sum(sizes.values())
+	for key in sorted(sizes, key = lambda key: used.get(key, 0)):
+		if total <= budget:
+			break
+
+		if key == 'tiles':
+			paths = tiles
+		else:
+			paths = [_path(name) for name in os.listdir(cache_directory) if \
+						name.split('.')[0].split('-')[0] == key and \
+											os.path.isfile(_path(name))]
+
+		for path in paths:
+			# The tiles may be open right now, which Windows doesn't allow.
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+		total -= sizes[key]
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,556 @@
+#    "engine" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# All the actual work (finding the stars, preparing the nodes and finding a 
+# path) without anything of the gui. The gui (see screen_work.py) just 
+# checks the input, tells the engine what to do and shows what the engine 
+# tells it. The same can be done without a gui, e.g. from the command line.
+# 
+# While working, the engine tells what it is doing with a short text for 
+# each "channel": 'neutron' (downloading the neutron-stars file), 
+# 'star_search', 'create_nodes', 'pathfinding' and 'pathfinding_button'. 
+# These are the labels (and one button) of the work screen.
+# Once a route was found, the results are given out as plain dicts, see 
+# results().
+
+import pickle
+import threading
+import additional_functions as af
+import corridor_cache as cc
+import find_route as fr
+import find_systems_offline as off
+import find_systems_online as on
+import parallel_tries as pt
+import pipeline as pl
+import router as ro
+
+
+# The settings the engine needs. The gui uses the class Motherwindow instance
+# instead, which has the same attributes. See there what they mean.
+class Settings(object):
+	def __init__(self):
+		self.jumpable_distances = None
+		self.start_coords = None
+		self.end_coords = None
+		self.neutron_boosting = False
+		self.neutron_file_ok = False
+		self.offline_mode = True
+		self.starsfile = None
+		self.cached = False
+		self.streaming = False
+		self.corridor = None
+		self.max_tries = 23
+		self.patience = None
+		self.time_budget = None
+		self.seed = None
+		self.search_mode = 'astar'
+		self.estimated_systems = {}
+		self.exiting = threading.Event()
+
+
+
+
+
+
+class Engine(object):
+	# < settings > is a class Settings (or Motherwindow) instance.
+	# < progress > is a function that is called with the channel and the 
+	# text whenever the engine tells what it is doing. 
+	# < found > is a function that is called with what results() returns 
+	# whenever a route was found.
+	# ATTENTION: Both are called from the threads that do the work.
+	def __init__(self, settings, progress = None, found = None):
+		self.settings = settings
+		self.exiting = settings.exiting
+		self.progress = progress
+		self.found = found
+		# All the work is done by jobs in here, see pipeline.py.
+		self.pipeline = pl.Pipeline(self.exiting)
+		# The last text for each channel.
+		self.texts = {}
+
+		# Some attributes that are set to True by specific methods or outside 
+		# functions when certain tasks are carried out and set back to False, 
+		# once these tasks are done. This way one can check if e.g. a search 
+		# is already going on.
+		self.downloading_neutron_file = False
+		self.searching_stars = False
+		self.creating_nodes = False
+		self.preparing_neutron_stars = False
+		self.finding_path = False
+		# These are the "containers" (al of them dicts) that carry specific 
+		# information needed for the the pathfinding algorithm. 
+		self.stars = None
+		self.neutron_stars = None
+		self.pristine_nodes = None
+		self.start_star = None
+		self.end_star = None
+		# If the position of start or end was estimated from its name, the 
+		# real position once it was found in the search (see 
+		# find_systems_offline.py => real_position()).
+		self.real_positions = {}
+		# The final results.
+		self.fewest_jumps_jumper = None
+		self.way_back_jumper = None
+		# Other routes that need more of one kind of boost but less of 
+		# another kind or fewer jumps (see router.py => pareto_search()).
+		self.alternative_jumpers = []
+
+
+	def say(self, channel, text):
+		self.texts[channel] = text
+		if self.progress:
+			self.progress(channel, text)
+
+
+	# What was last said in < channel >.
+	def said(self, channel):
+		return self.texts.get(channel, '')
+
+
+	# Called by the pathfinding algorithms once they found a route. 
+	# < so_far > is True if the algorithm shows the best route so far but is 
+	# still looking for a better one (see router.py => anytime()).
+	def route_found(self, so_far = False):
+		if self.found:
+			self.found(self.results(so_far))
+
+
+	# What was found, see additional_functions.py => route_of() for how a 
+	# route looks like. < 'way_back' > is None if no way back is known 
+	# (which can just happen with neutron boosting).
+	def results(self, so_far = False):
+		results = {}
+		results['start'] = list(self.start_star.keys())[0]
+		results['end'] = list(self.end_star.keys())[0]
+		results['stars_considered'] = len(self.stars)
+		results['neutron_boosting'] = self.settings.neutron_boosting
+		results['so_far'] = so_far
+		results['route'] = af.route_of(self.fewest_jumps_jumper)
+		results['way_back'] = af.route_of(self.way_back_jumper)
+		results['alternatives'] = [af.route_of(alternative) for \
+								alternative in self.alternative_jumpers]
+
+		return results
+
+
+	# Downloads the newest neutron-stars file. Returns the job that does it.
+	def download_neutron_file(self):
+		download = self.pipeline.add('download neutron file', self._download)
+		self.pipeline.add('download progress', \
+							lambda: self._check_download_progress(download))
+
+		return download
+
+
+	def _download(self):
+		on.fetch_neutron_file(self)
+		self.settings.neutron_file_ok = True
+
+
+	# This method checks how far the download of the neutron-stars file has 
+	# come. < download > is the job that does the download.
+	# I unfortunately can NOT check how far the download progress has come
+	# since (as of 2020-01-16) no content length header available for this file.
+	def _check_download_progress(self, download):
+		i = 0
+		while not download.done.is_set():
+			if self.pipeline.stopped():
+				return
+
+			this = "Still Downloading the Neutron Stars file ({} s) ...".format(i)
+			self.say('neutron', this)
+
+			i += 1
+			download.done.wait(1)
+
+		if download.succeeded():
+			self.say('neutron', "Finished downloading the Neutron Stars file.")
+
+
+	# Searches the relevant stars and saves them in the stars-file and the 
+	# cache. In the streaming mode the nodes are prepared, too.
+	# Returns a job that is done once all of this is done.
+	def search_stars(self):
+		start_coords = self.settings.start_coords
+		end_coords = self.settings.end_coords
+
+		# The search function sets < self.searching_stars > to False when it
+		# finishes. It is set here already and not just when the job starts 
+		# so that asking twice can't start two searches.
+		self.searching_stars = True
+
+		if self.settings.streaming:
+			stream = pl.Stream()
+			making = self._prepare_while_searching(stream)
+		else:
+			stream = None
+
+		# off.find_systems_offline puts the dictionary with the relevant 
+		# stars directly into < self.stars > of this class.
+		if self.settings.offline_mode:
+			infile = self.settings.starsfile
+			search = lambda: off.find_systems_offline(start_coords, end_coords, \
+														infile, self, stream)
+		# Use a different function if online mode is activated.
+		else:
+			search = lambda: on.find_systems_online(start_coords, end_coords, \
+																self, stream)
+
+		searching = self.pipeline.add('search stars', \
+									lambda: self._search(search, stream))
+
+		# Once the search is finished, the result shall be saved.
+		store = lambda stars: cc.store_stars(self.settings.corridor, stars)
+		save = lambda found: self._save_information('stars', 'star_search', \
+															'./stars', store)
+		saving = [self.pipeline.add('save stars', save, [searching])]
+
+		# The nodes are saved just if the search finished properly, otherwise 
+		# they were made from some of the stars only.
+		if stream:
+			saving.append(self._save_nodes([searching, making, saving[0]]))
+
+		return self.pipeline.add('stars searched', lambda *done: None, saving)
+
+
+	# The job in search_stars() that calls < search >. The < stream > (if 
+	# there is one) is closed in any case, otherwise _stream_nodes() would 
+	# wait for more stars forever.
+	def _search(self, search, stream):
+		try:
+			search()
+		finally:
+			if stream:
+				stream.close()
+
+
+	# Usually the stars are searched, then saved, then loaded again, and only
+	# then the neutron stars are looked at and the nodes are prepared. In the
+	# streaming mode all of this happens at the same time: the neutron-stars
+	# file is downloaded (if necessary) and read while the search is going on
+	# and the stars found so far are added to the nodes right away (see 
+	# additional_functions.py => add_stars()). Thus, the nodes are ready 
+	# shortly after the search is finished.
+	# < stream > is the pipeline.Stream() the search puts the stars into.
+	# Returns the job that makes the nodes.
+	def _prepare_while_searching(self, stream):
+		self.creating_nodes = True
+
+		this = "The information for the pathfinding algorithm is prepared "
+		that = "while the stars are searched ..."
+		self.say('create_nodes', this + that)
+
+		needs = []
+		if self.settings.neutron_boosting:
+			self.preparing_neutron_stars = True
+
+			fetch = lambda *done: off.collect_neutron_information(self)
+			if self.settings.neutron_file_ok:
+				needs.append(self.pipeline.add('neutron stars', fetch))
+			else:
+				download = self.download_neutron_file()
+				needs.append(self.pipeline.add('neutron stars', fetch, [download]))
+
+		# The stars that are found before the neutron stars are ready just 
+		# wait in the stream.
+		return self.pipeline.add('make nodes', lambda *done: \
+										self._stream_nodes(stream), needs)
+
+
+	# The job in _prepare_while_searching() that makes the nodes from the 
+	# stars in the < stream >.
+	def _stream_nodes(self, stream):
+		jump_distances = self.settings.jumpable_distances
+		stars = {}
+		nodes = {}
+		grid = af.node_grid(stars, jump_distances)
+
+		for found in stream:
+			if self.pipeline.stopped():
+				return
+
+			# The search puts the same dicts into the stream that it saves in
+			# the stars-file and the cache, which shall not know which ship 
+			# was used. Thus the neutron stars are marked in copies (see 
+			# batch.py => nodes_for()).
+			if self.settings.neutron_boosting:
+				found = {name:dict(data) for name, data in found.items()}
+				off.update_stars_with_neutrons(found, self.neutron_stars)
+
+			af.add_stars(nodes, stars, found, jump_distances, grid)
+
+			this = "Prepared the information for the {} stars ".format(len(stars))
+			that = "found so far ..."
+			self.say('create_nodes', this + that)
+
+		this = "Prepared the information for all {} stars.".format(len(stars))
+		self.say('create_nodes', this)
+		af.count_edges(nodes)
+
+		self.pristine_nodes = nodes
+		self.creating_nodes = False
+
+
+	# Prepares the nodes from the stars-file and saves them in the 
+	# all_nodes-file and the cache. Returns a job that is done once all of 
+	# this is done.
+	def create_nodes(self):
+		neutron_boosting = self.settings.neutron_boosting
+
+		self.creating_nodes = True
+
+		this = "Loading the stars file. This may take a while ..."
+		self.say('create_nodes', this)
+
+		loading = self.pipeline.add('load stars', self._load_stars)
+		# Maybe the nodes for exactly these stars and parameters were 
+		# prepared before. This can just be said once the stars are loaded, 
+		# since the stars-file may be from another route.
+		looking = self.pipeline.add('cached nodes', lambda loaded: \
+												self._cached_nodes(), [loading])
+		needs = [looking]
+
+		# The neutron stars are read while the stars file is loaded.
+		if neutron_boosting:
+			self.preparing_neutron_stars = True
+
+			# off.collect_neutron_information() puts the neutron star 
+			# information directly into < self.neutron_stars >.
+			fetch = lambda: off.collect_neutron_information(self)
+			needs.append(self.pipeline.add('neutron stars', fetch))
+
+		making = self.pipeline.add('make nodes', lambda cached, *done: \
+							None if cached else self._make_nodes(), needs)
+
+		return self._save_nodes([making])
+
+
+	# The job in create_nodes() that takes the nodes from the cache. Returns
+	# True if they were there.
+	def _cached_nodes(self):
+		nodes = cc.find_nodes(self.settings.corridor, \
+				self.settings.jumpable_distances, self.settings.neutron_boosting, \
+																	self.stars)
+		if nodes is None:
+			return False
+
+		self.pristine_nodes = nodes
+		self.creating_nodes = False
+
+		this = "The prepared information was found in the cache."
+		self.say('create_nodes', this)
+
+		return True
+
+
+	# Once the creation of the nodes is finished, the result shall be saved. 
+	# < needs > are the jobs that need to be finished before that.
+	def _save_nodes(self, needs):
+		corridor = self.settings.corridor
+		jump_distances = self.settings.jumpable_distances
+		neutron_boosting = self.settings.neutron_boosting
+		store = lambda nodes: cc.store_nodes(corridor, jump_distances, \
+										neutron_boosting, nodes, self.stars)
+		save = lambda *done: self._save_information('pristine_nodes', \
+										'create_nodes', './all_nodes', store)
+
+		return self.pipeline.add('save nodes', save, needs)
+
+
+	# The job that saves what was found or prepared. It is started once the 
+	# job that searched or prepared it is finished.
+	# < save_this > is the name of the attribute of this class that contains 
+	# the information that shall be saved. The respective attributes are 
+	# set in the respective functions and one example would be < self.stars >.
+	# < channel > is where to tell about it.
+	# < outfile > is the relevant outfile.
+	# < store > is the function that also puts the information into the cache 
+	# (see corridor_cache.py), if it shall be put there.
+	def _save_information(self, save_this, channel, outfile, store = None):
+		save_that = getattr(self, save_this)
+
+		this = self.said(channel) + '\n\n'
+		that = 'Saving ...'
+		self.say(channel, this + that)
+
+		# ATTENTION: IF the gui is closed during saving, DON'T interrupt the 
+		# thread! This could lead to ressources not being freed properly.
+		with open(outfile, 'wb') as f:
+			pickle.dump(save_that, f)
+
+		if store and save_that is not None:
+			store(save_that)
+
+		this = self.said(channel).split('Saving ...')[0]
+		that = 'Finished saving. The next step will now use this information '
+		siht = 'and can be started.'
+		self.say(channel, this + that + siht)
+
+
+	# The job in create_nodes() that loads the relevant stars.
+	def _load_stars(self):
+		with open('./stars', 'rb') as f:
+			self.stars = pickle.load(f)
+
+
+	# The job in create_nodes() that actually makes the nodes ... or well, 
+	# that calls the outside function that actualy makes the nodes. 
+	# It starts once the stars and, if necessary, the neutron stars are ready.
+	def _make_nodes(self):
+		# Update the stars information with neutron star information if
+		# necessary. This process is fast.
+		if self.settings.neutron_boosting:
+			this = "Updating relevant stars with neutron star information ..."
+			self.say('create_nodes', this)
+
+			off.update_stars_with_neutrons(self.stars, self.neutron_stars)
+
+		af.create_nodes(self)
+
+
+	# Finds a path with the algorithm chosen in the settings. Returns the 
+	# job that does it.
+	# < load > is False if the stars and nodes in this instance shall be 
+	# used and not the ones in the stars- and all_nodes-files.
+	def find_path(self, load = True):
+		self.finding_path = True
+
+		if not load:
+			return self.pipeline.add('send probes', self._send_probes)
+
+		loading = self.pipeline.add('load files', self._load_files)
+
+		return self.pipeline.add('send probes', lambda loaded: \
+										self._send_probes(), [loading])
+
+
+	# If many stars are used, loading the nodes file may take a while. Thus it 
+	# is a job of its own.
+	def _load_files(self):
+		this = "Loading information (this may take a while) ..."
+		self.say('pathfinding', this)
+
+		with open('./all_nodes', 'rb') as f:
+			self.pristine_nodes = pickle.load(f)
+
+		# Just in case.
+		if self.pipeline.stopped():
+			return
+
+		with open('./stars', 'rb') as f:
+			self.stars = pickle.load(f)
+
+		this = "Finished loading information."
+		self.say('pathfinding', this)
+
+
+	# The coordinates of start or end (< which >) for the pathfinding. That is 
+	# the real position if it was estimated from the name and found in the 
+	# search, and what was given otherwise.
+	def _position(self, which):
+		coords = getattr(self.settings, which + '_coords')
+		estimated = self.settings.estimated_systems.get(which)
+		if estimated:
+			return self.real_positions.get(estimated[0].casefold(), coords)
+
+		return coords
+
+
+	# The job that does the pathfinding once the files are loaded.
+	# The name of this function is due to how the algorithm works :) .
+	def _send_probes(self):
+		this = "Searching for a path from start to end. This may take a while ..."
+		self.say('pathfinding', this)
+
+		stars = self.stars
+		pristine_nodes = self.pristine_nodes
+		neutron_boosting = self.settings.neutron_boosting
+		start_coords = self._position('start')
+		end_coords = self._position('end')
+		# < max_tries > is a remnant from earlier versions. It is somewhat 
+		# useful and in the future I may make it adjustable but so far it is
+		# set to 23 ... Hello future me: I guess you never really bothered to 
+		# make this adjustable by the user.
+		max_tries = self.settings.max_tries
+
+		grid = af.star_grid(stars)
+		self.start_star, self.end_star = af.find_closest(stars, start_coords, \
+														end_coords, grid)
+
+		# If the closest star is isolated, the next closest one that is not
+		# is used instead.
+		this = ''
+		start_fallback = af.closest_connected(stars, grid, start_coords, \
+															pristine_nodes)
+		if start_fallback and start_fallback != self.start_star:
+			this = this + '{} is isolated, '.format(list(self.start_star.keys())[0])
+			this = this + 'starting at the closest star that is not.\n'
+			self.start_star = start_fallback
+
+		end_fallback = af.closest_connected(stars, grid, end_coords, pristine_nodes)
+		if end_fallback and end_fallback != self.end_star:
+			this = this + '{} is isolated, '.format(list(self.end_star.keys())[0])
+			this = this + 'going to the closest star that is not.\n'
+			self.end_star = end_fallback
+
+		this = this + 'Start star: {}\n'.format(list(self.start_star.keys())[0])
+		that = 'End star: {}'.format(list(self.end_star.keys())[0])
+		self.say('pathfinding', this + that)
+
+		# Just the pareto algorithm finds these, see router.py => find_path().
+		self.alternative_jumpers = []
+
+		# Which algorithm is used is set in the settings.
+		# The randomized ones may stop earlier, see find_route.py => 
+		# reason_to_stop().
+		stopping = [self.settings.seed, self.settings.patience, \
+												self.settings.time_budget]
+		if self.settings.search_mode == 'random':
+			fr.find_path(max_tries, stars, self.start_star, self.end_star, \
+						pristine_nodes, neutron_boosting, self, *stopping)
+		elif self.settings.search_mode == 'parallel':
+			pt.find_path(max_tries, stars, self.start_star, self.end_star, \
+						pristine_nodes, neutron_boosting, self, *stopping)
+		else:
+			mode = self.settings.search_mode
+			time_budget = self.settings.time_budget
+			ro.find_path(stars, self.start_star, self.end_star, pristine_nodes, \
+								neutron_boosting, self, mode, time_budget)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
@@ -20,17 +20,20 @@
 # a route. It exists mainly to keep other files a bit more tidy.
 
 import additional_functions as af
-from random import shuffle
+from random import shuffle, Random
 from copy import deepcopy
+from time import time
 import class_definitions as cd
+import instruments as ins
+import router as ro
+import spanning_tree as st
 
 # A jumper needs to be initialized in the startnode.
-def create_jumper_at_start(start_star, all_nodes):
+# < graph > is the class Graph instance with the prepared nodes and < state > 
+# the class SearchState instance of the current try.
+def create_jumper_at_start(start_star, graph, state):
 	starname = list(start_star.keys())[0]
-	jumper = cd.Jumper(starname, 4)
-
-	all_nodes[starname].jumper = jumper
-	all_nodes[starname].visited = True
+	state.start_at(graph.index[starname])
 
 
 
@@ -42,7 +45,7 @@ def create_jumper_at_start(start_star, all_nodes):
 # Problem that may occur: No jumps take place because all possible jumps
 # go to unscoopble stars, the jumper has just one jump left and within
 # one regular jump distance no scoopable star is available. The latter 
-# would have been checked already in node._check_free_stars().
+# would have been checked already in check_free_stars().
 # BUT, it may be possible that a scoopable star exists two (or more) jumps 
 # away.
 # All these possibilities could not be implemented in the regular code.
@@ -50,9 +53,8 @@ def create_jumper_at_start(start_star, all_nodes):
 # jumper fuel for one additional jump so that it can cross the gap to the 
 # next (unscoopable) star and hope that after that a star exists that can be 
 # used for refill.
-def refuel_stuck_jumpers(all_nodes):
-	for starname, node in all_nodes.items():
-		jumper = node.jumper
+def refuel_stuck_jumpers(graph, state):
+	for i in range(state.size):
 		# This shall be done just for jumpers with an almost empty tank.
 		# The main while loop in explore_path() has, at the point when this 
 		# function is called, already checked for each jumper and all 
@@ -62,59 +64,190 @@ def refuel_stuck_jumpers(all_nodes):
 		# fuel for another jump should solve this problem and when calling 
 		# said main loop again it should find a star to jump to, if there is 
 		# one.
-		# < jumper >  should always exist, that is taken care of in 
-		# explore_path(). However, just in case I check for it.
-		if jumper and jumper.jumps_left == 1:
-			jumper.jumps_left = 2
-			jumper.magick_fuel_at.append(node.name)
-			this = 'ATTENTION: needed magick re-fuel at {} to be '.format(node.name)
+		# Systems that were not visited (yet) don't have a jumper.
+		if state.visited[i] and state.jumps_left[i] == 1:
+			name = graph.names[i]
+			state.jumps_left[i] = 2
+			state.add_note(i, 'magick_fuel_at', name)
+			this = 'ATTENTION: needed magick re-fuel at {} to be '.format(name)
 			that = 'able to jump. You need to get there with at least 2 jumps left! '
 			siht = 'Otherwise you are stuck at the next star!'
-			jumper.notes.append(this + that + siht)
+			state.add_note(i, 'notes', this + that + siht)
+
+
+
+# This function checks if the nearby stystems of the star with index < i > 
+# are free to jump to.
+# < this_distance > is the index of the list in Node.reachable.
+def check_free_stars(graph, state, i, this_distance):
+	visited = state.visited
+	scoopable = graph.scoopable
+	name = graph.names[i]
+
+	can_jump_to = []
+	for j in graph.reachable[i][this_distance]:
+		if not visited[j]:
+			# The following will never be triggered as of now, since the 
+			# .scoopable attribute is set be default to True. However, this 
+			# if-condition is meant to NOT allow a jump if the tank is empty 
+			# afterwards and the next star is unscoopable. 
+			# If this information ever will be available for all systems in 
+			# the EDSM database, it is automatically available (see also 
+			# comment in class Node to self.scoopable).
+			if state.jumps_left[i] == 1 and not scoopable[j]:
+				# Check if a star is nearby to re-fill the tank.
+				if refill_at_nearest_scoopable(graph, state, i, graph.names[j]):
+					state.jumps_left[i] = state.max_jumps - 1
+					can_jump_to.append(j)
+				else:
+					pass
+			# If (this_distance  + 1) is even it is a jump distance for jumping 
+			# on fumes. In this case the next star needs to be scoopable
+			# because otherwise the jumper would strand there!
+			elif (this_distance + 1) % 2 == 0 and scoopable[j]:
+				state.jumps_left[i] = 1
+				state.add_note(i, 'on_fumes', (name, graph.names[j]))
+				this = 'On fumes jump from {} to {}'.format(name, graph.names[j])
+				state.add_note(i, 'notes', this)
+				can_jump_to.append(j)
+			else:
+				can_jump_to.append(j)
+
+	state.can_jump_to[i] = can_jump_to
+
+
+
+# Case not covered in check_free_stars(): Jumper won't jump because the
+# tank is almost empty and the next star is not scoopable but another 
+# nearby star could be used to re-fill but was already visited.
+# Solution: Make a detour to the scoopable star, re-fill, fly back and make 
+# the jump. However, this shall be done JUST for regular jumps and the 
+# minimum number of jumps with full tank must be three.
+# ATTENTION: Just stars in regular jump distance will be considered for 
+# refill!
+# For the time being, the if-condition in check_free_stars() which calls
+# this function will never be triggered, will this function also never be
+# used (see also comment in check_free_stars()).
+def refill_at_nearest_scoopable(graph, state, i, point_of_origin):
+	for j in graph.reachable[i][0]:
+		if graph.scoopable[j]:
+			name = graph.names[j]
+			this = (point_of_origin, name, point_of_origin)
+			state.add_note(i, 'scoop_stops', this)
+			this = 'Refill needed at {}! '.format(point_of_origin)
+			that = 'Jump to {} and back to {}.'.format(name, point_of_origin)
+			state.add_note(i, 'notes', this + that)
+
+			return True
+
+	# If no scoopable star is near, the jumper is stuck.
+	return False
+
+
+
+# This is basically the function called for each star that houses a jumper.
+# This is the heart of the algorithm to explore the network of stars to 
+# find a route.
+# Sending a jumper does NOT copy the route so far. The reached star just 
+# remembers where the jumper came from (see class SearchState).
+def send_jumpers(graph, state, i, this_distance):
+	state.expanded += 1
+	# < state.can_jump_to > is set when check_free_stars() is called in 
+	# get_nodes_that_can_send_jumpers() which is called at the start of the 
+	# while-loop in explore_path().
+	for j in state.can_jump_to[i]:
+		# Another condition that is of little use as long the information
+		# about scoopability is not available for all systems in EDSM.
+		if graph.scoopable[j]:
+			jumps_left = state.max_jumps
+		else:
+			jumps_left = state.jumps_left[i] - 1
 
+		state.jump(i, j, this_distance, jumps_left)
 
+	return True
 
-# Just work with nodes that actually can send a jumper in the main while-loop
-# in explore_path(). This function finds these nodes.
-def get_nodes_that_can_send_jumpers(all_nodes, this_distance):
-	starnames = []
-	for starname, node in all_nodes.items():
-		if node.jumper:
-			# If neutron jumping is permitted, it shall always have priority
-			# over all other jumps.
-			if node.neutron:
-				original_this_distance = deepcopy(this_distance)
-				# Minus one because < this_distance > starts counting at zero.
-				this_distance = len(node.reachable) - 1
 
-			node._check_free_stars(this_distance)
-			if len(node.can_jump_to) != 0:
-				starnames.append(starname)
 
-			# In case < this_distance > was changed due to a neutron 
-			# boosted jump, it needs to be set back to the original 
-			# value.
-			if node.neutron:
-				this_distance = deepcopy(original_this_distance)
+# Puts the stars that were reached since the last time into the set of 
+# stars that may send jumpers with the jump distance < band >. If < band > 
+# is graph.bands it is the set for the neutron stars.
+def update_frontier(graph, state, band):
+	frontier = state.frontier[band]
+	reached = state.reached
+	neutron = band == graph.bands
+
+	for k in range(state.frontier_position[band], len(reached)):
+		i = reached[k]
+		if bool(graph.neutron[i]) == neutron:
+			frontier.add(i)
+
+	state.frontier_position[band] = len(reached)
 
-	return starnames
+
+
+# Just work with nodes that actually can send a jumper in the main while-loop
+# in explore_path(). This function finds these nodes and returns their indice.
+# 
+# Earlier versions checked all stars with a jumper in each round. But a star 
+# that has no free star left within a jump distance will never have one 
+# again. Thus the stars are kept in one set per jump distance (see class 
+# SearchState => .frontier) and are removed from it once that happens. That 
+# way just "new" stars are looked at and not all stars that were ever reached.
+def get_nodes_that_can_send_jumpers(graph, state, this_distance):
+	indice = []
+	visited = state.visited
+	# The index of the neutron boosted jump distance.
+	neutron_distance = graph.bands - 1
+
+	# If neutron jumping is permitted, it shall always have priority over 
+	# all other jumps. Thus neutron stars use always the neutron distance 
+	# and have their own set.
+	for band, distance in [(this_distance, this_distance), \
+											(graph.bands, neutron_distance)]:
+		update_frontier(graph, state, band)
+		frontier = state.frontier[band]
+
+		exhausted = []
+		for i in frontier:
+			check_free_stars(graph, state, i, distance)
+
+			if len(state.can_jump_to[i]) != 0:
+				indice.append(i)
+			# If the tank is almost empty a star may not be able to jump even 
+			# though there are free stars. It shall stay in the set then 
+			# (see refuel_stuck_jumpers()).
+			elif all(visited[j] for j in graph.reachable[i][distance]):
+				exhausted.append(i)
+
+		frontier.difference_update(exhausted)
+
+	# The sets have no order. Sorting gives the same order each time, thus 
+	# it is just the shuffling in explore_path() that decides.
+	indice.sort()
+
+	return indice
 
 
 
 # This does all the above and finds a way from start to end (or not).
-def explore_path(all_nodes, final_node):
+# < final_index > is the index of the final node in < graph >.
+# < rng > can be a random.Random instance, e.g. if each process that runs 
+# tries shall have its own (see parallel_tries.py). Otherwise the random 
+# module itself is used.
+def explore_path(graph, state, final_index, rng = None):
 	# This is the index of the possible jump distances in the 
 	# jump_distances-attribute of the Node-class.
 	this_distance = 0
 	# See below why I have this. And yes, I know that it is actually "magic".
 	magick_fuel = False
-	j = 0
-	while not final_node.visited:
-		j += 1
-		starnames = get_nodes_that_can_send_jumpers(all_nodes, this_distance)
+	# The index of the neutron boosted jump distance.
+	neutron_distance = graph.bands - 1
+	while not state.visited[final_index]:
+		indice = get_nodes_that_can_send_jumpers(graph, state, this_distance)
 
 		# If no jump can take place with the given jump-distance ...
-		if len(starnames) == 0:
+		if len(indice) == 0:
 			# ... allow for boosted jumps.
 			this_distance += 1
 			# A jumper can get stuck in a system JUST because it has just one
@@ -131,12 +264,12 @@ def explore_path(all_nodes, final_node):
 			# to set the scoopable attribute of each node to True. Thus, I think
 			# that this if-condition will never be triggered.
 			# I keep it in case the above written ever changes.
-			if this_distance == len(final_node.reachable) and not magick_fuel:
+			if this_distance == graph.bands and not magick_fuel:
 				magick_fuel = True
 				this_distance = 0
-				refuel_stuck_jumpers(all_nodes)
+				refuel_stuck_jumpers(graph, state)
 
-			elif this_distance == len(final_node.reachable):
+			elif this_distance == graph.bands:
 				# If no way can be found even with the largest boost range, and
 				# even after ONE magick fuel event took place, break the loop.
 				break
@@ -147,27 +280,21 @@ def explore_path(all_nodes, final_node):
 			# the same order during the momentary call if the program. 
 			# Thus explore_path() will return always the same path. 
 			# This is avoided by shuffling.
-			shuffle(starnames)
+			if rng:
+				rng.shuffle(indice)
+			else:
+				shuffle(indice)
 
-			for starname in starnames:
-				node = all_nodes[starname]
+			state.waves += 1
+			for i in indice:
 				# If neutron jumping is permitted, it shall always have 
-				# priority over all other jumps. That means that 
-				# < this_distance > is set to the maximum value in 
-				# get_nodes_that_can_send_jumpers() and this needs to be 
-				# taken care of here, too.
-				if node.neutron:
-					#print(this_distance)
-					original_this_distance = deepcopy(this_distance)
-					this_distance = len(node.reachable) - 1
-
-				node._send_jumpers(this_distance)
-
-				# In case < this_distance > was changed due to a neutron 
-				# boosted jump, it needs to be set back to the original 
-				# value.
-				if node.neutron:
-					this_distance = deepcopy(original_this_distance)
+				# priority over all other jumps. That means that the neutron
+				# distance was used in get_nodes_that_can_send_jumpers() and 
+				# this needs to be taken care of here, too.
+				if graph.neutron[i]:
+					send_jumpers(graph, state, i, neutron_distance)
+				else:
+					send_jumpers(graph, state, i, this_distance)
 
 			# If any jump took place, try first to do a regular jump afterwards.
 			this_distance = 0
@@ -180,29 +307,41 @@ def explore_path(all_nodes, final_node):
 
 
 
+# Counts one try with < waves > rounds of jumps and < expanded > stars that 
+# sent jumpers (see instruments.py).
+def count_try(waves, expanded):
+	ins.count('tries.run')
+	ins.count('explore_path.waves', waves)
+	ins.count('explore_path.expanded', expanded)
+
+
+
 # This function figures out if the jumper that reached the final node during 
 # the current loop uses less jumps or less boosts than the current best jumper.
+# < cost > is the cost tuple of the route to the final node (see class 
+# SearchState => .cost).
+# < make_jumper > is a function without arguments that creates the class 
+# Jumper instance for this route. The route itself is just created if it is 
+# actually better.
 # < data > is a tuple that contains information from the previous jumps
-# < screen > is the instance of class ScreenWork() that calls this function.
-def better_jumper(i, max_tries, jumper, data, screen):
+# < engine > is the instance of class Engine() that calls this function.
+def better_jumper(i, max_tries, cost, make_jumper, data, engine):
 	fewest_jumps_jumper = data[0]
 	fewest_jumps = data[1]
 	level_3_boosts = data[2]
 	level_2_boosts = data[3]
 	level_1_boosts = data[4]
 
-	new_level_3_boosts = len([x for x in jumper.jump_types if '3' in x])
-	new_level_2_boosts = len([x for x in jumper.jump_types if '2' in x])
-	new_level_1_boosts = len([x for x in jumper.jump_types if '1' in x])
-	number_jumps = len(jumper.visited_systems)
+	number_jumps, new_level_1_boosts, new_level_2_boosts, new_level_3_boosts, \
+														neutron_boosts = cost
 
-	text = screen.pathfinding_text.text().split('\nLast try')[0]
+	text = engine.said('pathfinding').split('\nLast try')[0]
 	this = 'Last try (#{} of {}) needed '.format(i + 1, max_tries)
 	that = '{} jumps with {} level 3 boosts, '.format(number_jumps, \
 																new_level_3_boosts)
 	siht = '{} level 2 boosts, {} level 1 boosts'.format(new_level_2_boosts, \
 																new_level_1_boosts)
-	screen.pathfinding_text.setText(text + '\n' + this + that + siht)
+	engine.say('pathfinding', text + '\n' + this + that + siht)
 	print(text + '\n' + this + that + siht)
 
 	most_better = new_level_3_boosts < level_3_boosts
@@ -223,7 +362,7 @@ def better_jumper(i, max_tries, jumper, data, screen):
 
 	if most_better or medium_better or least_better or leastest_better:
 		fewest_jumps = number_jumps
-		fewest_jumps_jumper = jumper
+		fewest_jumps_jumper = make_jumper()
 
 		level_1_boosts = new_level_1_boosts
 		level_2_boosts = new_level_2_boosts
@@ -236,11 +375,45 @@ def better_jumper(i, max_tries, jumper, data, screen):
 
 
 
+# The tries in find_path() don't need to go on if ...
+# ... the best route so far can't be beaten anymore. That is if it needs no 
+# boosts at all and has as few jumps as possible (< least_systems > is the 
+# result of router.py => least_systems_without_boosts()).
+# ... < patience > tries in a row didn't find anything better 
+# (< tries_since_better >).
+# ... it took already more than < time_budget > seconds since < started >.
+# < data > is the tuple from better_jumper().
+# Returns the reason as text or None if the tries shall go on.
+def reason_to_stop(data, least_systems, tries_since_better, patience, \
+														started, time_budget):
+	fewest_jumps_jumper, fewest_jumps, level_3_boosts, level_2_boosts, \
+														level_1_boosts = data
+
+	no_boosts = level_3_boosts == level_2_boosts == level_1_boosts == 0
+	if fewest_jumps_jumper and no_boosts and fewest_jumps == least_systems:
+		return 'the route found can not be beaten'
+
+	if patience and tries_since_better >= patience:
+		return '{} tries in a row found nothing better'.format(tries_since_better)
+
+	if time_budget and time() - started >= time_budget:
+		return 'the time limit of {} seconds is over'.format(time_budget)
+
+	return None
+
+
+
 # This is the main loop, that will search for the shortest and for the most 
 # economic path as often as < max_tries >.
-# < screen > is the instance of class ScreenWork() that calls this function.
+# < engine > is the instance of class Engine() that calls this function.
+# < seed > is for the random number generator. The same seed gives the same
+# route(s) for the same input. If it is None each run is different.
+# < patience > and < time_budget > can stop the tries earlier, see 
+# reason_to_stop().
 def find_path(max_tries, stars, start_star, end_star, pristine_nodes, \
-													neutron_boosting, screen):
+					neutron_boosting, engine, seed = None, patience = None, \
+														time_budget = None):
+	started = time()
 	# This is just for the case that neutron boosting is allowed.
 	way_back_jumper = None
 
@@ -253,77 +426,121 @@ def find_path(max_tries, stars, start_star, end_star, pristine_nodes, \
 
 	# This is just to keep the list of parameters for better_jumper() short.
 	data = (fewest_jumps_jumper, fewest_jumps, level_3_boosts, \
-										level_2_boosts, level_2_boosts)
+										level_2_boosts, level_1_boosts)
+
+	# The nodes are translated once into a form that the algorithm can work 
+	# with. Each try then just needs to reset < state >. See the comments to 
+	# class Graph and class SearchState in class_definitions.py.
+	graph = cd.Graph(pristine_nodes)
+	state = cd.SearchState(graph)
+	start_index = graph.index[list(start_star.keys())[0]]
+	final_index = graph.index[final_name]
+
+	# If the widest gap on the way can't be crossed, all tries would fail.
+	if st.hopeless(graph, start_index, final_index, engine):
+		return
+
+	# How much work was done in all tries.
+	expanded = 0
+
+	least_systems = ro.least_systems_without_boosts(graph, start_index, \
+																final_index)
+	tries_since_better = 0
+	reason = None
+
+	if seed is None:
+		rng = None
+	else:
+		rng = Random(seed)
 
 	i = 0
 	while i < max_tries:
-		if screen.mother.exiting.is_set():
+		if engine.exiting.is_set():
 			return
 
-		this = screen.pathfinding_text.text().split('\n\n')[0]
+		this = engine.said('pathfinding').split('\n\n')[0]
 		that = '\n\nTry #{} (of {}) to find a path ...'.format(i + 1, max_tries)
 		# For subsequent iterations it shall be shown how many jumps the 
 		# previous iteration needed. However, the first time around this would 
 		# obviously fail.
 		try:
-			text = screen.pathfinding_text.text().split('find a path ...')[1]
+			text = engine.said('pathfinding').split('find a path ...')[1]
 		except IndexError:
 			text = ''
 
-		screen.pathfinding_text.setText(this + that + text)
+		engine.say('pathfinding', this + that + text)
 		print(this + that + text)
 
-		# After one loop all nodes are visited. Thus I need the "fresh", 
-		# unvisited nodes for each loop.
-		all_nodes = deepcopy(pristine_nodes)
-		create_jumper_at_start(start_star, all_nodes)
-		final_node = all_nodes[final_name]
-
-		explore_path(all_nodes, final_node)
-
-		if final_node.visited:
-			jumper = final_node.jumper
-		else:
-			jumper = None
-
-		if jumper and neutron_boosting and not way_back_jumper:
-			# Since < all_nodes > is modified in explore_path I need to get the 
-			# pristine nodes again.
-			all_nodes = deepcopy(pristine_nodes)
-			way_back_jumper = way_back(all_nodes, stars, start_star, end_star)
-
-		if jumper:
-			data = better_jumper(i, max_tries, jumper, data, screen)
-		else:
-			this = screen.pathfinding_text.text().split('\nLast try')[0]
+		# After one loop all nodes are visited. Thus I need a "fresh" state
+		# without any visited nodes for each loop. This is what took the time 
+		# of the deepcopy of all nodes in earlier versions (see 
+		# instruments.py for the spans and counters).
+		with ins.span('tries.reset'):
+			state.reset()
+		create_jumper_at_start(start_star, graph, state)
+
+		with ins.span('explore_path'):
+			explore_path(graph, state, final_index, rng)
+		expanded += state.expanded
+		count_try(state.waves, state.expanded)
+
+		found = state.visited[final_index]
+
+		# better_jumper() needs the information in < state >. Thus it must be 
+		# called before way_back() resets it.
+		tries_since_better += 1
+		if found:
+			make_jumper = lambda: state.make_jumper(graph, final_index)
+			previous_best = data[0]
+			data = better_jumper(i, max_tries, state.cost[final_index], \
+												make_jumper, data, engine)
+			if data[0] is not previous_best:
+				tries_since_better = 0
+
+		if found and neutron_boosting and not way_back_jumper:
+			# Since < state > is modified in explore_path I need to reset it 
+			# again.
+			state.reset()
+			way_back_jumper = way_back(graph, state, stars, start_star, \
+															end_star, rng)
+
+		if not found:
+			this = engine.said('pathfinding').split('\nLast try')[0]
 			that = '\nLast try (#{} of {}) could NOT find a path.'.format(i + 1, max_tries)
-			screen.pathfinding_text.setText(this + that)
+			engine.say('pathfinding', this + that)
 			print(this + that + text)
 
 		i += 1
 
-	if jumper:
-		this = "Finished finding a route. The results are shown below."
-		screen.pathfinding_text.setText(this)
+		reason = reason_to_stop(data, least_systems, tries_since_better, \
+											patience, started, time_budget)
+		if reason:
+			break
+
+	fewest_jumps_jumper = data[0]
 
-		screen.pathfinding_button.setText("Find path")
+	if fewest_jumps_jumper:
+		this = "Finished finding a route ({} systems expanded ".format(expanded)
+		that = "in {} tries). The results are shown below.".format(i)
+		if reason and i < max_tries:
+			that = that + '\nStopped early because {}.'.format(reason)
+		engine.say('pathfinding', this + that)
+		print(this + that)
 
-		fewest_jumps_jumper = data[0]
+		engine.say('pathfinding_button', "Find path")
 
-		screen.fewest_jumps_jumper = fewest_jumps_jumper
-		screen.way_back_jumper = way_back_jumper
-		# When all is done, send the signal to print the results.
-		# See comment the extensive comment to < my_signal > the class ScreenWork
-		# definition in screen_work.py why I have this here.
-		screen.my_signal.emit('PRINT_ME')
+		engine.fewest_jumps_jumper = fewest_jumps_jumper
+		engine.way_back_jumper = way_back_jumper
+		# When all is done, tell whoever waits for the results.
+		engine.route_found()
 	else:
-		this = screen.pathfinding_text.text()
+		this = engine.said('pathfinding')
 		that = '\nThe pathfnding algorithm failed to find a path.\nTry a ship '
 		siht = 'with a larger jumprange.' 
-		screen.pathfinding_text.setText(this + that + siht)
+		engine.say('pathfinding', this + that + siht)
 
-	screen.finding_path = False
-	screen.pathfinding_button.setText("Find path")
+	engine.finding_path = False
+	engine.say('pathfinding_button', "Find path")
 
 
 
@@ -338,22 +555,22 @@ def find_path(max_tries, stars, start_star, end_star, pristine_nodes, \
 # already really good. The difference between running this function or not was
 # never larger than 1 jump. Thus I decided not to use it.
 # However, I think that it may be useful to have in the future, thus I keep it.
-def find_more_direct_way(final_node, all_nodes):
-	visited = deepcopy(final_node.jumper.visited_systems)
-	jump_types = deepcopy(final_node.jumper.jump_types)
+def find_more_direct_way(jumper, graph):
+	visited = deepcopy(jumper.visited_systems)
+	jump_types = deepcopy(jumper.jump_types)
 
 	i = 0
 	length = len(visited)
 	while i < length - 1:
 		starname = visited[i]
-		node = all_nodes[starname]
+		regular = graph.reachable[graph.index[starname]][0]
 
 		# Since visited is an ordered list, can I just check if a star further 
 		# away but within regular jump range exists.
 		j = i + 2
 		while j < length:
-			try_to_jump_to = visited[j]
-			if try_to_jump_to in node.reachable[0]:
+			try_to_jump_to = graph.index[visited[j]]
+			if try_to_jump_to in regular:
 				del visited[j - 1]
 				del jump_types[j - 1]
 				length -= 1
@@ -361,8 +578,8 @@ def find_more_direct_way(final_node, all_nodes):
 			j += 1
 		i += 1
 
-	final_node.jumper.visited_systems = visited
-	final_node.jumper.jump_types = jump_types
+	jumper.visited_systems = visited
+	jumper.jump_types = jump_types
 
 
 
@@ -376,18 +593,19 @@ def find_more_direct_way(final_node, all_nodes):
 # It is basically the important path of find_path() again, just with start and
 # goal switched and without trying finding a better path. One way back 
 # is sufficient enough.
-# < all_nodes > are all pristine nodes
+# < graph > is the class Graph instance with all pristine nodes and < state > 
+# a freshly reset class SearchState instance.
 # < start_star > and < end_star > are the _actual_ start and goal. The
 # switching will take place inside this function.
-def way_back(all_nodes, stars, start_star, end_star):
-	final_name = list(start_star.keys())[0]
-	create_jumper_at_start(end_star, all_nodes)
-	final_node = all_nodes[final_name]
+# < rng > is the same as for explore_path().
+def way_back(graph, state, stars, start_star, end_star, rng = None):
+	final_index = graph.index[list(start_star.keys())[0]]
+	create_jumper_at_start(end_star, graph, state)
 
-	explore_path(all_nodes, final_node)
+	explore_path(graph, state, final_index, rng)
 
-	if final_node.visited:
-		return final_node.jumper
+	if state.visited[final_index]:
+		return state.make_jumper(graph, final_index)
 	else:
 		return None
 
@@ -23,6 +23,9 @@
 from math import sqrt
 import json
 import additional_functions as af
+import instruments as ins
+import name_index as ni
+import procedural_names as pn
 import os
 
 
@@ -120,9 +123,12 @@ def within_limits(max_limits, min_limits, start_coords, end_coords, data):
 
 
 # This is just to keep find_systems_offline() more tidy.
+# Returns True if the star was put into < stars >, False if it is outside of 
+# the box and None if it is outside of the tube (see within_limits()).
 def get_star_into_dict(stars, start_coords, end_coords, \
 											max_limits, min_limits, data):
-	if within_limits(max_limits, min_limits, start_coords, end_coords, data):
+	within = within_limits(max_limits, min_limits, start_coords, end_coords, data)
+	if within:
 		star_data = data['coords']
 		star_data.update({'scoopable':True})
 		star_data.update({'neutron':False})
@@ -130,6 +136,8 @@ def get_star_into_dict(stars, start_coords, end_coords, \
 
 		stars[data['name']] = star_data
 
+	return within
+
 
 
 # This is just to keep find_systems_offline() more tidy.
@@ -151,14 +159,43 @@ def create_data_from_line(line):
 
 
 
+# If the position of start or end was estimated from the name of the system 
+# (see procedural_names.py), the real position is taken once the system is 
+# found. But just if it is within the boxel that the name says, otherwise 
+# either the name or the coordinates in the database are wrong.
+# < wanted > is a dict with the casefolded names of these systems as keys and 
+# (name, estimated coords, uncertainty) as values (see 
+# engine.Settings.estimated_systems).
+# < coords > are the coordinates of the system < name > as found.
+def real_position(engine, wanted, name, coords):
+	name, middle, uncertainty = wanted[name.casefold()]
+	real = {this:coords[this] for this in ['x', 'y', 'z']}
+
+	if pn.within(real, middle, uncertainty):
+		engine.real_positions[name.casefold()] = real
+		this = "{} was found at {x}, {y}, {z}, this position ".format(name, **real)
+		that = "is used instead of the estimated one."
+	else:
+		this = "ATTENTION: {} was found at {x}, {y}, {z}, which is ".format(name, **real)
+		that = "not where its name says. The estimated position is used."
+
+	print(this + that)
+	engine.say('star_search', this + that)
+
+
+
 # This does all of the above.
 # < start_coords > and < end_coords > are dicts with the (approximate) 
 # coordinates of the star at the start and the star at the end.
-# < screen > is the instance of class ScreenWork() that calls this function.
-def find_systems_offline(start_coords, end_coords, infile, screen):
+# < engine > is the instance of class Engine() that calls this function.
+# < stream > is a pipeline.Stream() into which the stars found so far are put
+# now and then (as dicts like < stars >), if they shall be used already 
+# while the search goes on.
+def find_systems_offline(start_coords, end_coords, infile, engine, \
+																stream = None):
 	max_limits, min_limits = x_y_z_limits(start_coords, end_coords)
 
-	screen.searching_stars = True
+	engine.searching_stars = True
 
 	# Two variables to keep track of the process
 	filesize = os.path.getsize(infile)
@@ -167,6 +204,20 @@ def find_systems_offline(start_coords, end_coords, infile, screen):
 	processed_size = 0
 
 	stars = {}
+	found = {}
+	wanted = {name.casefold():(name, middle, uncertainty) for name, middle, \
+						uncertainty in engine.settings.estimated_systems.values()}
+	# How many stars were not taken because of the box or the tube. Just to 
+	# see where the time goes (see instruments.py).
+	outside_box = 0
+	outside_tube = 0
+
+	# Since all systems are read anyway, the name index (see name_index.py)
+	# is created on the way, if it doesn't exist yet or is outdated.
+	if ni.needs_update(infile):
+		writer = ni.IndexWriter()
+	else:
+		writer = None
 
 	i = 0
 	with open(infile, 'r', encoding='utf-8-sig') as f:
@@ -179,7 +230,9 @@ def find_systems_offline(start_coords, end_coords, infile, screen):
 			# instance. This function checks if said attribute is set and 
 			# and returns if it is, which will close the thread that called
 			# this function to close gracefully.
-			if screen.mother.exiting.is_set():
+			if engine.exiting.is_set():
+				if writer:
+					writer.abort()
 				return
 
 			i += 1
@@ -192,31 +245,117 @@ def find_systems_offline(start_coords, end_coords, infile, screen):
 			if 'name' in line:
 				data = create_data_from_line(line)
 
-				get_star_into_dict(stars, start_coords, end_coords, \
+				# ATTENTION: This must happen before get_star_into_dict(), 
+				# since that adds more things to data['coords'].
+				if writer:
+					writer.add(data['name'], data['id'], data['coords'])
+
+				if wanted and data['name'].casefold() in wanted:
+					real_position(engine, wanted, data['name'], data['coords'])
+
+				within = get_star_into_dict(stars, start_coords, end_coords, \
 											max_limits, min_limits, data)
+				if within and stream:
+					found[data['name']] = stars[data['name']]
+				elif within is False:
+					outside_box += 1
+				elif within is None:
+					outside_tube += 1
 
 			# Just for information how far the calculation has become.
 			if i % 100000 == 0:
+				if found:
+					stream.put(found)
+					found = {}
+
 				percent = processed_size / filesize * 100
 				this = "Checked star #{} or approx. {:.2f} % ".format(i, percent)
 				that = "of all stars."
 				print(this + that)
-				screen.star_search_text.setText(this + that)
+				engine.say('star_search', this + that)
+
+	if found:
+		stream.put(found)
+
+	ins.count('dump.bytes', processed_size)
+	ins.count('dump.lines', i)
+	ins.count('dump.outside_box', outside_box)
+	ins.count('dump.outside_tube', outside_tube)
+	ins.count('dump.stars', len(stars))
+
+	if writer:
+		this = "Checked all stars. Saving the names of all systems ..."
+		print(this)
+		engine.say('star_search', this)
+		writer.finish()
 
 	this = "Checked {} stars of which {} are relevant.\n\n".format(i, len(stars))
 	that = "The results are saved in the stars-file in the installation directory."
-	screen.star_search_text.setText(this + that)
+	if writer:
+		that = that + "\nThe names of all systems are saved in the system_names-"
+		that = that + "file. Start and end can now be given by name."
+	engine.say('star_search', this + that)
+
+	engine.stars = stars
+	engine.searching_stars = False
+
+
+
+# Reading the dump takes most of the time of the search. If the stars for
+# several corridors are needed (see batch.py), it is read just once for all
+# of them.
+# < lines > is a list with (start_coords, end_coords) for each corridor.
+# < engine > is the instance of class Engine() that calls this function.
+# Returns a list with the dict of the stars (see find_systems_offline()) for
+# each corridor, or None if the search was stopped.
+def find_systems_for_lines(lines, infile, engine):
+	limits = [x_y_z_limits(start_coords, end_coords) for start_coords, \
+															end_coords in lines]
+	all_stars = [{} for line in lines]
+
+	filesize = os.path.getsize(infile)
+	processed_size = 0
+
+	i = 0
+	with open(infile, 'r', encoding='utf-8-sig') as f:
+		for line in f:
+			if engine.exiting.is_set():
+				return
+
+			i += 1
+			processed_size += len(line)
+
+			if 'name' in line:
+				data = create_data_from_line(line)
+
+				for stars, (start_coords, end_coords), (max_limits, min_limits) \
+											in zip(all_stars, lines, limits):
+					get_star_into_dict(stars, start_coords, end_coords, \
+											max_limits, min_limits, data)
+
+			if i % 100000 == 0:
+				percent = processed_size / filesize * 100
+				this = "Checked star #{} or approx. {:.2f} % ".format(i, percent)
+				that = "of all stars for {} corridors.".format(len(lines))
+				print(this + that)
+				engine.say('star_search', this + that)
+
+	ins.count('dump.bytes', processed_size)
+	ins.count('dump.lines', i)
+	ins.count('dump.stars', sum(len(stars) for stars in all_stars))
+
+	this = "Checked {} stars for {} corridors.".format(i, len(lines))
+	engine.say('star_search', this)
 
-	screen.stars = stars
-	screen.searching_stars = False
+	return all_stars
 
 
 
 # The file that contains the information about all neutron stars has a 
 # different structure than the systemsWithCoordinates.json file. Hence, it got
 # its own function to find the necessary information in it.
-# < screen > is the instance of class ScreenWork() that calls this function.
-def collect_neutron_information(screen):
+# < engine > is the instance of class Engine() that calls this function.
+def collect_neutron_information(engine):
 	neutron_stars = set()
 
 	filesize = os.path.getsize('./neutron-stars.csv')
@@ -227,7 +366,7 @@ def collect_neutron_information(screen):
 		# The first line of the file is irrelevant.
 		f.readline()
 		for i, line in enumerate(f):
-			if screen.mother.exiting.is_set():
+			if engine.exiting.is_set():
 				return
 
 			processed_size += len(line)
@@ -237,13 +376,13 @@ def collect_neutron_information(screen):
 				this = "Checked neutron star #{} or approx. ".format(i + 1)
 				that = "{:.2f} % of all neutron stars.".format(percent)
 				print(this + that)
-				screen.create_nodes_text.setText(this + that)
+				engine.say('create_nodes', this + that)
 
 			id_number = int(line.split(',')[0].replace('"', ''))
 			neutron_stars.update([id_number])
 
-	screen.neutron_stars = neutron_stars
-	screen.preparing_neutron_stars = False
+	engine.neutron_stars = neutron_stars
+	engine.preparing_neutron_stars = False
 
 
 # If neutron boosting shall be used, the stars that were figured out to be
@@ -20,10 +20,12 @@
 # different. To keep a bit more order contains this file all the functions for 
 # the online-process.
 
+from itertools import islice
 from math import sqrt
 import json
-import requests
 import additional_functions as af
+import find_systems_offline as off
+import instruments as ins
 import logging
 import time
 
@@ -112,9 +114,13 @@ def calculate_line_stuff(start_coords, end_coords):
 # Afterwards I move one cube length along the line and do the same. Stars
 # that are "found again" will be removed. But the latter two things are 
 # taking place in find_systems_online() and extract_information().
-# < screen > is the instance of class ScreenWork() that calls this function.
+# < engine > is the instance of class Engine() that calls this function.
 def stars_in_cubes_around_line(center_coords, perpendicular_vector_1, \
-												perpendicular_vector_2, screen):
+												perpendicular_vector_2, engine):
+	# requests takes a while to import and is just needed here and in the 
+	# two functions below. Thus, it is imported just if something is fetched.
+	import requests
+
 	url = 'https://www.edsm.net/api-v1/cube-systems'
 	# I want a stack of 5 x 5 cubes.
 	counter_1 = -2
@@ -136,7 +142,11 @@ def stars_in_cubes_around_line(center_coords, perpendicular_vector_1, \
 			payload = {'x':x_, 'y':y_, 'z':z_, 'size':200, 'showCoordinates':1, \
 													'showPrimaryStar':1, 'showId':1}
 			logs.info("GET edsm/cube with %s", payload)
-			systems = requests.get(url, params = payload)
+			# How many requests are sent and how long they and the pauses 
+			# below take, see instruments.py.
+			ins.count('http.requests')
+			with ins.span('http.request'):
+				systems = requests.get(url, params = payload)
 
 			if systems.status_code != requests.codes.ok:
 				logs.error("HTTP ERROR %d for %s with %s", systems.status_code, url, payload)
@@ -150,18 +160,22 @@ def stars_in_cubes_around_line(center_coords, perpendicular_vector_1, \
 			logs.info("Rate limit:%d %d %d",_rl_lim,_rl_remain,_rl_reset)
 			if _rl_remain == 0 and _rl_reset > 0:
 				logs.warning("Rate limit exceeded, sleeping %s seconds", _rl_reset)
-				time.sleep(_rl_reset)
+				ins.count('http.sleeps')
+				with ins.span('http.sleep'):
+					time.sleep(_rl_reset)
 			if _rl_remain < 5 and _rl_reset > 0:
 				logs.info("Rate limit pause, 10 seconds")
-				time.sleep(10)
+				ins.count('http.sleeps')
+				with ins.span('http.sleep'):
+					time.sleep(10)
 
 			counter_2 += 1
 
 			percentage += 4
-			this = screen.star_search_text.text().split('\n')[0] + '\n'
+			this = engine.said('star_search').split('\n')[0] + '\n'
 			that = "Got stars for {} % of this 200 ly wide ".format(percentage)
 			siht = "slice of space from start to end."
-			screen.star_search_text.setText(this + that + siht)
+			engine.say('star_search', this + that + siht)
 
 		counter_1 += 1
 		counter_2 = -2
@@ -175,6 +189,8 @@ def stars_in_cubes_around_line(center_coords, perpendicular_vector_1, \
 # In this case this function is called in extract_information() to figure
 # exactly that out.
 def system_has_scoopable_star(starname):
+	import requests
+
 	url = 'https://www.edsm.net/api-system-v1/bodies'
 	payload = {'systemName':starname}
 
@@ -225,16 +241,55 @@ def extract_information(stars, this_section_stars):
 
 
 
+# If the position of start or end was estimated from the name of the system 
+# (see procedural_names.py), EDSM is asked just for the stars in the boxel 
+# that the name says to get the real position (see find_systems_offline.py 
+# => real_position()). That is one request instead of looking through all the 
+# stars found between start and end.
+# < engine > is the instance of class Engine() that calls this function.
+def find_estimated_systems(engine):
+	import requests
+
+	url = 'https://www.edsm.net/api-v1/cube-systems'
+	for name, middle, uncertainty in engine.settings.estimated_systems.values():
+		if engine.exiting.is_set():
+			return
+
+		# EDSM gives out cubes with a side length of at most 200 ly. The 
+		# biggest boxels are larger than that, but the system is most likely 
+		# close to the estimated position anyway.
+		payload = {'x':middle['x'], 'y':middle['y'], 'z':middle['z'], \
+				'size':min(200, 2 * uncertainty), 'showCoordinates':1}
+		logs.info("GET edsm/cube with %s", payload)
+		ins.count('http.requests')
+		with ins.span('http.request'):
+			systems = requests.get(url, params = payload)
+
+		if systems.status_code != requests.codes.ok:
+			logs.error("HTTP ERROR %d for %s with %s", systems.status_code, url, payload)
+			continue
+
+		wanted = {name.casefold():(name, middle, uncertainty)}
+		for system in systems.json():
+			if system['name'].casefold() in wanted:
+				off.real_position(engine, wanted, system['name'], system['coords'])
+
+
+
 # This does all of the above.
 # < start_coords > and < end_coords > are dicts with the (approximate) 
 # coordinates of the star at the start and the star at the end.
-# < screen > is the instance of class ScreenWork() that calls this function.
-def find_systems_online(start_coords, end_coords, screen):
+# < engine > is the instance of class Engine() that calls this function.
+# < stream > is the same as for find_systems_offline.py => 
+# find_systems_offline().
+def find_systems_online(start_coords, end_coords, engine, stream = None):
 	# < unit_vector > is for the line from start- to end-coords.
 	unit_vector, perpendicular_vector_1, perpendicular_vector_2, \
 		start_of_line, end_of_line = calculate_line_stuff(start_coords, end_coords)
 
-	screen.searching_stars = True
+	engine.searching_stars = True
+
+	find_estimated_systems(engine)
 
 	stars = {}
 	center_coords = start_of_line
@@ -251,7 +306,7 @@ def find_systems_online(start_coords, end_coords, screen):
 		# This function checks if said attribute is set and and returns if it 
 		# is, which will close the thread that called this function to close 
 		# gracefully.
-		if screen.mother.exiting.is_set():
+		if engine.exiting.is_set():
 			return
 
 		difference = af.distance_to_point(center_coords, end_of_line)
@@ -259,11 +314,16 @@ def find_systems_online(start_coords, end_coords, screen):
 		this = "Getting all systems between start and end (distance to be "
 		that = "covered: {} ly). This will take some time...".format(int(difference))
 		print(this + that)
-		screen.star_search_text.setText(this + that)
+		engine.say('star_search', this + that)
 
 		this_section_stars = stars_in_cubes_around_line(center_coords, \
-							perpendicular_vector_1, perpendicular_vector_2, screen)
+							perpendicular_vector_1, perpendicular_vector_2, engine)
+		known = len(stars)
 		stars = extract_information(stars, this_section_stars)
+		# New stars are at the end of < stars >, systems that were found 
+		# before again keep their place.
+		if stream and len(stars) > known:
+			stream.put(dict(islice(stars.items(), known, None)))
 
 		# In general is the line NOT perpendicular to the cubes sides. 
 		# Hence, the following will lead to the overlap of some cubes. 
@@ -275,19 +335,20 @@ def find_systems_online(start_coords, end_coords, screen):
 
 	this = "Fetched {} stars.\n\n".format(len(stars))
 	that = "The results are saved in the stars-file in the installation directory."
-	screen.star_search_text.setText(this + that)
+	engine.say('star_search', this + that)
 
-	screen.stars = stars
-	screen.searching_stars = False
+	engine.stars = stars
+	engine.searching_stars = False
 
 
 
 # Just a small method to download the neutron stars file. It is target of 
-# a separate thread in _download_neutron_file()
-# < screen > is the screen of the gui that calls this function (which would 
-# be an instande of ScreenWork).
-def fetch_neutron_file(screen):
-	screen.downloading_neutron_file = True
+# a job in engine.py => download_neutron_file().
+# < engine > is the instance of class Engine() that calls this function.
+def fetch_neutron_file(engine):
+	import requests
+
+	engine.downloading_neutron_file = True
 	url = 'https://edastro.com/mapcharts/files/neutron-stars.csv'
 	download = False
 
@@ -299,7 +360,7 @@ def fetch_neutron_file(screen):
 		# ... < this > is NOT the file itself!
 		f.write(this.content)
 
-	screen.downloading_neutron_file = False
+	engine.downloading_neutron_file = False
 
 
 
@@ -30,28 +30,59 @@
 # program in regions with high (or even regular) star density. But who am I to 
 # restrict your possibilities? 
 
-print("Loading necessary modules ...")
+from time import time
+started = time()
 
 from sys import exit
-# In pyqt4 QApplication was in QtGui
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QTimer
-import motherwindow as mw
-
-
-app = QApplication([])
-
-main = mw.Motherwindow(app)
-
-# This here is just to be able to use CTRL + C on the shell to close the gui.
-# See here: https://machinekoder.com/how-to-not-shoot-yourself-in- ...
-# ... the-foot-using-python-qt/
-timer = QTimer()
-timer.timeout.connect(lambda: None)
-timer.start(500)
-
-
-exit(app.exec_())
+from multiprocessing import freeze_support
+import additional_functions as af
+
+
+# The 'parallel' pathfinding algorithm starts new processes (see 
+# parallel_tries.py). On some systems these import this file again, and they 
+# shall not open another window.
+if __name__ == '__main__':
+	freeze_support()
+
+	args = af.get_arguments()
+
+	# Without the gui, PyQt5 is not needed at all. It takes a while to load, 
+	# thus it is just imported if the gui is used.
+	if args.mode == 'no_gui':
+		import command_line as cl
+		code = cl.main(args, started)
+		cl.report(args)
+		exit(code)
+	elif args.mode == 'batch':
+		import batch as ba
+		import command_line as cl
+		code = ba.main(args, started)
+		cl.report(args)
+		exit(code)
+	elif args.mode == 'server':
+		import route_server as rs
+		exit(rs.main(args, started))
+
+	print("Loading necessary modules ...")
+
+	# In pyqt4 QApplication was in QtGui
+	from PyQt5.QtWidgets import QApplication
+	from PyQt5.QtCore import QTimer
+	import motherwindow as mw
+
+	app = QApplication([])
+
+	main = mw.Motherwindow(app)
+
+	# This here is just to be able to use CTRL + C on the shell to close the gui.
+	# See here: https://machinekoder.com/how-to-not-shoot-yourself-in- ...
+	# ... the-foot-using-python-qt/
+	timer = QTimer()
+	timer.timeout.connect(lambda: None)
+	timer.start(500)
+
+
+	exit(app.exec_())
 
 
 
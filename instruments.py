@@ -0,0 +1,156 @@
+#    "instruments" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Where does the time go? The labels of the gui and the printed text tell 
+# what is going on, but nothing that can be compared between two versions 
+# of the program. 
+# Hence, each stage records here how long it took ("spans", e.g. 
+# < with ins.span('nodes.create'): ... >) and how much it did ("counters", 
+# e.g. < ins.count('dump.lines', i) >). The counters are just increased 
+# once per stage with the total, since the loops that do the work shall not 
+# get slower because of this.
+# Everything is kept per process. The processes of parallel_tries.py and 
+# batch.py give their numbers back to the parent, which counts them.
+# At the end all of it can be saved as json lines (one line per span and 
+# counter) with export() or printed as a table with summary().
+
+from contextlib import contextmanager
+from time import time
+import json
+import threading
+
+# Goes into each line of export(), so that the numbers of different 
+# versions can be told apart.
+version = '2.0'
+# The single spans are kept just up to this number, the totals always.
+max_events = 100000
+
+_lock = threading.Lock()
+# name:number
+_counters = {}
+# name:[how often, seconds in total, longest]
+_spans = {}
+# (name, started, seconds) of each single span.
+_events = []
+
+
+def count(name, number = 1):
+	with _lock:
+		_counters[name] = _counters.get(name, 0) + number
+
+
+
+# Records how long the code in the with-block takes, also if it raises.
+@contextmanager
+def span(name):
+	started = time()
+	try:
+		yield
+	finally:
+		seconds = time() - started
+		with _lock:
+			this = _spans.setdefault(name, [0, 0.0, 0.0])
+			this[0] += 1
+			this[1] += seconds
+			this[2] = max(this[2], seconds)
+			if len(_events) < max_events:
+				_events.append((name, started, seconds))
+
+
+
+def reset():
+	with _lock:
+		_counters.clear()
+		_spans.clear()
+		del _events[:]
+
+
+
+# Everything so far as a dict that can be turned into json.
+def snapshot():
+	with _lock:
+		counters = dict(_counters)
+		spans = {name:{'count':this[0], 'seconds':this[1], 'longest':this[2]} \
+										for name, this in _spans.items()}
+
+	return {'version':version, 'counters':counters, 'spans':spans}
+
+
+
+# Appends one json line per single span and per counter to < outfile >. 
+# All lines of one call have the same < run > (when it was called), thus 
+# several runs (e.g. of different versions) can be in the same file.
+def export(outfile):
+	run = time()
+	with _lock:
+		lines = [{'type':'span', 'name':name, 'started':started, \
+					'seconds':seconds} for name, started, seconds in _events]
+		lines.extend({'type':'counter', 'name':name, 'value':value} for \
+											name, value in _counters.items())
+
+	with open(outfile, 'a') as f:
+		for line in lines:
+			line['version'] = version
+			line['run'] = run
+			f.write(json.dumps(line) + '\n')
+
+
+
+# All spans and counters as a table (a string), sorted by name.
+def summary():
+	with _lock:
+		spans = sorted(_spans.items())
+		counters = sorted(_counters.items())
+
+	lines = ['{:<32}{:>8}{:>12}{:>12}{:>12}'.format('span', 'count', \
+										'seconds', 'mean', 'longest')]
+	for name, (number, seconds, longest) in spans:
+		lines.append('{:<32}{:>8}{:>12.3f}{:>12.4f}{:>12.4f}'.format(name, \
+								number, seconds, seconds / number, longest))
+
+	lines.append('')
+	lines.append('{:<32}{:>20}'.format('counter', 'value'))
+	for name, value in counters:
+		if isinstance(value, float):
+			lines.append('{:<32}{:>20.3f}'.format(name, value))
+		else:
+			lines.append('{:<32}{:>20}'.format(name, value))
+
+	return '\n'.join(lines)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
@@ -54,10 +54,45 @@ class Motherwindow(QWidget):
 		# same start- and end-coordinates shall be done. In that case it is not 
 		# necessary to go through the systemsWithCoordinates-file again.
 		self.cached = False
+		# If the information for the pathfinding algorithm shall be prepared 
+		# while the relevant stars are searched, see engine.py => 
+		# _prepare_while_searching().
+		self.streaming = False
+		# Which corridor (start, end and which stars) the current run is 
+		# about. Used to find and store things in the cache, see 
+		# corridor_cache.py => corridor_of().
+		self.corridor = None
 		# < max_tries > is a remnant from earlier versions. It is somewhat 
 		# useful and in the future I may make it adjustable but so far it is
 		# set to 23.
 		self.max_tries = 23
+		# The randomized algorithms may stop before < max_tries > tries are 
+		# done, if < patience > tries in a row didn't find a better route or 
+		# if more than < time_budget > seconds are over. The latter is also 
+		# used by the 'anytime' and the 'pareto' algorithms. None means that this 
+		# is not used. They always stop if a route was found that can't be 
+		# beaten anyway (see find_route.py => reason_to_stop()).
+		self.patience = None
+		self.time_budget = None
+		# If this is not None, the randomized algorithms find the same 
+		# route(s) each time they are used with the same input.
+		self.seed = None
+		# Which algorithm shall be used to find the path. 'astar', 'dijkstra'
+		# and 'bidirectional' find the route with the fewest boosts in one go 
+		# (see router.py), 'anytime' does the same but shows better and better 
+		# routes while it is searching (see router.py => anytime()), 'pareto' 
+		# shows also all routes that need e.g. more boosts but fewer jumps 
+		# (see router.py => pareto_search()), 'random' is the original 
+		# algorithm which tries < max_tries > times (see find_route.py) and 
+		# 'parallel' is the same but runs the tries at the same time in 
+		# several processes (see parallel_tries.py).
+		self.search_mode = 'astar'
+		# If the position of start or end ('start' and 'end' are the keys) was 
+		# estimated from the name of the system, (name, estimated coords, 
+		# uncertainty) as procedural_names.py => estimate() gives them out. 
+		# The search looks for the real position in the boxel of the system 
+		# (see find_systems_offline.py => real_position()).
+		self.estimated_systems = {}
 
 		# In < screen_work > several separate threads are started. These will 
 		# continue running even if the gui is closed. Thus I need to modify the 
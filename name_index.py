@@ -0,0 +1,246 @@
+#    "name_index" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Start and end are usually known by name, but the program needs coordinates.
+# Since the offline search reads the complete systemsWithCoordinates.json 
+# file anyway, the names, ids and coordinates of ALL systems are written into
+# a file (the "name index") while doing so. After that, a system can be 
+# looked up by its name in milliseconds, also if it is not one of the 
+# relevant stars.
+# The file contains one line per system, sorted by the name in lower case:
+# "name in lower case<TAB>name<TAB>id<TAB>x<TAB>y<TAB>z"
+# Since it is sorted, a name can be found by jumping around in the file 
+# (binary search) without reading all of it, and all names that start with 
+# the same letters are next to each other.
+# ATTENTION: There are systems with the same name. In that case the first 
+# one is found.
+
+import heapq
+import mmap
+import os
+
+# Yes, the filename is hardcoded, as for the other files.
+index_file = './system_names'
+# How many lines are sorted in memory before they are written into a 
+# temporary file. The complete dump has way too many systems to sort them
+# all in memory.
+chunk_size = 500000
+
+# Upper and lower case shall not matter.
+def key_of(name):
+	return name.casefold().encode('utf-8')
+
+
+
+# If the index doesn't exist or is older than the file with all the systems, 
+# it needs to be (re)created.
+def needs_update(infile, path = index_file):
+	if not os.path.isfile(path):
+		return True
+
+	return os.path.getmtime(path) < os.path.getmtime(infile)
+
+
+
+# This collects the systems during the offline search and creates the index 
+# file in the end. 
+class IndexWriter(object):
+	def __init__(self, path = index_file):
+		self.path = path
+		self.lines = []
+		# The temporary files with the sorted chunks.
+		self.parts = []
+
+
+	# < coords > is a dict with 'x', 'y' and 'z'.
+	def add(self, name, id_number, coords):
+		# Tabs and newlines in a name would break the file. There are none, 
+		# but just in case.
+		name = name.replace('\t', ' ').replace('\n', ' ')
+		line = '{}\t{}\t{}\t{}\t{}\n'.format(name, id_number, coords['x'], \
+												coords['y'], coords['z'])
+		self.lines.append(key_of(name) + b'\t' + line.encode('utf-8'))
+
+		if len(self.lines) >= chunk_size:
+			self._write_part()
+
+
+	def _write_part(self):
+		part = '{}.part{}'.format(self.path, len(self.parts))
+		self.lines.sort()
+		with open(part, 'wb') as f:
+			f.writelines(self.lines)
+
+		self.parts.append(part)
+		self.lines = []
+
+
+	# The sorted chunks are merged into the final file. This is written 
+	# under a different name first and renamed in the end, so that a 
+	# half-written index is never used.
+	def finish(self):
+		self._write_part()
+
+		files = [open(part, 'rb') for part in self.parts]
+		try:
+			with open(self.path + '.new', 'wb') as f:
+				f.writelines(heapq.merge(*files))
+		finally:
+			for part_file in files:
+				part_file.close()
+			self.abort()
+
+		os.replace(self.path + '.new', self.path)
+
+
+	# If the program is closed while the index is created, the temporary 
+	# files shall not stay around.
+	def abort(self):
+		for part in self.parts:
+			if os.path.isfile(part):
+				os.remove(part)
+
+		self.parts = []
+		self.lines = []
+
+
+
+# Looks up names in the index file. The file is not read but "mapped" into 
+# memory (mmap), so that just the parts that are actually looked at are 
+# loaded by the operating system.
+class NameIndex(object):
+	def __init__(self, path = index_file):
+		self.file = open(path, 'rb')
+		# mmap can't map empty files.
+		if os.path.getsize(path) > 0:
+			self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+		else:
+			self.data = b''
+
+
+	def close(self):
+		if isinstance(self.data, mmap.mmap):
+			self.data.close()
+		self.file.close()
+
+
+	# Where the first line is whose key is not smaller than < key >.
+	def _first_at_least(self, key):
+		data = self.data
+		# < low > is always the beginning of a line.
+		low = 0
+		high = len(data)
+		while low < high:
+			middle = (low + high) // 2
+			# The beginning of the line in which < middle > is.
+			start = data.rfind(b'\n', low, middle)
+			if start < 0:
+				start = low
+			else:
+				start += 1
+
+			end = data.find(b'\n', start) + 1
+			if data[start:data.find(b'\t', start)] < key:
+				low = end
+			else:
+				high = start
+
+		return low
+
+
+	# The line at < position > as (name, id, coords) and where the next 
+	# line starts.
+	def _read_line(self, position):
+		end = self.data.find(b'\n', position)
+		this = self.data[position:end].decode('utf-8').split('\t')
+		coords = {'x':float(this[3]), 'y':float(this[4]), 'z':float(this[5])}
+
+		return (this[1], int(this[2]), coords), end + 1
+
+
+	# The system with exactly this name (upper and lower case don't matter) as
+	# (name, id, coords) tuple. None if it is not in the index.
+	def find(self, name):
+		key = key_of(name)
+		position = self._first_at_least(key)
+		if self.data[position:position + len(key) + 1] == key + b'\t':
+			return self._read_line(position)[0]
+
+
+	# Up to < limit > systems of which the name starts with < prefix >, as
+	# a list of (name, id, coords) tuples sorted by name.
+	def starting_with(self, prefix, limit = 20):
+		key = key_of(prefix)
+		position = self._first_at_least(key)
+		systems = []
+		while len(systems) < limit and position < len(self.data) and \
+						self.data[position:position + len(key)] == key:
+			system, position = self._read_line(position)
+			systems.append(system)
+
+		return systems
+
+
+
+# Looks up just one name. Returns the same as NameIndex.find() and None if 
+# no index exists (yet).
+def find_system(name, path = index_file):
+	if not os.path.isfile(path):
+		return
+
+	index = NameIndex(path)
+	try:
+		return index.find(name)
+	finally:
+		index.close()
+
+
+
+# Dito for names that start with < prefix >. Used to make suggestions if a 
+# name was not found.
+def systems_starting_with(prefix, limit = 5, path = index_file):
+	if not os.path.isfile(path):
+		return []
+
+	index = NameIndex(path)
+	try:
+		return index.starting_with(prefix, limit)
+	finally:
+		index.close()
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
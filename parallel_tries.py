@@ -0,0 +1,379 @@
+#    "parallel_tries" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The tries of the original (randomized) algorithm in find_route.py are 
+# independent of each other. Thus they can run at the same time, each in its 
+# own process. 
+# Sending the whole graph to each process with each try would cost more than 
+# the try itself. Thus the graph is written once into a block of shared memory 
+# and each process just "looks" at it. Each process gets its own random 
+# number generator, so that the tries don't all do the same thing.
+# The results are merged with find_route.py => better_jumper(), hence the 
+# best route is chosen the same way as in the original.
+
+import multiprocessing as mp
+from multiprocessing.util import Finalize
+from multiprocessing import shared_memory
+from random import Random
+from time import time
+from math import sqrt
+from array import array
+import class_definitions as cd
+import find_route as fr
+import router as ro
+import spanning_tree as st
+
+
+
+# The arrays that make up the shared graph. Each is a tuple with the name, 
+# the type code from the array module and the number of elements. The 
+# "reachable" lists are stored like this (also known as compressed sparse 
+# row format):
+# < targets > contains all reachable stars of all bands of all stars one after 
+# another. < offsets >[i * bands + this_distance] is where the reachable stars 
+# of star i in band this_distance start in < targets >. The next element of 
+# < offsets > is where they end.
+# The names are stored as one long utf-8 encoded bytestring in the same way.
+def _make_layout(graph, targets, name_bytes):
+	size = len(graph.names)
+	layout = [('offsets', 'q', size * graph.bands + 1), \
+				('targets', 'i', len(targets)), \
+				('neutron', 'B', size), \
+				('scoopable', 'B', size), \
+				('coords', 'd', 3 * size), \
+				('name_offsets', 'q', size + 1), \
+				('name_bytes', 'B', len(name_bytes))]
+
+	return layout
+
+
+
+# Writes < graph > (a class Graph instance) into one block of shared memory.
+# Returns the class SharedMemory instance (which must be kept alive and 
+# closed and unlinked when everything is done) and the information that the 
+# workers need to find the arrays in the block.
+def share_graph(graph):
+	offsets = array('q', [0])
+	targets = array('i')
+	for bands in graph.reachable:
+		for band in bands:
+			targets.extend(band)
+			offsets.append(len(targets))
+
+	name_offsets = array('q', [0])
+	name_bytes = bytearray()
+	for name in graph.names:
+		name_bytes.extend(name.encode('utf-8'))
+		name_offsets.append(len(name_bytes))
+
+	coords = array('d')
+	for coord in graph.coords:
+		coords.extend(coord)
+
+	data = {'offsets': offsets, 'targets': targets, \
+			'neutron': array('B', graph.neutron), \
+			'scoopable': array('B', graph.scoopable), 'coords': coords, \
+			'name_offsets': name_offsets, 'name_bytes': name_bytes}
+
+	layout = _make_layout(graph, targets, name_bytes)
+	needed = sum(array(code).itemsize * length for _, code, length in layout)
+	# A block of size zero is not allowed.
+	shm = shared_memory.SharedMemory(create = True, size = max(1, needed))
+
+	position = 0
+	for name, code, length in layout:
+		number_bytes = array(code).itemsize * length
+		shm.buf[position:position + number_bytes] = bytes(data[name])
+		position += number_bytes
+
+	info = (shm.name, layout, graph.jump_distances)
+
+	return shm, info
+
+
+
+# The names of the stars in the shared block. This behaves like the list 
+# Graph.names, but each name is decoded just when it is needed.
+class SharedNames(object):
+	def __init__(self, name_offsets, name_bytes):
+		self.name_offsets = name_offsets
+		self.name_bytes = name_bytes
+
+
+	def __len__(self):
+		return len(self.name_offsets) - 1
+
+
+	def __getitem__(self, i):
+		start = self.name_offsets[i]
+		end = self.name_offsets[i + 1]
+		return bytes(self.name_bytes[start:end]).decode('utf-8')
+
+
+
+# This behaves like class Graph (as far as find_route.py needs it), but 
+# everything is read from the shared block. Nothing is copied.
+class SharedGraph(object):
+	def __init__(self, info):
+		shm_name, layout, jump_distances = info
+		# The processes of the pool share the "resource tracker" of the parent
+		# process, hence the block is still removed just once (by the parent).
+		self.shm = shared_memory.SharedMemory(name = shm_name)
+
+		arrays = {}
+		position = 0
+		for name, code, length in layout:
+			number_bytes = array(code).itemsize * length
+			this = self.shm.buf[position:position + number_bytes]
+			arrays[name] = this.cast(code)
+			position += number_bytes
+
+		self.jump_distances = jump_distances
+		self.bands = len(jump_distances) - 1
+		self.neutron = arrays['neutron']
+		self.scoopable = arrays['scoopable']
+		self.coords = arrays['coords']
+		self.names = SharedNames(arrays['name_offsets'], arrays['name_bytes'])
+		self.index = None
+
+		offsets = arrays['offsets']
+		targets = arrays['targets']
+		bands = self.bands
+		# reachable[i][this_distance] is a slice of < targets >. This is again 
+		# just a "view" into the shared block, nothing is copied.
+		self.reachable = [[targets[offsets[i * bands + b]:offsets[i * bands + b + 1]] \
+						for b in range(bands)] for i in range(len(self.names))]
+
+
+	def distance(self, i, j):
+		x_0, y_0, z_0 = self.coords[3 * i:3 * i + 3]
+		x_1, y_1, z_1 = self.coords[3 * j:3 * j + 3]
+
+		return sqrt((x_1 - x_0)**2 + (y_1 - y_0)**2 + (z_1 - z_0)**2)
+
+
+	# The block can just be closed when nothing "looks" at it anymore.
+	def close(self):
+		self.reachable = None
+		self.neutron = None
+		self.scoopable = None
+		self.coords = None
+		self.names = None
+		self.shm.close()
+
+
+
+# Everything a process needs for its tries. This is set once per process by 
+# _init_worker(), hence the graph is not send with each try.
+_worker = {}
+
+def _init_worker(info, start_index, final_index):
+	graph = SharedGraph(info)
+	_worker['graph'] = graph
+	_worker['state'] = cd.SearchState(graph)
+	_worker['start_index'] = start_index
+	_worker['final_index'] = final_index
+	# Called when the process ends.
+	Finalize(None, _close_worker, exitpriority = 10)
+
+
+
+def _close_worker():
+	_worker.pop('state', None)
+	graph = _worker.pop('graph', None)
+	if graph:
+		graph.close()
+
+
+
+# One try of the original algorithm. < seed > is for the random number 
+# generator of this try, hence each try does something else (but the same 
+# thing if the same seed is used again).
+# Returns the cost of the route (see class SearchState => .cost), the 
+# class Jumper instance with the route or None if no route was found and 
+# how much work it was (see find_route.py => count_try()). The latter is 
+# counted by the parent, since the counters of this process are lost.
+def _one_try(seed):
+	graph = _worker['graph']
+	state = _worker['state']
+	final_index = _worker['final_index']
+
+	state.reset()
+	state.start_at(_worker['start_index'])
+	fr.explore_path(graph, state, final_index, Random(seed))
+
+	work = (state.waves, state.expanded)
+	if not state.visited[final_index]:
+		return None, None, work
+
+	jumper = state.make_jumper(graph, final_index)
+
+	return state.cost[final_index], jumper, work
+
+
+
+# This does the same as find_route.py => find_path() but runs the tries in 
+# < processes > processes at the same time (default is one per CPU).
+# < engine > is the instance of class Engine() that calls this function.
+# < seed >, < patience > and < time_budget > are the same as for 
+# find_route.py => find_path().
+def find_path(max_tries, stars, start_star, end_star, pristine_nodes, \
+					neutron_boosting, engine, seed = None, patience = None, \
+									time_budget = None, processes = None):
+	started = time()
+	way_back_jumper = None
+	fewest_jumps_jumper = None
+	fewest_jumps = 99999
+	level_3_boosts = 99999
+	level_2_boosts = 99999
+	level_1_boosts = 99999
+	data = (fewest_jumps_jumper, fewest_jumps, level_3_boosts, \
+										level_2_boosts, level_1_boosts)
+
+	graph = cd.Graph(pristine_nodes)
+	start_index = graph.index[list(start_star.keys())[0]]
+	final_index = graph.index[list(end_star.keys())[0]]
+
+	# See find_route.py => find_path().
+	if st.hopeless(graph, start_index, final_index, engine):
+		return
+
+	least_systems = ro.least_systems_without_boosts(graph, start_index, \
+																final_index)
+	tries_since_better = 0
+	reason = None
+	tries = 0
+
+	if not processes:
+		processes = mp.cpu_count()
+	processes = max(1, min(processes, max_tries))
+
+	this = engine.said('pathfinding').split('\n\n')[0]
+	that = '\n\nRunning {} tries in {} processes ...'.format(max_tries, processes)
+	engine.say('pathfinding', this + that)
+	print(this + that)
+	first_text = this + that
+
+	shm, info = share_graph(graph)
+	# This runs in a thread of the gui. Forking a process with threads (as 
+	# Linux would do by default) can get stuck, thus new processes are 
+	# started instead.
+	context = mp.get_context('spawn')
+	pool = context.Pool(processes, initializer = _init_worker, \
+							initargs = (info, start_index, final_index))
+
+	found = False
+	expanded = 0
+	try:
+		# Each try gets its own seed. If < seed > is given these are always 
+		# the same and the routes are merged in the order of the tries (and 
+		# not in the order they arrive), hence the result is always the same.
+		seeder = Random(seed)
+		seeds = [seeder.randrange(2**32) for i in range(max_tries)]
+		if seed is None:
+			results = pool.imap_unordered(_one_try, seeds)
+		else:
+			results = pool.imap(_one_try, seeds)
+
+		for i, (cost, jumper, work) in enumerate(results):
+			if engine.exiting.is_set():
+				pool.terminate()
+				return
+
+			tries = i + 1
+			expanded += work[1]
+			fr.count_try(*work)
+			tries_since_better += 1
+			that = '\n{} of {} tries finished.'.format(i + 1, max_tries)
+			engine.say('pathfinding', first_text + that)
+
+			if cost:
+				found = True
+				previous_best = data[0]
+				data = fr.better_jumper(i, max_tries, cost, lambda: jumper, \
+																data, engine)
+				if data[0] is not previous_best:
+					tries_since_better = 0
+			else:
+				this = first_text + that
+				that = '\nLast try (#{} of {}) could NOT find a path.'.format(i + 1, max_tries)
+				engine.say('pathfinding', this + that)
+				print(this + that)
+
+			reason = fr.reason_to_stop(data, least_systems, tries_since_better, \
+											patience, started, time_budget)
+			# The tries that are still running are not needed anymore.
+			if reason:
+				pool.terminate()
+				break
+	finally:
+		pool.close()
+		pool.join()
+		shm.close()
+		shm.unlink()
+
+	# The way back is just one try. It doesn't need the other processes.
+	if found and neutron_boosting:
+		state = cd.SearchState(graph)
+		rng = None if seed is None else Random(seed)
+		way_back_jumper = fr.way_back(graph, state, stars, start_star, \
+															end_star, rng)
+
+	if found:
+		this = "Finished finding a route ({} systems expanded ".format(expanded)
+		that = "in {} tries). The results are shown below.".format(tries)
+		if reason and tries < max_tries:
+			that = that + '\nStopped early because {}.'.format(reason)
+		engine.say('pathfinding', this + that)
+		print(this + that)
+
+		engine.say('pathfinding_button', "Find path")
+
+		engine.fewest_jumps_jumper = data[0]
+		engine.way_back_jumper = way_back_jumper
+		engine.route_found()
+	else:
+		this = engine.said('pathfinding')
+		that = '\nThe pathfnding algorithm failed to find a path.\nTry a ship '
+		siht = 'with a larger jumprange.' 
+		engine.say('pathfinding', this + that + siht)
+
+	engine.finding_path = False
+	engine.say('pathfinding_button', "Find path")
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,197 @@
+#    "pipeline" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The steps done on the work screen depend on each other: the nodes need the 
+# stars (and maybe the neutron stars), saving needs whatever was made before, 
+# and so on. Earlier each step ran in its own thread that looked every 
+# second if the step before was finished. That wasted time and the flags 
+# that were looked at could change in between.
+# Here each step is a "job". A job says which other jobs it needs and is 
+# started in its own thread the moment the last of these is finished. It 
+# gets their results as arguments, in the order in which they are needed.
+# Nothing is interrupted from the outside. A job that takes long shall look 
+# at Pipeline.stopped() now and then and return if it is set. Jobs that 
+# weren't started yet are not started at all after that.
+
+import queue
+import threading
+import traceback
+import instruments as ins
+
+
+class Job(object):
+	# < function > is called with the results of the jobs in < needs >.
+	def __init__(self, name, function, needs):
+		self.name = name
+		self.function = function
+		self.needs = list(needs)
+		self.result = None
+		self.error = None
+		# True if it was never started because the pipeline was stopped or 
+		# one of the needed jobs didn't finish properly.
+		self.skipped = False
+		# The jobs that need this one.
+		self.then = []
+		self.waiting_for = 0
+		self.done = threading.Event()
+
+
+	# True if the job ran and nothing went wrong.
+	def succeeded(self):
+		return self.done.is_set() and not self.error and not self.skipped
+
+
+	# Blocks until the job is done and returns its result.
+	def wait(self, timeout = None):
+		self.done.wait(timeout)
+		return self.result
+
+
+
+
+
+
+# A job gets the results of the jobs it needs just when these are finished. 
+# Sometimes the next job can already work with parts of a result, e.g. with 
+# the stars found so far while the search is still going on. For this the 
+# first job puts the parts into a stream and the next one loops over it. 
+# The loop waits for the next part and ends when the stream is closed.
+class Stream(object):
+	end = object()
+
+	def __init__(self):
+		self.parts = queue.Queue()
+
+
+	def put(self, part):
+		self.parts.put(part)
+
+
+	# ATTENTION: This MUST be called, also if the first job stops early. 
+	# Otherwise the next job waits forever.
+	def close(self):
+		self.parts.put(self.end)
+
+
+	def __iter__(self):
+		while True:
+			part = self.parts.get()
+			if part is self.end:
+				return
+
+			yield part
+
+
+
+
+
+
+class Pipeline(object):
+	# < exiting > is an outside threading.Event(), e.g. the one that is set 
+	# when the gui is closed (see class Motherwindow). It stops the pipeline, 
+	# too.
+	def __init__(self, exiting = None):
+		self.exiting = exiting
+		self.cancelled = threading.Event()
+		self.lock = threading.Lock()
+
+
+	def stopped(self):
+		if self.exiting is not None and self.exiting.is_set():
+			return True
+
+		return self.cancelled.is_set()
+
+
+	def cancel(self):
+		self.cancelled.set()
+
+
+	# Starts a new job as soon as all jobs in < needs > are done, which may 
+	# be right away. Jobs from earlier calls may be needed, even if they are 
+	# finished already.
+	def add(self, name, function, needs = ()):
+		job = Job(name, function, needs)
+
+		with self.lock:
+			for needed in job.needs:
+				if not needed.done.is_set():
+					needed.then.append(job)
+					job.waiting_for += 1
+
+			ready = job.waiting_for == 0
+
+		if ready:
+			self._start(job)
+
+		return job
+
+
+	def _start(self, job):
+		thread = threading.Thread(target = self._run, args = [job])
+		# For being able to close a thread gracefully I need run it as a daemon.
+		# See second option in answer here: https://stackoverflow.com/ ...
+		# ... questions/25145278/root-destroy-does-not-terminate-threads-running-in-shell
+		thread.daemon = True
+		thread.start()
+
+
+	def _run(self, job):
+		if self.stopped() or not all(needed.succeeded() for needed in job.needs):
+			job.skipped = True
+		else:
+			try:
+				# Each job is a stage of its own, see instruments.py.
+				with ins.span('job.' + job.name):
+					job.result = job.function(*[needed.result for needed in job.needs])
+			except Exception as error:
+				job.error = error
+				traceback.print_exc()
+
+		with self.lock:
+			job.done.set()
+			ready = []
+			for waiting in job.then:
+				waiting.waiting_for -= 1
+				if waiting.waiting_for == 0:
+					ready.append(waiting)
+
+		for waiting in ready:
+			self._start(waiting)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
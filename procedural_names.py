@@ -0,0 +1,205 @@
+#    "procedural_names" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Most systems in the gaps have names like "Eol Prou XX-Y d1-23". These names 
+# are not random, they say where the system is:
+# - "Eol Prou" is the sector, a cube with a side length of 1280 ly (or a 
+#   sphere for some hand made sectors like "Col 285 Sector").
+# - The letter after the numbers (the "mass code", a to h) is the size of the
+#   cube ("boxel") inside the sector in which the system is. a is 10 ly, b is
+#   20 ly, c is 40 ly and so on up to h which is 1280 ly (the whole sector).
+# - The letters "XX-Y" and the number before the dash ("d1-") say which of 
+#   the boxels of that size it is. They are counted along x, then y, then z.
+#   See parse() for the details.
+# - The last number just counts the systems in the same boxel.
+# Where the boxel is inside its sector can thus be calculated from the name 
+# alone. Where the sector is, however, depends on the sector name, and the 
+# rules for those are not part of this program. Instead, the position of the
+# sector is derived from known systems in the same sector (e.g. from the name 
+# index, see name_index.py). One known system is enough to know the position 
+# of all other boxels of the sector to within the size of its boxel.
+
+import re
+import name_index as ni
+
+pattern = re.compile(r'^(?P<sector>.+?) (?P<letters>[A-Z]{2}-[A-Z]) ' + \
+			r'(?P<mass_code>[A-H])(?:(?P<first>\d+)-)?(?P<number>\d+)$', \
+															re.IGNORECASE)
+sector_size = 1280
+
+# The parts of a procedurally generated name as dict, or None if < name > is 
+# no such name.
+# 'boxel' is (x, y, z) of the boxel inside its sector, counted in boxels, and
+# 'size' the side length of a boxel in ly.
+def parse(name):
+	match = pattern.match(name.strip())
+	if not match:
+		return
+
+	letters = [ord(letter) - ord('A') for letter in \
+						match.group('letters').upper().replace('-', '')]
+	mass_code = ord(match.group('mass_code').lower()) - ord('a')
+	first = int(match.group('first') or 0)
+
+	position = letters[0] + letters[1] * 26 + letters[2] * 26**2 + \
+														first * 26**3
+	# ATTENTION: The boxels are always counted as if 128 of them would fit 
+	# along one side of the sector (which is just true for mass code a). 
+	# That's why e.g. "d13-" is about the largest number for mass code d.
+	boxel = (position % 128, (position // 128) % 128, position // 128**2)
+
+	# But just < 128 >> mass_code > actually fit into the sector.
+	if max(boxel) >= 128 >> mass_code:
+		return
+
+	return {'sector':match.group('sector'), 'boxel':boxel, \
+						'size':10 * 2**mass_code, 'number':int(match.group('number'))}
+
+
+
+# Where the corner of the sector (the one with the smallest x, y and z) is.
+# < known > is a list of (name, coords) of systems with known coordinates 
+# (as dict with 'x', 'y', 'z') in the same sector.
+# Each known system says that the corner is somewhere in a cube of the size 
+# of its boxel. All of these cubes must overlap, and the overlap is returned 
+# as (lowest, highest) corner. None if no known system can be used.
+def sector_corner(known):
+	lowest = [-float('inf')] * 3
+	highest = [float('inf')] * 3
+
+	for name, coords in known:
+		parts = parse(name)
+		if not parts:
+			continue
+
+		size = parts['size']
+		for axis, this in enumerate(['x', 'y', 'z']):
+			corner = coords[this] - parts['boxel'][axis] * size
+			lowest[axis] = max(lowest[axis], corner - size)
+			highest[axis] = min(highest[axis], corner)
+
+	# Either nothing was known, or the known systems don't fit together 
+	# (e.g. a typo in the coordinates).
+	if any(low > high for low, high in zip(lowest, highest)) or \
+										lowest[0] == -float('inf'):
+		return
+
+	return lowest, highest
+
+
+
+# The approximate position of the system with the procedurally generated
+# < name >, as (coords, uncertainty). < coords > is a dict with 'x', 'y' and
+# 'z' of the middle of where the system can be and < uncertainty > is how 
+# many ly the system can be away from there along each axis.
+# < known > is the same as for sector_corner(). None if the position can't
+# be estimated.
+def estimate(name, known):
+	parts = parse(name)
+	if not parts:
+		return
+
+	corner = sector_corner([system for system in known if \
+			parse(system[0]) and parse(system[0])['sector'].casefold() == \
+											parts['sector'].casefold()])
+	if not corner:
+		return
+
+	lowest, highest = corner
+	size = parts['size']
+	coords = {}
+	uncertainty = 0
+	for axis, this in enumerate(['x', 'y', 'z']):
+		low = lowest[axis] + parts['boxel'][axis] * size
+		high = highest[axis] + (parts['boxel'][axis] + 1) * size
+		coords[this] = (low + high) / 2
+		uncertainty = max(uncertainty, (high - low) / 2)
+
+	return coords, uncertainty
+
+
+
+# Dito, but the known systems of the sector are taken from the name index. 
+# Used if a system itself is not in the index (e.g. because it was just 
+# discovered).
+def estimate_from_index(name, path = ni.index_file):
+	parts = parse(name)
+	if not parts:
+		return
+
+	known = ni.systems_starting_with(parts['sector'] + ' ', 100, path)
+
+	return estimate(name, [(system[0], system[2]) for system in known])
+
+
+
+# True if < coords > are at most < uncertainty > ly away from < middle > 
+# along each axis, that is inside the boxel as estimate() gives it out.
+def within(coords, middle, uncertainty):
+	return all(abs(coords[this] - middle[this]) <= uncertainty for this in \
+															['x', 'y', 'z'])
+
+
+
+# A cheap check if < coords > can be the position of the system with the 
+# procedurally generated < name >. < known > is the same as for estimate().
+# Returns None if that can't be said.
+def plausible(name, coords, known):
+	position = estimate(name, known)
+	if not position:
+		return
+
+	middle, uncertainty = position
+	return within(coords, middle, uncertainty)
+
+
+
+# Dito, but the known systems of the sector are taken from the name index, 
+# without the system itself. Used to check the coordinates in the index, 
+# which are the ones from EDSM.
+def plausible_from_index(name, coords, path = ni.index_file):
+	parts = parse(name)
+	if not parts:
+		return
+
+	known = ni.systems_starting_with(parts['sector'] + ' ', 100, path)
+
+	return plausible(name, coords, [(system[0], system[2]) for system in \
+							known if system[0].casefold() != name.casefold()])
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,384 @@
+#    "route_server" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Each "Find path" loads the stars- and the all_nodes-file again, which 
+# takes longer than finding the path itself. 
+# < gap_jumper.py server > keeps running instead and keeps the prepared 
+# graphs (see class Graph in class_definitions.py) of the corridors it was 
+# asked for in memory. Routes are asked for with a POST to /route on 
+# localhost with a query as for batch.py as json, e.g.:
+# {"start": [-1500, 0, 0], "end": [1500, 0, 0], "jumprange": 30}
+# The answer is what engine.py => Engine.results() gives out (as json), 
+# together with how long it took. If the graph of the corridor is already 
+# in memory, that is just the search itself. Otherwise the stars and the 
+# nodes are taken from the cache (see corridor_cache.py) or searched and 
+# prepared first. Several queries can be asked for at the same time.
+# GET /metrics tells how long the queries took, how often the graph was 
+# already there and how much memory the graphs need.
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from argparse import Namespace
+from collections import deque
+from math import ceil
+from time import time
+import json
+import logging
+import sys
+import threading
+import traceback
+import additional_functions as af
+import batch as ba
+import class_definitions as cd
+import engine as en
+import instruments as ins
+import find_systems_offline as off
+
+# How many of the last queries are used for the latency in /metrics.
+latency_window = 1000
+
+
+# Roughly how many bytes < thing > and everything in it need. 
+def _size_of(thing):
+	seen = set()
+	total = 0
+	todo = [thing]
+	while todo:
+		this = todo.pop()
+		if id(this) in seen:
+			continue
+
+		seen.add(id(this))
+		total += sys.getsizeof(this)
+		if isinstance(this, dict):
+			todo.extend(this.keys())
+			todo.extend(this.values())
+		elif isinstance(this, (list, tuple, set)):
+			todo.extend(this)
+		elif hasattr(this, '__dict__'):
+			todo.append(this.__dict__)
+
+	return total
+
+
+
+
+
+
+class RouteServer(object):
+	# < defaults > are used for what is not given in a query, see 
+	# batch.py => prepare_queries(). < max_graphs > is how many graphs are
+	# kept in memory, the one that was not used for the longest time is 
+	# thrown away if there are more.
+	def __init__(self, defaults, max_graphs = 8):
+		self.defaults = defaults
+		self.max_graphs = max_graphs
+		self.exiting = threading.Event()
+		self.lock = threading.Lock()
+		# One entry (a dict) per corridor and ship, see _build().
+		self.graphs = {}
+		# Two queries for the same corridor shall not both build the graph.
+		self.building = {}
+		# Queries for different corridors may build their graphs at the same 
+		# time, but just one of them may use the cache and the tiles (see 
+		# corridor_cache.py and adjacency_tiles.py), which are files that 
+		# just one can write at a time.
+		self.cache_lock = threading.Lock()
+		self.neutron_stars = None
+		# Reading the neutron stars takes a while, the other queries shall 
+		# not wait for that (see _neutron_stars()).
+		self.neutron_lock = threading.Lock()
+
+		self.queries = 0
+		self.errors = 0
+		self.hits = 0
+		self.misses = 0
+		self.latencies = deque(maxlen = latency_window)
+
+
+	# The entry for the corridor and ship of the < query >. Returns it and 
+	# if it was already there.
+	def graph_for(self, query):
+		key = json.dumps([query['corridor'], query['jumpable_distances'], \
+								query['neutron_boosting']], sort_keys = True)
+
+		with self.lock:
+			building = self.building.setdefault(key, threading.Lock())
+
+		with building:
+			with self.lock:
+				entry = self.graphs.get(key)
+				if entry:
+					self.hits += 1
+					entry['used'] = time()
+					return entry, True
+				self.misses += 1
+
+			entry = self._build(query)
+
+			with self.lock:
+				self.graphs[key] = entry
+				while len(self.graphs) > self.max_graphs:
+					oldest = min(self.graphs, key = lambda this: \
+												self.graphs[this]['used'])
+					del self.graphs[oldest]
+					self.building.pop(oldest, None)
+
+		return entry, False
+
+
+	# Everything that is needed to answer queries for the corridor and ship 
+	# of < query >. 
+	def _build(self, query):
+		settings = en.Settings()
+		settings.offline_mode = bool(self.defaults.starsfile)
+		settings.starsfile = self.defaults.starsfile
+		settings.neutron_file_ok = af.neutron_file_ok()
+		settings.corridor = query['corridor']
+		settings.jumpable_distances = query['jumpable_distances']
+		settings.neutron_boosting = query['neutron_boosting']
+		settings.exiting = self.exiting
+		progress = lambda channel, text: logging.info("%s: %s", channel, text)
+		engine = en.Engine(settings, progress)
+
+		if settings.neutron_boosting:
+			engine.neutron_stars = self._neutron_stars(engine)
+
+		with self.cache_lock:
+			stars = ba.find_stars([settings.corridor], engine)[0]
+			if not stars:
+				raise ValueError("No stars were found between start and end.")
+
+			nodes = ba.nodes_for(stars, settings.corridor, engine)
+
+		graph = cd.Graph(nodes)
+
+		entry = {'stars':stars, 'nodes':nodes, 'graph':graph}
+		entry['grid'] = af.star_grid(stars)
+		entry['start'] = settings.corridor[0]
+		entry['end'] = settings.corridor[1]
+		entry['jumpable_distances'] = settings.jumpable_distances
+		entry['neutron_boosting'] = settings.neutron_boosting
+		entry['bytes'] = _size_of([stars, nodes, graph, entry['grid']])
+		entry['used'] = time()
+
+		return entry
+
+
+	# The neutron stars are read just once (see engine.py => 
+	# Engine._prepare_while_searching() for the same with a download).
+	def _neutron_stars(self, engine):
+		with self.neutron_lock:
+			if self.neutron_stars is not None:
+				return self.neutron_stars
+
+			if not engine.settings.neutron_file_ok:
+				engine.download_neutron_file().wait()
+				if not engine.settings.neutron_file_ok:
+					raise ValueError("The neutron-stars file could not be downloaded.")
+
+			off.collect_neutron_information(engine)
+			self.neutron_stars = engine.neutron_stars
+
+		return self.neutron_stars
+
+
+	# The answer to one query (the dict from the json). Raises ValueError if
+	# the query is not ok.
+	def answer(self, query):
+		started = time()
+		with self.lock:
+			self.queries += 1
+
+		algorithm = query.get('algorithm', 'astar')
+		if algorithm not in ['astar', 'dijkstra']:
+			raise ValueError("The algorithm must be astar or dijkstra.")
+
+		prepared = ba.prepare_queries([query], self.defaults)
+		if not prepared:
+			raise ValueError("Start or end are unknown or the jumprange is missing.")
+		query = prepared[0]
+
+		with ins.span('server.graph'):
+			entry, cached = self.graph_for(query)
+		route = None
+		way_back = None
+		expanded = 0
+		ends = ba.ends_of(query, entry['stars'], entry['nodes'], entry['grid'], \
+															entry['graph'])
+		if ends:
+			with ins.span('server.search'):
+				route, way_back, expanded = ba.route_in(entry['graph'], *ends, \
+							astar = algorithm == 'astar', \
+							neutron_boosting = query['neutron_boosting'])
+			ins.count('router.expanded', expanded)
+			if not route:
+				query['error'] = 'The pathfnding algorithm failed to find a path.'
+
+		seconds = time() - started
+		with self.lock:
+			self.latencies.append(seconds)
+
+		# See engine.py => Engine.results().
+		results = {'start':query['start_star'], 'end':query['end_star']}
+		results['stars_considered'] = len(entry['stars'])
+		results['neutron_boosting'] = query['neutron_boosting']
+		results['so_far'] = False
+		results['route'] = route
+		results['way_back'] = way_back
+		results['alternatives'] = []
+		results['expanded'] = expanded
+		results['error'] = query.get('error')
+		results['cached'] = cached
+		results['seconds'] = seconds
+
+		return results
+
+
+	def error(self):
+		with self.lock:
+			self.errors += 1
+
+
+	def metrics(self):
+		with self.lock:
+			latencies = sorted(self.latencies)
+			graphs = [{'start':entry['start'], 'end':entry['end'], \
+						'jumpable_distances':entry['jumpable_distances'], \
+						'neutron_boosting':entry['neutron_boosting'], \
+						'stars':len(entry['stars']), 'bytes':entry['bytes']} \
+											for entry in self.graphs.values()]
+
+		looked_up = self.hits + self.misses
+		metrics = {'queries':self.queries, 'errors':self.errors}
+		metrics['cache_hits'] = self.hits
+		metrics['cache_misses'] = self.misses
+		metrics['hit_rate'] = self.hits / looked_up if looked_up else None
+		metrics['latency'] = {'last':len(latencies)}
+		if latencies:
+			metrics['latency']['median'] = latencies[len(latencies) // 2]
+			# The nearest rank.
+			metrics['latency']['p95'] = latencies[max(0, ceil(0.95 * len(latencies)) - 1)]
+			metrics['latency']['max'] = latencies[-1]
+		metrics['graphs'] = graphs
+		metrics['graph_bytes'] = sum(graph['bytes'] for graph in graphs)
+		# Where the time went, see instruments.py.
+		metrics['instruments'] = ins.snapshot()
+
+		return metrics
+
+
+
+
+
+
+# Each request is handled in its own thread (see ThreadingHTTPServer).
+# < self.server.routes > is the class RouteServer instance.
+class Handler(BaseHTTPRequestHandler):
+	def do_GET(self):
+		if self.path == '/metrics':
+			self._send(200, self.server.routes.metrics())
+		else:
+			self._send(404, {'error':'Unknown path {}.'.format(self.path)})
+
+
+	def do_POST(self):
+		if self.path != '/route':
+			self._send(404, {'error':'Unknown path {}.'.format(self.path)})
+			return
+
+		routes = self.server.routes
+		try:
+			length = int(self.headers.get('Content-Length', 0))
+			query = json.loads(self.rfile.read(length).decode('utf-8'))
+			if not isinstance(query, dict):
+				raise ValueError("The query must be a json object.")
+
+			self._send(200, routes.answer(query))
+		except ValueError as error:
+			routes.error()
+			self._send(400, {'error':str(error)})
+		# The server shall keep running, whatever went wrong.
+		except Exception as error:
+			routes.error()
+			traceback.print_exc()
+			self._send(500, {'error':str(error)})
+
+
+	def _send(self, code, data):
+		body = json.dumps(data).encode('utf-8')
+		self.send_response(code)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+
+	# Just in the verbose mode.
+	def log_message(self, format, *args):
+		logging.info(format, *args)
+
+
+
+# Does it all. < args > are the command line arguments as returned by 
+# additional_functions.py => get_arguments(). < started > is when the 
+# program was started (see gap_jumper.py).
+def main(args, started = None):
+	if args.verbose:
+		logging.basicConfig(level = logging.INFO)
+
+	defaults = Namespace(jumprange = args.jumprange, range_on_fumes = \
+					args.range_on_fumes, neutron_boosting = args.neutron_boosting, \
+												starsfile = args.starsfile)
+
+	# Just for this computer.
+	server = ThreadingHTTPServer(('127.0.0.1', args.port), Handler)
+	server.daemon_threads = True
+	server.routes = RouteServer(defaults, args.max_graphs)
+
+	print("Waiting for queries on http://127.0.0.1:{} ...".format(args.port))
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.routes.exiting.set()
+		server.server_close()
+
+	return 0
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
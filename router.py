@@ -0,0 +1,885 @@
+#    "router" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The randomized algorithm in find_route.py needs many tries and still may not
+# find the best route. This file contains a different approach: a Dijkstra 
+# search over all stars that finds THE route with the fewest boosts in one 
+# go, and always the same route for the same input.
+# 
+# What is "best" is the same as in find_route.py => better_jumper(): First the 
+# fewest grade 3 boosts, then the fewest grade 2 boosts, then the fewest grade
+# 1 boosts and then the fewest jumps. Just if all of that is equal, the route 
+# with fewer neutron boosts wins. Python compares tuples exactly in this 
+# way, thus the "cost" of a route is such a tuple.
+# 
+# Since the fuel in the tank (see class SearchState => .jumps_left) decides 
+# where a jumper can go next, the search does not go from star to star but 
+# from (star, jumps left) to (star, jumps left). As long as all stars are 
+# considered to be scoopable (see comment in class Node to self.scoopable)
+# the tank is always full after a jump and this makes no difference.
+
+import heapq
+from math import ceil
+from time import time
+import class_definitions as cd
+import instruments as ins
+import spanning_tree as st
+
+
+# What a jump with the distance with index < this_distance > adds to the cost 
+# of a route. See comment at the beginning of this file for the order.
+def jump_cost(this_distance):
+	jump_type = cd.jump_type(this_distance)
+
+	if jump_type == 'neutron':
+		return (0, 0, 0, 1, 1)
+	elif '3' in jump_type:
+		return (1, 0, 0, 1, 0)
+	elif '2' in jump_type:
+		return (0, 1, 0, 1, 0)
+	elif '1' in jump_type:
+		return (0, 0, 1, 1, 0)
+	else:
+		return (0, 0, 0, 1, 0)
+
+
+
+# Which jump distance is used when jumping from star < i > to stars in the 
+# list with index < this_distance > in Node.reachable.
+# A neutron boosted jump can go anywhere up to the neutron boosted jump range. 
+# Thus, from a neutron star, everything that would need a jumponium boost is 
+# reached with a neutron boost instead. Regular jumps (also on fumes) are 
+# still possible.
+def used_distance(graph, i, this_distance):
+	if graph.neutron[i] and this_distance > 1:
+		return graph.bands - 1
+	else:
+		return this_distance
+
+
+
+# These are the rules from find_route.py => check_free_stars() and 
+# send_jumpers() for a single jump from star < i > to star < j >.
+# Returns the jumps left in the tank after the jump and if a refill stop 
+# was needed. The former is None if the jump is not possible.
+def jumps_left_after(graph, i, j, this_distance, jumps_left, max_jumps):
+	refill = False
+	if jumps_left == 1 and not graph.scoopable[j]:
+		# Check if a star is nearby to re-fill the tank.
+		if not any(graph.scoopable[k] for k in graph.reachable[i][0]):
+			return None, False
+
+		refill = True
+		jumps_left = max_jumps - 1
+	elif (this_distance + 1) % 2 == 0 and graph.scoopable[j]:
+		jumps_left = 1
+
+	if graph.scoopable[j]:
+		return max_jumps, refill
+	else:
+		return jumps_left - 1, refill
+
+
+
+# For the A* search: how many jumps are at least needed to get from each star 
+# to the star with index < final_index >. It is the distance to the final 
+# star divided by the longest jump that does not need jumponium. This is 
+# either the jump on fumes or, if the corridor has any neutron stars, the 
+# neutron boosted jump.
+# A route that needs a jumponium boost is always worse than any route that 
+# does not (see the order at the beginning of this file), no matter how 
+# many jumps the latter needs. Hence, the longer boosted jumps don't need to 
+# be taken into account here. 
+# If < boosted > is True, the longest possible jump (with whatever boost) 
+# is used instead. Then it is just the number of jumps, no matter how many 
+# boosts are needed.
+# Returns a function that takes the index of a star.
+def jumps_needed(graph, final_index, boosted = False):
+	if any(graph.neutron) or boosted:
+		longest = max(graph.jump_distances)
+	else:
+		longest = graph.jump_distances[min(2, graph.bands)]
+
+	cache = {}
+	def guess(i):
+		if i not in cache:
+			cache[i] = ceil(graph.distance(i, final_index) / longest)
+
+		return cache[i]
+
+	return guess
+
+
+
+# How many systems a route from the star with index < start_index > to the 
+# star with index < final_index > visits at least if it shall not need any 
+# jumponium boost. This just looks for the fewest jumps without caring about 
+# the fuel in the tank, hence no route without boosts can be shorter.
+# find_route.py => find_path() uses this to know when a route can't be 
+# beaten anymore. 
+# Returns None if no such route exists.
+def least_systems_without_boosts(graph, start_index, final_index):
+	systems = {start_index:1}
+	queue = [start_index]
+	k = 0
+	while k < len(queue):
+		i = queue[k]
+		k += 1
+		if i == final_index:
+			return systems[i]
+
+		for this_distance in range(graph.bands):
+			used = used_distance(graph, i, this_distance)
+			if jump_cost(used)[:3] != (0, 0, 0):
+				continue
+
+			for j in graph.reachable[i][this_distance]:
+				if j not in systems:
+					systems[j] = systems[i] + 1
+					queue.append(j)
+
+	return None
+
+
+
+# The search itself. < start_index > and < final_index > are indice in 
+# < graph > (a class Graph instance).
+# If < astar > is True, the stars closer to the final star are looked at 
+# first (see jumps_needed()). The result is the same, but much less stars 
+# need to be looked at. Stars "behind" the start are mostly ignored.
+# < exiting > is the threading.Event of class Motherwindow. If it is set, the 
+# search stops.
+# < weight > is just used for A*. If it is larger than one, the guessed 
+# number of jumps counts more and the search goes faster towards the final 
+# star. The route found may then need more jumps than necessary (but never 
+# more boosts). If it is None just the guess counts ("greedy" search).
+# < deadline > is a point in time (as returned by time()). If it is over, 
+# the search stops without a route.
+# Returns the route as a list of (index, used distance, refill) tuples (or 
+# None if there is no route) and the number of (star, jumps left) pairs that 
+# were expanded. The latter is just to see how much work was needed.
+def search(graph, start_index, final_index, max_jumps = 4, exiting = None, \
+						astar = False, weight = 1, deadline = None):
+	# A (star, jumps left) pair is stored as a single number.
+	width = max_jumps + 1
+	start = start_index * width + max_jumps
+
+	best = {start:(0, 0, 0, 1, 0)}
+	came_from = {start:None}
+	done = set()
+	expanded = 0
+
+	scoopable = graph.scoopable
+
+	if astar:
+		guess = jumps_needed(graph, final_index)
+	else:
+		guess = lambda i: 0
+
+	# The queue is sorted by the cost so far PLUS the guessed number of jumps
+	# still needed. For plain Dijkstra the latter is always zero.
+	if weight is None:
+		priority_jumps = lambda jumps, j: guess(j)
+	elif weight == 1:
+		priority_jumps = lambda jumps, j: jumps + guess(j)
+	else:
+		priority_jumps = lambda jumps, j: jumps + weight * guess(j)
+
+	queue = [((0, 0, 0, priority_jumps(1, start_index), 0), start)]
+	while queue:
+		this = heapq.heappop(queue)[1]
+		if this in done:
+			continue
+
+		done.add(this)
+		expanded += 1
+		i, jumps_left = divmod(this, width)
+		cost = best[this]
+
+		if expanded % 1000 == 0:
+			if exiting and exiting.is_set():
+				return None, expanded
+			if deadline and time() > deadline:
+				return None, expanded
+
+		# The first time the final star is taken out of the queue, the best 
+		# way to it is known. That is what Dijkstra is about.
+		if i == final_index:
+			return make_route(came_from, this, width), expanded
+
+		level_3, level_2, level_1, jumps, neutrons = cost
+		for this_distance in range(graph.bands):
+			used = used_distance(graph, i, this_distance)
+			add_3, add_2, add_1, add_jumps, add_neutrons = jump_cost(used)
+			new_cost = (level_3 + add_3, level_2 + add_2, level_1 + add_1, \
+								jumps + add_jumps, neutrons + add_neutrons)
+
+			for j in graph.reachable[i][this_distance]:
+				# This is what jumps_left_after() returns for scoopable stars. 
+				# Since that is (as of now) the case for all stars, it is 
+				# worth to skip the function call.
+				if scoopable[j]:
+					new_jumps_left = max_jumps
+					refill = False
+				else:
+					new_jumps_left, refill = jumps_left_after(graph, i, j, used, \
+														jumps_left, max_jumps)
+					if new_jumps_left is None:
+						continue
+
+				that = j * width + new_jumps_left
+				if that in done:
+					continue
+
+				if that not in best or new_cost < best[that]:
+					best[that] = new_cost
+					came_from[that] = (this, used, refill)
+					priority = (new_cost[0], new_cost[1], new_cost[2], \
+							priority_jumps(new_cost[3], j), new_cost[4])
+					heapq.heappush(queue, (priority, that))
+
+	return None, expanded
+
+
+
+# Follows the pointers in < came_from > back from < this > to the start.
+def make_route(came_from, this, width):
+	route = []
+	while came_from[this] is not None:
+		previous, used, refill = came_from[this]
+		route.append((this // width, used, refill))
+		this = previous
+
+	route.append((this // width, None, False))
+	route.reverse()
+
+	return route
+
+
+
+# What the route < route > (as returned by search()) costs. See comment at 
+# the beginning of this file.
+def route_cost(graph, route):
+	cost = (0, 0, 0, 1, 0)
+	for this, used, refill in route[1:]:
+		cost = add_cost(cost, jump_cost(used))
+
+	return cost
+
+
+
+# The searches in the order anytime() uses them. The first one is a greedy 
+# search, which finds a route quickly, the last one is A* which finds the 
+# best route. The ones in between are A* searches with a weight (see 
+# search()).
+anytime_weights = [None, 3, 1.5, 1]
+
+# Gives first a route that is found quickly and then better and better 
+# routes (each one strictly better than the one before) until THE best 
+# route is found or until < deadline > (a point in time as returned by 
+# time()) is over. The first route is always given, even if that takes 
+# longer than < deadline >.
+# This is a generator. Each element is a tuple with the route (see search()),
+# its cost (see route_cost()) and how many (star, jumps left) pairs were 
+# expanded so far. If no route exists, nothing is given at all.
+# The other parameters are the same as for search().
+def anytime(graph, start_index, final_index, deadline = None, max_jumps = 4, \
+																exiting = None):
+	best_cost = None
+	expanded = 0
+	for weight in anytime_weights:
+		# The greedy search is fast anyway and any route is better than no 
+		# route at all. Thus it doesn't care about the deadline.
+		if weight is None:
+			this_deadline = None
+		else:
+			this_deadline = deadline
+
+		route, more = search(graph, start_index, final_index, max_jumps, \
+					exiting, astar = True, weight = weight, deadline = this_deadline)
+		expanded += more
+
+		if exiting and exiting.is_set():
+			return
+
+		if route:
+			cost = route_cost(graph, route)
+			if not best_cost or cost < best_cost:
+				best_cost = cost
+				yield route, cost, expanded
+
+		# If the greedy search can't find a route, no search can.
+		if not route or (deadline and time() > deadline):
+			return
+
+
+
+# For comparing routes in pareto_search(). A grade 3 boost is always worse 
+# than a grade 2 boost and that one is always worse than a grade 1 boost. 
+# Thus, the cost tuple < cost > is translated to (grade 3 boosts, grade 3 and 
+# 2 boosts, all boosts, jumps, neutron boosts). A route that has in this 
+# tuple nowhere a larger number than another route is at least as good.
+def pareto_key(cost):
+	level_3, level_2, level_1, jumps, neutrons = cost
+
+	return (level_3, level_3 + level_2, level_3 + level_2 + level_1, jumps, \
+																	neutrons)
+
+
+
+# True if the tuple < a > (see pareto_key()) is nowhere worse than the tuple 
+# < b >. Then a route like < b > is of no interest when one like < a > is 
+# known.
+def dominates(a, b):
+	return a[0] <= b[0] and a[1] <= b[1] and a[2] <= b[2] and a[3] <= b[3] \
+															and a[4] <= b[4]
+
+
+
+# True if any of the tuples in < keys > dominates < b >. This is called VERY 
+# often, hence dominates() is written out here.
+def dominated(keys, b):
+	b_0, b_1, b_2, b_3, b_4 = b
+	for a in keys:
+		if a[0] <= b_0 and a[1] <= b_1 and a[2] <= b_2 and a[3] <= b_3 \
+															and a[4] <= b_4:
+			return True
+
+	return False
+
+
+
+# For each star: how many grade 3 boosts, grade 3 and 2 boosts, boosts at 
+# all and jumps are at least needed to get from there to the star with index 
+# < final_index > (see pareto_key()). Each number is found on its own and 
+# without caring about the fuel in the tank, hence no route can do better.
+# The element is None if the final star can't be reached from a star.
+def least_to_go(graph, final_index):
+	incoming = graph.incoming()
+	size = len(graph.names)
+	# What each jump distance adds to each of the four numbers, if a jump 
+	# starts at a neutron star and if not.
+	adds = [[], []]
+	for this_distance in range(graph.bands):
+		for neutron in [0, 1]:
+			if neutron:
+				used = graph.bands - 1 if this_distance > 1 else this_distance
+			else:
+				used = this_distance
+			key = pareto_key(jump_cost(used))
+			adds[neutron].append(key[:4])
+
+	least = []
+	for k in range(4):
+		best = [None] * size
+		best[final_index] = 0
+		queue = [(0, final_index)]
+		while queue:
+			cost, j = heapq.heappop(queue)
+			if cost > best[j]:
+				continue
+
+			for this_distance in range(graph.bands):
+				for i in incoming[j][this_distance]:
+					new_cost = cost + adds[1 if graph.neutron[i] else 0][this_distance][k]
+					if best[i] is None or new_cost < best[i]:
+						best[i] = new_cost
+						heapq.heappush(queue, (new_cost, i))
+
+		least.append(best)
+
+	return [None if least[0][i] is None else (least[0][i], least[1][i], \
+							least[2][i], least[3][i], 0) for i in range(size)]
+
+
+
+# search() finds THE best route in the order described at the beginning of 
+# this file. But a pilot may prefer e.g. one more grade 1 boost if that saves
+# many jumps. This search finds all routes where each one is better than each 
+# other one in at least one way (fewer grade 3 or grade 2 or grade 1 or 
+# neutron boosts or fewer jumps, see pareto_key()). This is also called the 
+# "Pareto front".
+# 
+# Each (star, jumps left) pair can have several "labels" now, each one with 
+# its own cost and a pointer to the label it came from. A label is dropped 
+# as soon as another one at the same pair is nowhere worse (see dominates())
+# or if it can't lead to anything better than a route to the final star 
+# that is known already (see least_to_go()). The best route that search() 
+# finds is known from the start, this drops most labels right away.
+# The labels are taken out of the queue in the order of what a route through
+# them needs at least (like in A*). A label that is nowhere worse than 
+# another one is always taken out of the queue first, thus a label taken out
+# of the queue can not be dropped later anymore. And each route that reaches
+# the final star is one of the routes that are looked for.
+# 
+# There may be MANY such routes and it may take a long time to find all of 
+# them. If < deadline > (a point in time as returned by time()) is over, just
+# the ones found until then are given. These are the ones with the fewest 
+# boosts, since the queue is sorted like that.
+# 
+# The other parameters are the same as for search().
+# Returns a list with the routes (see search()), the best one (as search() 
+# would find it) first, and the number of labels that were expanded.
+def pareto_search(graph, start_index, final_index, max_jumps = 4, \
+											exiting = None, deadline = None):
+	best_route, expanded = search(graph, start_index, final_index, max_jumps, \
+												exiting, astar = True)
+	if not best_route:
+		return [], expanded
+
+	width = max_jumps + 1
+	start = start_index * width + max_jumps
+	to_go = least_to_go(graph, final_index)
+	scoopable = graph.scoopable
+
+	# Everything about a label is in these lists, the label is the index.
+	label_cost = [(0, 0, 0, 1, 0)]
+	label_key = [pareto_key((0, 0, 0, 1, 0))]
+	label_pair = [start]
+	# The label this one came from and the used distance and refill for the 
+	# jump from there.
+	label_from = [None]
+	alive = [True]
+
+	labels = {start:[0]}
+	finished = [pareto_key(route_cost(graph, best_route))]
+	finished_labels = []
+	least = to_go[start_index]
+	queue = [((least[0], least[1], least[2], least[3] + 1, 0), 0)]
+
+	while queue:
+		k = heapq.heappop(queue)[1]
+		if not alive[k]:
+			continue
+
+		this = label_pair[k]
+		i, jumps_left = divmod(this, width)
+		cost = label_cost[k]
+		key = label_key[k]
+
+		# This is what a route through this label needs at least. If that 
+		# can't be better than a route found already, forget it. The route 
+		# from search() can't be found a second time this way, since it is 
+		# not better than itself.
+		least = to_go[i]
+		at_least = (key[0] + least[0], key[1] + least[1], key[2] + least[2], \
+										key[3] + least[3], key[4])
+		if dominated(finished, at_least):
+			continue
+
+		expanded += 1
+		if expanded % 1000 == 0:
+			if exiting and exiting.is_set():
+				return [], expanded
+			if deadline and time() > deadline:
+				break
+
+		if i == final_index:
+			finished.append(key)
+			finished_labels.append(k)
+			continue
+
+		level_3, level_2, level_1, jumps, neutrons = cost
+		for this_distance in range(graph.bands):
+			used = used_distance(graph, i, this_distance)
+			add_3, add_2, add_1, add_jumps, add_neutrons = jump_cost(used)
+			new_cost = (level_3 + add_3, level_2 + add_2, level_1 + add_1, \
+								jumps + add_jumps, neutrons + add_neutrons)
+			new_key = pareto_key(new_cost)
+
+			for j in graph.reachable[i][this_distance]:
+				least = to_go[j]
+				if least is None:
+					continue
+
+				# The same as above, but before the label is even created.
+				at_least = (new_key[0] + least[0], new_key[1] + least[1], \
+							new_key[2] + least[2], new_key[3] + least[3], new_key[4])
+				if dominated(finished, at_least):
+					continue
+
+				if scoopable[j]:
+					new_jumps_left = max_jumps
+					refill = False
+				else:
+					new_jumps_left, refill = jumps_left_after(graph, i, j, used, \
+														jumps_left, max_jumps)
+					if new_jumps_left is None:
+						continue
+
+				that = j * width + new_jumps_left
+				others = labels.setdefault(that, [])
+				if dominated([label_key[o] for o in others], new_key):
+					continue
+
+				# Labels that are worse in every way than the new one are not 
+				# needed anymore.
+				keep = []
+				for o in others:
+					if dominates(new_key, label_key[o]):
+						alive[o] = False
+					else:
+						keep.append(o)
+
+				new = len(label_cost)
+				label_cost.append(new_cost)
+				label_key.append(new_key)
+				label_pair.append(that)
+				label_from.append((k, used, refill))
+				alive.append(True)
+				keep.append(new)
+				labels[that] = keep
+
+				heapq.heappush(queue, (at_least, new))
+
+	routes = [best_route]
+	for k in finished_labels:
+		route = []
+		while label_from[k] is not None:
+			previous, used, refill = label_from[k]
+			route.append((label_pair[k] // width, used, refill))
+			k = previous
+
+		route.append((label_pair[k] // width, None, False))
+		route.reverse()
+		routes.append(route)
+
+	routes.sort(key = lambda route: route_cost(graph, route))
+
+	return routes, expanded
+
+
+
+# Creates the class Jumper instance for a route as returned by search() so
+# that it can be printed like the routes found by find_route.py.
+def make_jumper(graph, route, max_jumps = 4):
+	jumper = cd.Jumper(graph.names[route[0][0]], max_jumps)
+
+	for k in range(1, len(route)):
+		previous = route[k - 1][0]
+		this, used, refill = route[k]
+		previous_name = graph.names[previous]
+		name = graph.names[this]
+
+		if refill:
+			jumper.scoop_stops.append((name, previous_name, name))
+			this_note = 'Refill needed at {}! '.format(name)
+			that = 'Jump to a scoopable star and back to {}.'.format(previous_name)
+			jumper.notes.append(this_note + that)
+
+		if (used + 1) % 2 == 0:
+			jumper.on_fumes.append((previous_name, name))
+			this_note = 'On fumes jump from {} to {}'.format(previous_name, name)
+			jumper.notes.append(this_note)
+
+		jumper.visited_systems.append(name)
+		jumper._add_jump_types(used)
+		jumper.distances.append(graph.distance(previous, this))
+
+	return jumper
+
+
+
+# Adds the cost of a jump to a cost tuple.
+def add_cost(cost, added):
+	return (cost[0] + added[0], cost[1] + added[1], cost[2] + added[2], \
+									cost[3] + added[3], cost[4] + added[4])
+
+
+
+# A search that starts at both ends at the same time and stops when both 
+# searches have met in the middle. In the gaps this program is meant for 
+# this means that the stars on the "far side" of each arm are not looked at.
+# This works just if the tank is always full after a jump (see comment at the
+# beginning of this file). If that's not the case search() is used instead.
+# Parameters and return values are the same as for search().
+def search_bidirectional(graph, start_index, final_index, max_jumps = 4, \
+															exiting = None):
+	if not all(graph.scoopable):
+		return search(graph, start_index, final_index, max_jumps, exiting)
+
+	incoming = graph.incoming()
+
+	# Index 0 is for the search from the start, index 1 for the search 
+	# "backwards" from the final star. The latter doesn't count the final 
+	# star as a visited system since the former already counts it.
+	best = [{start_index:(0, 0, 0, 1, 0)}, {final_index:(0, 0, 0, 0, 0)}]
+	came_from = [{start_index:None}, {final_index:None}]
+	done = [set(), set()]
+	queues = [[((0, 0, 0, 1, 0), start_index)], [((0, 0, 0, 0, 0), final_index)]]
+	expanded = 0
+
+	# The best route found so far goes through < meeting >.
+	shortest = None
+	meeting = None
+	if start_index == final_index:
+		shortest = (0, 0, 0, 1, 0)
+		meeting = start_index
+
+	while queues[0] and queues[1]:
+		# Once the two cheapest routes that are still open can't be combined
+		# to something cheaper than the best route so far, it IS the best 
+		# route.
+		if shortest and add_cost(queues[0][0][0], queues[1][0][0]) >= shortest:
+			break
+
+		# Always continue on the side that is less far.
+		side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+		cost, i = heapq.heappop(queues[side])
+		if i in done[side]:
+			continue
+
+		done[side].add(i)
+		expanded += 1
+
+		if expanded % 1000 == 0 and exiting and exiting.is_set():
+			return None, expanded
+
+		if side == 0:
+			neighbours = graph.reachable[i]
+		else:
+			neighbours = incoming[i]
+
+		for this_distance in range(graph.bands):
+			for j in neighbours[this_distance]:
+				# The jump goes from i to j on the way from the start, but 
+				# from j to i on the way from the final star.
+				if side == 0:
+					jump = used_distance(graph, i, this_distance)
+				else:
+					jump = used_distance(graph, j, this_distance)
+
+				if j in done[side]:
+					continue
+
+				new_cost = add_cost(cost, jump_cost(jump))
+				if j not in best[side] or new_cost < best[side][j]:
+					best[side][j] = new_cost
+					came_from[side][j] = (i, jump)
+					heapq.heappush(queues[side], (new_cost, j))
+
+					if j in best[1 - side]:
+						total = add_cost(new_cost, best[1 - side][j])
+						if not shortest or total < shortest:
+							shortest = total
+							meeting = j
+
+	if meeting is None:
+		return None, expanded
+
+	# From the meeting point back to the start, ...
+	route = []
+	this = meeting
+	while came_from[0][this] is not None:
+		previous, used = came_from[0][this]
+		route.append((this, used, False))
+		this = previous
+	route.append((this, None, False))
+	route.reverse()
+
+	# ... and from the meeting point to the final star.
+	this = meeting
+	while came_from[1][this] is not None:
+		following, used = came_from[1][this]
+		route.append((following, used, False))
+		this = following
+
+	return route, expanded
+
+
+
+# If the jumps of a route can all be done in the opposite direction, the 
+# reversed route is a way back. This is the case for all jumps, except 
+# some neutron boosted jumps, because just neutron stars can do them. 
+# Returns the reversed route or None if that is not possible.
+def reverse_route(graph, route):
+	if not all(graph.scoopable):
+		return None
+
+	reverse = [(route[-1][0], None, False)]
+	for k in range(len(route) - 1, 0, -1):
+		this = route[k][0]
+		previous = route[k - 1][0]
+
+		used = None
+		for this_distance in range(graph.bands):
+			if previous in graph.reachable[this][this_distance]:
+				used = used_distance(graph, this, this_distance)
+				break
+
+		if used is None:
+			return None
+
+		reverse.append((previous, used, False))
+
+	return reverse
+
+
+
+# How many seconds find_path() looks for routes with pareto_search() if no 
+# other time limit is given.
+pareto_time_budget = 60
+
+# This is what find_route.py => find_path() is for the randomized algorithm. 
+# It finds the best route (and if neutron boosting is allowed, if a way back 
+# exists) and tells the gui about it.
+# < engine > is the instance of class Engine() that calls this function.
+# < mode > is 'astar', 'dijkstra', 'bidirectional', 'anytime' or 'pareto'. 
+# See search(), search_bidirectional(), anytime() and pareto_search(). 
+# 'anytime' shows each better route as soon as it is found and stops after 
+# < time_budget > seconds (if that is not None) with the best route found 
+# until then. 'pareto' shows all routes that need less of one kind of boost 
+# or fewer jumps than the others, or the ones found in < time_budget > 
+# seconds.
+def find_path(stars, start_star, end_star, pristine_nodes, neutron_boosting, \
+								engine, mode = 'astar', time_budget = None):
+	graph = cd.Graph(pristine_nodes)
+	start_index = graph.index[list(start_star.keys())[0]]
+	final_index = graph.index[list(end_star.keys())[0]]
+	exiting = engine.exiting
+
+	if st.hopeless(graph, start_index, final_index, engine):
+		return
+
+	this = engine.said('pathfinding').split('\n\n')[0]
+	that = '\n\nSearching the route with the fewest boosts ...'
+	engine.say('pathfinding', this + that)
+	print(this + that)
+
+	time_is_over = False
+	alternatives = []
+	if mode == 'bidirectional':
+		route, expanded = search_bidirectional(graph, start_index, final_index, \
+														exiting = exiting)
+	elif mode == 'anytime':
+		route = None
+		expanded = 0
+		if time_budget:
+			deadline = time() + time_budget
+		else:
+			deadline = None
+
+		for route, cost, expanded in anytime(graph, start_index, final_index, \
+											deadline, exiting = exiting):
+			this = 'Found a route with {} jumps and {} grade 3, '.format(cost[3] - 1, cost[0])
+			that = '{} grade 2 and {} grade 1 boosts. '.format(cost[1], cost[2])
+			siht = 'Looking for a better one ...'
+			engine.say('pathfinding', this + that + siht)
+			print(this + that + siht)
+
+			# The results screen shall show the best route so far while the 
+			# search goes on. Most of the time the route can be used in the 
+			# opposite direction, hence this is shown as way back for now.
+			engine.fewest_jumps_jumper = make_jumper(graph, route)
+			way_back_route = reverse_route(graph, route)
+			if way_back_route:
+				engine.way_back_jumper = make_jumper(graph, way_back_route)
+			else:
+				engine.way_back_jumper = None
+			engine.route_found(so_far = True)
+
+		time_is_over = deadline and time() > deadline
+		missing = 'a better route may exist.'
+		# The way back is searched with A*.
+		mode = 'astar'
+	elif mode == 'pareto':
+		# Finding ALL these routes can take very long, hence this one always
+		# has a time limit.
+		if not time_budget:
+			time_budget = pareto_time_budget
+		deadline = time() + time_budget
+
+		routes, expanded = pareto_search(graph, start_index, final_index, \
+									exiting = exiting, deadline = deadline)
+		route = routes[0] if routes else None
+		alternatives = routes[1:]
+		time_is_over = deadline and time() > deadline
+		missing = 'more routes that need more boosts but fewer jumps may exist.'
+		mode = 'astar'
+	else:
+		route, expanded = search(graph, start_index, final_index, \
+							exiting = exiting, astar = mode == 'astar')
+
+	if exiting.is_set():
+		return
+
+	way_back_jumper = None
+	if route and neutron_boosting:
+		# Most of the time the route itself can be used in the opposite 
+		# direction and no additional search is needed.
+		way_back_route = reverse_route(graph, route)
+
+		if not way_back_route and mode == 'bidirectional':
+			way_back_route, more = search_bidirectional(graph, final_index, \
+											start_index, exiting = exiting)
+			expanded += more
+		elif not way_back_route:
+			way_back_route, more = search(graph, final_index, start_index, \
+							exiting = exiting, astar = mode == 'astar')
+			expanded += more
+
+		if way_back_route:
+			way_back_jumper = make_jumper(graph, way_back_route)
+
+	# See instruments.py.
+	ins.count('router.expanded', expanded)
+
+	if route:
+		this = "Finished finding a route ({} systems expanded). ".format(expanded)
+		that = "The results are shown below."
+		if time_is_over:
+			that = that + '\nThe time limit of {} seconds is over, '.format(time_budget)
+			that = that + missing
+		engine.say('pathfinding', this + that)
+		print(this + that)
+
+		engine.fewest_jumps_jumper = make_jumper(graph, route)
+		engine.way_back_jumper = way_back_jumper
+		engine.alternative_jumpers = [make_jumper(graph, alternative) for \
+												alternative in alternatives]
+		engine.route_found()
+	else:
+		this = engine.said('pathfinding')
+		that = '\nThe pathfnding algorithm failed to find a path.\nTry a ship '
+		siht = 'with a larger jumprange.' 
+		engine.say('pathfinding', this + that + siht)
+
+	engine.finding_path = False
+	engine.say('pathfinding_button', "Find path")
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
@@ -19,9 +19,13 @@
 # This file contains the class definition of the user input layer of the main 
 # (and only) window of the gui. 
 
-from PyQt5.QtWidgets import QWidget, QGridLayout, QLabel, QLineEdit, QPushButton, QFileDialog, QSpacerItem, QCheckBox, QRadioButton, QButtonGroup
+from PyQt5.QtWidgets import QWidget, QGridLayout, QLabel, QLineEdit, QPushButton, QFileDialog, QSpacerItem, QCheckBox, QRadioButton, QButtonGroup, QComboBox
 import os
+import pickle
 import additional_functions as af
+import name_index as ni
+import procedural_names as pn
+import corridor_cache as cc
 
 
 # The class definition of the the user input layer of the main window.
@@ -78,15 +82,28 @@ class ScreenInput(QWidget):
 		# (the latter is the default), and ...
 		self._make_offline_online_mode_stuff()
 
-		# ... the last user input is the "use cached stars"-stuff.
+		# ... the "use cached stars"-stuff, and ...
 		self._make_cached_mode_stuff()
 
+		# ... which pathfinding algorithm shall be used, and ...
+		self._make_algorithm_stuff()
+
+		# ... the last user input is if the information for the pathfinding
+		# algorithm shall be prepared while searching for the stars.
+		self.layout.addWidget(QLabel("Prepare while searching:"), 22, 0)
+		this = "(Checked means YES. The second button on the next screen "
+		that = "is then not needed.)"
+		self.streaming_box = QCheckBox(this + that)
+		self.layout.addWidget(self.streaming_box, 22, 1)
+
 		# Some spacers for better looks, ...
 		self.layout.addItem(spacer, 3, 0)
 		self.layout.addItem(spacer, 7, 0)
 		self.layout.addItem(spacer, 11, 0)
 		self.layout.addItem(spacer, 13, 0)
 		self.layout.addItem(spacer, 17, 0)
+		self.layout.addItem(spacer, 20, 0)
+		self.layout.addItem(spacer, 23, 0)
 
 		# ... the continue button, ...
 		self.continue_button = QPushButton('Continue')
@@ -119,6 +136,16 @@ class ScreenInput(QWidget):
 			setattr(self, 'end_{}_input'.format(these[i]), QLineEdit())
 			self.layout.addWidget(getattr(self, 'end_{}_input'.format(these[i])), i + 8, 1)
 
+		# Instead of the coordinates, the name of a system can be given. See
+		# _system_name_error().
+		for which, row in [['start', 4], ['end', 8]]:
+			this = "... or {} system name:".format(which)
+			self.layout.addWidget(QLabel(this), row, 2)
+			setattr(self, '{}_name_input'.format(which), QLineEdit())
+			field = getattr(self, '{}_name_input'.format(which))
+			field.setPlaceholderText("Needs the system_names-file.")
+			self.layout.addWidget(field, row, 3)
+
 
 	# Dito
 	def _make_offline_online_mode_stuff(self):
@@ -182,19 +209,41 @@ class ScreenInput(QWidget):
 		self.layout.addWidget(self.wtf_button, 19, 1)
 
 
+	# Dito
+	def _make_algorithm_stuff(self):
+		self.layout.addWidget(QLabel("Pathfinding algorithm:"), 21, 0)
+		self.algorithm_box = QComboBox()
+		# The order MUST be the same as in _set_search_mode().
+		self.algorithm_box.addItem("Fewest boosts (A*, one exact search)")
+		self.algorithm_box.addItem("Fewest boosts (Dijkstra, one exact search)")
+		this = "Fewest boosts (Dijkstra from both ends, one exact search)"
+		self.algorithm_box.addItem(this)
+		this = "Fewest boosts (A*, shows better and better routes)"
+		self.algorithm_box.addItem(this)
+		this = "All trade-offs between boosts and jumps"
+		self.algorithm_box.addItem(this)
+		this = "Randomized (the old algorithm, {} tries)".format(self.mother.max_tries)
+		self.algorithm_box.addItem(this)
+		this = "Randomized, tries run in parallel processes"
+		self.algorithm_box.addItem(this)
+		self.layout.addWidget(self.algorithm_box, 21, 1)
+
+
 	# Just to keep _make_cached_mode_stuff() more tidy.
 	def _display_cached_description(self):
 		_1 = "Looking up the relevant stars takes some time. Thus, "
 		_2 = "the result of the star-search are saved in the file called "
-		_3 = "'stars' (no extension).\nIf you now want to find a route for the "
-		_4 = "same start- and end-points but with different parameters (either "
-		_5 = "a larger jump range, or with neutron boosting allowed, or both) "
-		_6 = "check the box.\nIn this case the program will use said 'stars'-"
-		_7 = " file and one has not to wait for the relevant stars to be found.\n"
-		_8 = "\nATTENTION: The information for the pathfinding algorithm needs "
-		_9 = "to be prepared again, since the parameters changed!"
-
-		text = _1 + _2 + _3 + _4 + _5 + _6 + _7 + _8 + _9
+		_3 = "'stars' (no extension) and in the 'cache' directory.\nIf you now "
+		_4 = "want to find a route for start- and end-points that were used "
+		_5 = "before (maybe with different parameters, e.g. a larger jump range, "
+		_6 = "or with neutron boosting allowed) check the box.\nIn this case the "
+		_7 = "program will use the stars from the cache (also if the new route "
+		_8 = "lies within an old one) and one has not to wait for the relevant "
+		_9 = "stars to be found.\n\nATTENTION: The information for the "
+		_10 = "pathfinding algorithm needs to be prepared again if it is not in "
+		_11 = "the cache for the same parameters!"
+
+		text = _1 + _2 + _3 + _4 + _5 + _6 + _7 + _8 + _9 + _10 + _11
 		self.messages.setText(text)
 
 
@@ -250,6 +299,61 @@ class ScreenInput(QWidget):
 			return True
 
 
+	# Dito but for the system names. If a name is given, the coordinates of 
+	# that system are looked up in the name index (see name_index.py) and 
+	# written into the coordinate fields, which are then used as usual.
+	# Returns the error message, if any. Things the user should know anyway 
+	# (e.g. that a position was estimated) are put into < self.notices >.
+	def _system_name_error(self):
+		error = ''
+		self.notices = []
+		self.mother.estimated_systems = {}
+		for which in ['start', 'end']:
+			name = getattr(self, '{}_name_input'.format(which)).text().strip()
+			if not name:
+				continue
+
+			system = ni.find_system(name)
+			# Systems that are not in the index may still have a name that 
+			# says where they are (see procedural_names.py).
+			estimated = None
+			if not system:
+				estimated = pn.estimate_from_index(name)
+			elif pn.plausible_from_index(system[0], system[2]) is False:
+				this = 'ATTENTION: The coordinates of the {} system "{}" '.format(which, system[0])
+				that = 'are not where its name says. They may be wrong in EDSM.'
+				self.notices.append(this + that)
+
+			if estimated:
+				coords, uncertainty = estimated
+				this = 'The {} system "{}" is unknown, its position '.format(which, name)
+				that = 'was estimated from its name to within {:.0f} ly. '.format(uncertainty)
+				siht = 'The search looks for its real position.'
+				self.notices.append(this + that + siht)
+				self.mother.estimated_systems[which] = (name, coords, uncertainty)
+				system = (name, None, coords)
+
+			if not system:
+				this = 'ATTENTION: The {} system "{}" is unknown.'.format(which, name)
+				suggestions = ni.systems_starting_with(name)
+				if suggestions:
+					that = ' Did you mean: {}?'.format(', '.join(system[0] for \
+														system in suggestions))
+				else:
+					that = ' The names of all systems are known after the '
+					that = that + 'stars were searched once offline.'
+				error = error + this + that + '\n\n'
+				continue
+
+			name, id_number, coords = system
+			getattr(self, '{}_name_input'.format(which)).setText(name)
+			for this in ["x", "y", "z"]:
+				field = getattr(self, '{}_{}_input'.format(which, this))
+				field.setText(str(coords[this]))
+
+		return error
+
+
 	# More or less dito but for the start and end coordinates.
 	def _coordinates_error(self):
 		self.mother.start_coords = {}
@@ -296,10 +400,34 @@ class ScreenInput(QWidget):
 
 
 	# Dito but for a cached stars-file.
+	# The best matching stars in the cache (see corridor_cache.py) are copied 
+	# into the stars-file. If there are none, the stars-file is used as it is.
 	def _cached_file_error(self):
 		self.mother.cached = self.cached_box.isChecked()
-
-		if self.cached_box.isChecked() and not os.path.isfile('./stars'):
+		self.mother.corridor = cc.corridor_of(self.mother.start_coords, \
+				self.mother.end_coords, self.offline_mode.isChecked(), \
+													self.mother.starsfile)
+
+		stars = None
+		# The coordinates could be wrong, then there is nothing to look for.
+		coordinates_ok = self.mother.start_coords and self.mother.end_coords \
+				and len(self.mother.start_coords) == 3 and \
+									len(self.mother.end_coords) == 3
+		if self.cached_box.isChecked() and coordinates_ok:
+			stars, how = cc.find_stars(self.mother.corridor)
+
+		if stars is not None:
+			with open('./stars', 'wb') as f:
+				pickle.dump(stars, f)
+
+			if how == 'exact':
+				this = "The stars for this route were found in the cache."
+			else:
+				this = "The stars for this route were taken from a cached "
+				this = this + "route that contains it."
+			self.mother.screen_work.star_search_text.setText(this)
+			self.mother.screen_work.star_search_button.hide()
+		elif self.cached_box.isChecked() and not os.path.isfile('./stars'):
 			return True
 		elif self.cached_box.isChecked():
 			this = "The cached stars-file will be used."
@@ -307,6 +435,14 @@ class ScreenInput(QWidget):
 			self.mother.screen_work.star_search_button.hide()
 
 
+	# The pathfinding algorithm chosen on this screen. The user can't do 
+	# anything wrong here, thus it is not checked with the others above.
+	def _set_search_mode(self):
+		modes = ['astar', 'dijkstra', 'bidirectional', 'anytime', 'pareto', \
+														'random', 'parallel']
+		self.mother.search_mode = modes[self.algorithm_box.currentIndex()]
+
+
 	# Finally, the definition of all the stuff that needs to be done, when the 
 	# continue-button was pressed ... who would have thought that.
 	# ATTENTION: Here just a few values are set, since this often happens 
@@ -326,6 +462,8 @@ class ScreenInput(QWidget):
 							y in [self.jumprange, self.on_fumes]] + \
 							[self.jumprange * 4]
 
+		self._set_search_mode()
+
 		# Check if neutron boosting is activated ...
 		self.mother.neutron_boosting = self.neutron_boost_box.isChecked()
 
@@ -339,7 +477,7 @@ class ScreenInput(QWidget):
 			# I admit that this is a very constructed case, but it happened 
 			# during testing. Under normal operation, the if condition will
 			# always trigger.
-			if not self.mother.screen_work.downloading_neutron_file:
+			if not self.mother.screen_work.engine.downloading_neutron_file:
 				this = "Neutron boosting shall be used. For this the newest "
 				that = "< neutron-stars.csv > file (ca. 50 MB) needs to be "
 				siht = "downloaded from edastro.com. Pressing the button does "
@@ -360,6 +498,7 @@ class ScreenInput(QWidget):
 
 		# Set which mode to find the relevant stars shall be used.
 		self.mother.offline_mode = self.offline_mode.isChecked()
+		self.mother.streaming = self.streaming_box.isChecked()
 
 		# This seems unnecessary, BUT the labels that belong to certain buttons 
 		# in the next layer change when said  button is pressed. This is usually 
@@ -368,18 +507,25 @@ class ScreenInput(QWidget):
 		# back button of the next screen to change some parameters, and said 
 		# processes finish while the user is on this screen, these labels must
 		# show something meaningful again.
-		if not self.mother.screen_work.searching_stars and not self.mother.cached:
+		# What was noticed about the start and end systems stays on this 
+		# screen and is shown on the next one, too.
+		notices = '\n\n'.join(self.notices)
+		self.messages.setText(notices)
+
+		if not self.mother.screen_work.engine.searching_stars and not self.mother.cached:
 			this = "Press the button below to start the search for relevant "
 			that = "stars. This will take a while!"
+			if notices:
+				this = notices + '\n\n' + this
 			self.mother.screen_work.star_search_text.setText(this + that)
 
-		if not self.mother.screen_work.creating_nodes:
+		if not self.mother.screen_work.engine.creating_nodes:
 			this = "Press the button below to prepare the information for the "
 			that = "pathfinding algorithm\nUsually AFTER the relevant stars were "
 			siht = "found or if chached stars are used.\nThis may take a while!"
 			self.mother.screen_work.create_nodes_text.setText(this + that + siht)
 
-		if not self.mother.screen_work.finding_path:
+		if not self.mother.screen_work.engine.finding_path:
 			this = "AFTER the information was prepared, press the button below to "
 			that = "start the pathfinding algorithm. This will take a while!"
 			self.mother.screen_work.pathfinding_text.setText(this + that)
@@ -404,8 +550,11 @@ class ScreenInput(QWidget):
 			that = 'than regular jumprange.\n\n'
 			error = error + this + that
 
-		# Grab the coordinates.
-		if self._coordinates_error():
+		# Grab the coordinates, maybe from the system names.
+		name_error = self._system_name_error()
+		if name_error:
+			error = error + name_error
+		elif self._coordinates_error():
 			this = 'ATTENTION: The Start/End-Coordinates must be numbers!\n\n'
 			error = error + this
 
@@ -423,7 +572,7 @@ class ScreenInput(QWidget):
 			error = error + this + that + siht + taht
 
 		if error:
-			self.messages.setText(error)
+			self.messages.setText(error + '\n\n'.join(self.notices))
 			return True
 
 
@@ -0,0 +1,222 @@
+#    "spanning_tree" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Most of the time a search that doesn't find a path fails because there is 
+# a gap somewhere that is just too wide. However, this was just known after 
+# all tries failed, which can take ages. 
+# A minimum spanning tree connects all stars with the shortest possible 
+# jumps, and the longest jump on the way through the tree from start to end 
+# is the shortest jump range with which start and end can be connected at 
+# all ("bottleneck"). No route can do with less. Hence, if even a neutron 
+# boost doesn't reach that far, searching makes no sense. The same is true 
+# if start and end are not in the same group of connected stars (see 
+# class Graph => lowest_connecting_band() in class_definitions.py).
+# The tree is created once per graph and after that, asking for the 
+# bottleneck takes just milliseconds.
+# ATTENTION: Fuel is not taken into account. Hence, a route may still not be 
+# possible even if the bottleneck is short enough.
+
+from math import sqrt
+import class_definitions as cd
+import spatial_index as sp
+
+# This creates the tree with Kruskal's algorithm. Just the pairs of stars 
+# that are at most < max_distance > apart are looked at (see 
+# spatial_index.py). If that is not enough to connect everything, 
+# < max_distance > is doubled and the pairs that are not yet connected are 
+# looked at again.
+# Returns a list with one element per star, that contains the neighbours of
+# the star in the tree as (distance, index) tuples.
+def minimum_spanning_tree(coords, start_distance):
+	size = len(coords)
+	components = cd.UnionFind(size)
+	find = components.find
+	tree = [[] for i in range(size)]
+	edges_left = size - 1
+	max_distance = max(start_distance, 1.0)
+
+	while edges_left > 0:
+		grid = sp.Grid(coords, max_distance)
+		# If two neighbouring cells contain just stars that are connected 
+		# already, nothing needs to be done with them. This is what saves 
+		# most of the time when < max_distance > becomes large.
+		roots = {cell:{find(i) for i in members} for cell, members in \
+														grid.cells.items()}
+		pairs = []
+		for cell, members, other, others in grid.neighbouring_cells():
+			if len(roots[cell]) == 1 and roots[cell] == roots[other]:
+				continue
+
+			same_cell = members is others
+			for k, i in enumerate(members):
+				x_0, y_0, z_0 = coords[i]
+				root = find(i)
+				if same_cell:
+					others = members[k + 1:]
+				for j in others:
+					if find(j) == root:
+						continue
+
+					x_1, y_1, z_1 = coords[j]
+					distance = sqrt((x_1 - x_0)**2 + (y_1 - y_0)**2 + \
+															(z_1 - z_0)**2)
+					if distance <= max_distance:
+						pairs.append((distance, i, j))
+
+		pairs.sort()
+		for distance, i, j in pairs:
+			if components.union(i, j):
+				tree[i].append((distance, j))
+				tree[j].append((distance, i))
+				edges_left -= 1
+
+		max_distance *= 2
+
+	return tree
+
+
+
+# Returns (distance, i, j) for the longest jump (from star i to star j) on 
+# the way from < start_index > to < final_index > through the tree. Or None
+# if start and end are the same star.
+def bottleneck(graph, start_index, final_index):
+	if graph.spanning_tree is None:
+		graph.spanning_tree = minimum_spanning_tree(graph.coords, \
+												graph.jump_distances[1])
+	tree = graph.spanning_tree
+
+	# There is exactly one way between two stars in a tree. Hence, I just 
+	# need to walk through the tree, remembering the longest jump so far.
+	widest = {start_index:None}
+	todo = [start_index]
+	while todo:
+		i = todo.pop()
+		if i == final_index:
+			return widest[i]
+
+		for distance, j in tree[i]:
+			if j in widest:
+				continue
+
+			if widest[i] is None or distance > widest[i][0]:
+				widest[j] = (distance, i, j)
+			else:
+				widest[j] = widest[i]
+			todo.append(j)
+
+
+
+# The "band" (see class Node in class_definitions.py) a jump of < distance > 
+# belongs to. None if it is longer than even a neutron boost can do.
+def needed_band(jump_distances, distance):
+	for this_distance in range(len(jump_distances) - 1):
+		if distance < jump_distances[this_distance + 1]:
+			return this_distance
+
+
+
+# A name for the pilot for what is needed to jump in < this_distance >.
+def band_name(graph, this_distance):
+	if this_distance == graph.bands - 1:
+		return 'a neutron boost'
+
+	boost_grade = int(this_distance / 2)
+	if boost_grade == 0:
+		name = 'the normal jump range'
+	else:
+		name = 'a grade {} boost'.format(boost_grade)
+
+	# See class_definitions.py => jump_type() why.
+	if this_distance % 2 == 1:
+		name = name + ' (on fumes)'
+
+	return name
+
+
+
+# This is called before a search. It tells the pilot where the widest gap
+# on the way is and what it takes to get from start to end.
+# Returns True if start and end are not connected at all (see 
+# class Graph => lowest_connecting_band() in class_definitions.py), in which 
+# case the search can be skipped. < engine > is the instance of class 
+# Engine (see engine.py) that started the search.
+def hopeless(graph, start_index, final_index, engine):
+	widest = bottleneck(graph, start_index, final_index)
+	if widest is None:
+		return False
+
+	distance, i, j = widest
+	this_distance = graph.lowest_connecting_band(start_index, final_index)
+
+	this = engine.said('pathfinding').split('\n\n')[0]
+	that = '\nWidest gap: {:.2f} ly between {} and {}'.format(distance, \
+												graph.names[i], graph.names[j])
+	if this_distance is not None:
+		siht = '.\nStart and end are connected with at least '
+		taht = '{}.'.format(band_name(graph, this_distance))
+		engine.say('pathfinding', this + that + siht + taht)
+		print(this + that + siht + taht)
+		return False
+
+	# A neutron boost is four times and a grade 3 boost twice the normal 
+	# jump range. But if the widest gap is short enough for a neutron boost 
+	# and start and end are still not connected, there is no neutron star 
+	# at the right place.
+	neutrons_usable = needed_band(graph.jump_distances, distance) is None \
+													and any(graph.neutron)
+	if neutrons_usable:
+		range_needed = distance / 4
+	else:
+		range_needed = distance / 2
+
+	siht = '.\n\nStart and end are not connected, not even with neutron '
+	taht = 'boosts. No search is done. Try a ship with a jump range of at '
+	taht = taht + 'least {:.2f} ly'.format(range_needed)
+	if not any(graph.neutron):
+		taht = taht + ' or allow neutron boosting.'
+	else:
+		taht = taht + '.'
+	engine.say('pathfinding', this + that + siht + taht)
+	print(this + that + siht + taht)
+
+	engine.finding_path = False
+	engine.say('pathfinding_button', "Find path")
+
+	return True
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,224 @@
+#    "spatial_index" (v2.0)
+#    Copyright 2019 Soren Heinze
+#    soerenheinze (at) gmx (dot) de
+#    5B1C 1897 560A EF50 F1EB 2579 2297 FAE4 D9B5 2A35
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Looking at all pairs of stars takes forever if there are many stars. Hence, 
+# the stars are sorted into cubes ("cells") of equal size. Stars that are 
+# at most one cell length apart are then either in the same cell or in 
+# neighbouring cells, and all the other cells don't need to be looked at.
+# The same way, the stars closest to a point are found by looking just at 
+# the cells around that point.
+
+from math import floor, sqrt
+import heapq
+
+# The 13 neighbouring cells that come "after" a cell. Looking at a cell 
+# together with itself and with these visits each pair of neighbouring cells 
+# exactly once.
+forward = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) \
+								for dz in (-1, 0, 1) if (dx, dy, dz) > (0, 0, 0)]
+
+
+
+# A cell size with which each cell contains about < stars_per_cell > stars
+# (if the stars were spread evenly in the box around them).
+def cell_size_for(coords, stars_per_cell = 4):
+	if not coords:
+		return 1.0
+
+	volume = 1.0
+	for axis in range(3):
+		values = [point[axis] for point in coords]
+		volume = volume * max(max(values) - min(values), 1.0)
+
+	return max((volume * stars_per_cell / len(coords))**(1 / 3), 1.0)
+
+
+
+class Grid(object):
+	# < coords > is a list with (x, y, z) for each star, as in class Graph 
+	# in class_definitions.py. The cells will contain the indice of the stars.
+	# < names > is optional and just kept so that whoever uses the grid can 
+	# translate an index into the name of the star.
+	def __init__(self, coords, cell_size, names = None):
+		self.coords = coords
+		self.cell_size = cell_size
+		self.names = names
+		self.cells = {}
+
+		for i, point in enumerate(coords):
+			self.cells.setdefault(self.cell_of(point), []).append(i)
+
+		# The corners of the box that contains all cells with stars.
+		if self.cells:
+			self.lowest_cell = [min(cell[axis] for cell in self.cells) \
+														for axis in range(3)]
+			self.highest_cell = [max(cell[axis] for cell in self.cells) \
+														for axis in range(3)]
+		else:
+			self.lowest_cell = self.highest_cell = [0, 0, 0]
+
+
+	# Adds a star later on. It gets the next index. 
+	# ATTENTION: < self.coords > (and < self.names >) may be the lists the 
+	# grid was created with, which are changed, too.
+	def add(self, point, name = None):
+		i = len(self.coords)
+		self.coords.append(point)
+		if self.names is not None:
+			self.names.append(name)
+
+		cell = self.cell_of(point)
+		if not self.cells:
+			self.lowest_cell = list(cell)
+			self.highest_cell = list(cell)
+		self.cells.setdefault(cell, []).append(i)
+		self.lowest_cell = [min(a, b) for a, b in zip(self.lowest_cell, cell)]
+		self.highest_cell = [max(a, b) for a, b in zip(self.highest_cell, cell)]
+
+		return i
+
+
+	# Which cell a point belongs to.
+	def cell_of(self, point):
+		size = self.cell_size
+
+		return tuple(int(floor(value / size)) for value in point)
+
+
+	# All pairs of cells in which stars at most one cell length apart can be. 
+	# That is each cell with itself (in which case both elements are the 
+	# same list) and each cell with its neighbours.
+	def neighbouring_cells(self):
+		cells = self.cells
+		for cell, members in cells.items():
+			yield cell, members, cell, members
+
+			x, y, z = cell
+			for dx, dy, dz in forward:
+				other = (x + dx, y + dy, z + dz)
+				if other in cells:
+					yield cell, members, other, cells[other]
+
+
+	# The indice of the stars in the cell of < point > and in the cells 
+	# around it, that is all stars that are at most one cell length away 
+	# (and some more).
+	def around(self, point):
+		x, y, z = self.cell_of(point)
+		stars = []
+		for dx in (-1, 0, 1):
+			for dy in (-1, 0, 1):
+				for dz in (-1, 0, 1):
+					stars.extend(self.cells.get((x + dx, y + dy, z + dz), []))
+
+		return stars
+
+
+	# All cells that are exactly < ring > cells away from < cell > (in the 
+	# direction where it is furthest away). Just the ones in the box that 
+	# contains all cells with stars, since all others are empty anyway.
+	def ring_of_cells(self, cell, ring):
+		steps = []
+		for low, high, value in zip(self.lowest_cell, self.highest_cell, cell):
+			steps.append(range(max(-ring, low - value), min(ring, high - value) + 1))
+		x_steps, y_steps, z_steps = steps
+		# If neither dx nor dy is at the border of the ring, just the top and 
+		# bottom cells are.
+		z_border = [dz for dz in (-ring, ring) if dz in z_steps]
+
+		x, y, z = cell
+		for dx in x_steps:
+			for dy in y_steps:
+				if abs(dx) == ring or abs(dy) == ring:
+					this_steps = z_steps
+				else:
+					this_steps = z_border
+				for dz in this_steps:
+					yield (x + dx, y + dy, z + dz)
+
+
+	# The < k > stars closest to < point > as a list of (distance, index) 
+	# tuples, the closest first.
+	# This looks at the cell of the point and then at the rings of cells 
+	# around it. A star in a ring further out than < ring > is at least 
+	# ring * cell_size away, thus it can stop as soon as the k-th closest 
+	# star so far is closer than that.
+	def nearest(self, point, k = 1):
+		coords = self.coords
+		cells = self.cells
+		x_0, y_0, z_0 = point
+		cell = self.cell_of(point)
+		# The k closest stars so far, with the negative distance, so that 
+		# the furthest of them is the first one in the heap.
+		closest = []
+
+		def look_at(members):
+			for i in members:
+				x_1, y_1, z_1 = coords[i]
+				distance = sqrt((x_1 - x_0)**2 + (y_1 - y_0)**2 + (z_1 - z_0)**2)
+				if len(closest) < k:
+					heapq.heappush(closest, (-distance, i))
+				elif distance < -closest[0][0]:
+					heapq.heapreplace(closest, (-distance, i))
+
+		# If the point is outside of the box with all the stars, the rings 
+		# that don't reach into that box are empty anyway.
+		ring = 0
+		for low, high, value in zip(self.lowest_cell, self.highest_cell, cell):
+			ring = max(ring, low - value, value - high)
+
+		while True:
+			# After looking at all rings up to < ring - 1 >, the stars in the 
+			# other rings are at least (ring - 1) * cell_size away.
+			if len(closest) == k and -closest[0][0] <= (ring - 1) * self.cell_size:
+				break
+
+			for other in self.ring_of_cells(cell, ring):
+				if other in cells:
+					look_at(cells[other])
+
+			# If there are less than k stars, at some point there are no 
+			# more cells to look at.
+			if all(value - ring <= low and high <= value + ring for low, high, \
+						value in zip(self.lowest_cell, self.highest_cell, cell)):
+				break
+			ring += 1
+
+		return sorted((-distance, i) for distance, i in closest)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+